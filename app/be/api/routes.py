@@ -1,22 +1,168 @@
+import asyncio
+import functools
+import json
+from pathlib import Path
 import shutil
-from fastapi import APIRouter, File, UploadFile
+import tempfile
+from fastapi import APIRouter, File, HTTPException, Query, Request, UploadFile
+from fastapi.responses import StreamingResponse
 from loguru import logger
-from typing import List
+from typing import AsyncIterator, Awaitable, List, Optional, Tuple
+import uuid
 
 # Custom libraries
-from app.be.schemas.inference_models import (InferencePayload, 
+from app.be.schemas.inference_models import (COLLECTION_NAME_PATTERN,
+                                             InferencePayload, 
                                              InferenceResponse, 
-                                             AIModelParameters)
-from app.be.schemas.ingestion_models import IngestionResponse
+                                             AIModelParameters,
+                                             BatchInferencePayload,
+                                             BatchInferenceResponse)
+from app.be.schemas.session_models import SessionResponse
+from app.be.schemas.ingestion_models import (CollectionInfo,
+                                             DeletionResponse,
+                                             DocumentInfo,
+                                             IngestionJobStatus,
+                                             IngestionResponse)
+from app.be.schemas.maintenance_models import (IndexVersionInfo,
+                                               MaintenanceJobStatus,
+                                               MaintenanceRequest,
+                                               RollbackRequest)
+from app.be.utils.coalescing import coalescer
 from app.be.utils.inference import ModelInference
-from app.be.utils.ingestion import FileIngestor
-from app.be.utils.model import invoke_model
+from app.be.utils.ingestion import LOADER_MAPPING, FileIngestor
+from app.be.utils.jobs import jobs
+from app.be.utils.maintenance import maintenance
+from app.be.utils.model import ainvoke_model, stream_model
+from app.be.utils.resources import IndexBusy, resources
+from app.be.utils.sessions import ConversationSession, sessions
+from app.be.utils.uploads import UploadTooLarge, spool_upload
 from app.be.core.config import settings
 
 router = APIRouter(prefix="/api", tags=["GenAI"])
 
+def resolve_history(items: InferencePayload) -> Tuple[Optional[ConversationSession], str]:
+    """Use the server-side session history when a session ID is given, else the payload's history."""
+    if items.session_id:
+        session = sessions.get_or_create(items.session_id)
+        return session, sessions.build_history(session)
+    return None, items.history or ""
+
+async def record_turn(events: AsyncIterator[dict],
+                      session: Optional[ConversationSession],
+                      query: str) -> AsyncIterator[dict]:
+    """Pass stream events through and store the finished answer in the session."""
+    tokens = []
+    async for event in events:
+        if event["type"] == "token":
+            tokens.append(event["content"])
+        elif event["type"] == "done" and session is not None:
+            sessions.append(session, query, "".join(tokens))
+        yield event
+
+def resolve_batch_histories(items: BatchInferencePayload) -> Tuple[List[InferencePayload],
+                                                                   List[Optional[ConversationSession]]]:
+    """
+    Resolve the history of every batch item, as resolve_history does for a single request.
+
+    Items are answered concurrently, so items of the same session all see
+    its history as it was when the batch started.
+
+    Returns:
+        tuple: The items with their history filled in, and each item's session (or None).
+    """
+    resolved = [resolve_history(item) for item in items.items]
+    return ([item.model_copy(update={"history": history}) for item, (_, history) in zip(items.items, resolved)],
+            [session for session, _ in resolved])
+
+async def record_batch_turns(results: AsyncIterator[dict],
+                             items: List[InferencePayload],
+                             batch_sessions: List[Optional[ConversationSession]]) -> AsyncIterator[dict]:
+    """Pass batch results through and store each answered item in its session."""
+    async for result in results:
+        session = batch_sessions[result["index"]]
+        if session is not None and result["error"] is None:
+            sessions.append(session, items[result["index"]].query, result["response"])
+        yield result
+
+def check_collections(collections: Optional[List[str]]):
+    """Reject requests naming collections that do not exist, rather than creating them empty."""
+    unknown = [collection for collection in collections or [] if not resources.has_collection(collection)]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown collections: {', '.join(unknown)}")
+
+async def open_inference(collections: Optional[List[str]] = None) -> ModelInference:
+    """Return an inference session over the requested collections.
+
+    Checking the collections may list them from Chroma and borrowing the
+    indexes waits for the resource manager's lock, so both run in a thread
+    rather than on the event loop.
+    """
+    def open_session() -> ModelInference:
+        check_collections(collections)
+        return ModelInference(collections)
+
+    return await asyncio.to_thread(open_session)
+
+def coalescing_key(kind: str,
+                   query: str,
+                   params: AIModelParameters,
+                   history: str = "",
+                   collections: Optional[List[str]] = None) -> str:
+    """Key a request by everything its answer depends on, so only identical requests share work.
+
+    Retrieval requests are also keyed by the index version and the store
+    version that each reload after ingestion bumps, so a request arriving
+    after new data was committed never joins work started on the old data.
+    """
+    retrieves = collections is not None
+    return coalescer.make_key(kind, query,
+                              history=history,
+                              parameters=params.model_dump(),
+                              model=settings.llm_model,
+                              collections=collections,
+                              version=resources.INDEX_VERSION if retrieves else None,
+                              store_version=resources.VERSION if retrieves else None)
+
+async def run_until_disconnected(request: Request,
+                                 work: Awaitable,
+                                 timeout: Optional[float] = settings.inference_timeout):
+    """
+    Await the work, cancelling it when the client goes away or it takes too long.
+
+    Streaming responses are cancelled by the server on disconnect; this
+    gives non-streaming endpoints the same behaviour, so an abandoned
+    request stops holding an LLM call and a connection from the pool.
+
+    Args:
+        request (Request): The incoming request, polled for disconnection.
+        work (Awaitable): The coroutine producing the response.
+        timeout (float): Seconds before giving up with a 504, or None to wait indefinitely.
+
+    Returns:
+        The result of the work.
+    """
+    task = asyncio.ensure_future(work)
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+    try:
+        while True:
+            interval = settings.disconnect_poll_interval
+            if deadline is not None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise HTTPException(status_code=504, detail="Inference timed out.")
+                interval = min(interval, remaining)
+            done, _ = await asyncio.wait({task}, timeout=interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info("Client disconnected, cancelling inference.")
+                raise HTTPException(status_code=499, detail="Client closed the request.")
+    finally:
+        task.cancel()
+
 @router.post("/inference", response_model=InferenceResponse)
-def invoke_inference_session(items: InferencePayload):
+async def invoke_inference_session(items: InferencePayload, request: Request):
     """Invoke the inference session with the provided query and parameters.
     Args:
         items (InferencePayload): The payload containing the query and parameters.
@@ -25,18 +171,77 @@ def invoke_inference_session(items: InferencePayload):
         InferenceResponse: The response from the inference session. 
     """
     logger.info(f"Starting inference session with query: {items.query}")
-    inference = ModelInference()
+    inference = await open_inference(items.collections)
     params = items.ai_model_parameters or AIModelParameters()
-    response = inference.start_inference_session(query=items.query, 
-                                                 history=items.history,
-                                                 params=params)
+    session, history = resolve_history(items)
+    key = coalescing_key("inference", items.query, params, history, inference.COLLECTIONS)
+    work = functools.partial(inference.start_inference_session, query=items.query, history=history, params=params)
+    response = await run_until_disconnected(request, coalescer.run("inference", key, work))
+    if session is not None:
+        sessions.append(session, items.query, response)
 
     logger.info(f"Inference response: {response}")
     return InferenceResponse(response=response)
 
 
+def check_batch(items: BatchInferencePayload) -> int:
+    """Validate the batch size and return the LLM concurrency to use."""
+    if len(items.items) > settings.batch_max_items:
+        raise HTTPException(status_code=413,
+                            detail=f"Batch of {len(items.items)} exceeds the limit of {settings.batch_max_items} items.")
+    check_collections(sorted({collection for item in items.items for collection in item.collections or []}))
+    return max(1, min(items.concurrency or settings.batch_concurrency, settings.batch_concurrency))
+
+
+@router.post("/inference/batch", response_model=BatchInferenceResponse)
+async def invoke_batch_inference_session(items: BatchInferencePayload, request: Request):
+    """Answer many questions in one request.
+    Args:
+        items (BatchInferencePayload): The payloads and the requested LLM concurrency.
+
+    Returns:
+        BatchInferenceResponse: One result per payload, in request order.
+    """
+    concurrency = await asyncio.to_thread(check_batch, items)
+    logger.info(f"Starting batch inference of {len(items.items)} queries with concurrency {concurrency}")
+    if not items.items:
+        return BatchInferenceResponse(results=[])
+
+    batch_items, batch_sessions = resolve_batch_histories(items)
+    inference = await open_inference()
+
+    async def collect() -> list:
+        results = inference.iter_batch_inference(batch_items, concurrency=concurrency)
+        return [result async for result in record_batch_turns(results, batch_items, batch_sessions)]
+
+    # A large batch legitimately outlives the per-request timeout, so only a disconnect cancels it
+    results = await run_until_disconnected(request, collect(), timeout=None)
+    return BatchInferenceResponse(results=sorted(results, key=lambda result: result["index"]))
+
+
+@router.post("/inference/batch/stream")
+async def stream_batch_inference_session(items: BatchInferencePayload):
+    """Answer many questions, streaming each result as NDJSON as soon as it completes.
+    Args:
+        items (BatchInferencePayload): The payloads and the requested LLM concurrency.
+
+    Returns:
+        StreamingResponse: One {"index", "response", "error"} line per payload,
+            in completion order.
+    """
+    concurrency = await asyncio.to_thread(check_batch, items)
+    logger.info(f"Streaming batch inference of {len(items.items)} queries with concurrency {concurrency}")
+    if not items.items:
+        return StreamingResponse(iter(()), media_type="application/x-ndjson")
+    batch_items, batch_sessions = resolve_batch_histories(items)
+    inference = await open_inference()
+    results = inference.iter_batch_inference(batch_items, concurrency=concurrency)
+    return StreamingResponse(to_ndjson(record_batch_turns(results, batch_items, batch_sessions)),
+                             media_type="application/x-ndjson")
+
+
 @router.post("/direct-inference", response_model=InferenceResponse)
-def invoke_direct_inference_session(items: InferencePayload):
+async def invoke_direct_inference_session(items: InferencePayload, request: Request):
     """Invoke the inference session with the provided query and parameters.
     Args:
         items (InferencePayload): The payload containing the query and parameters.
@@ -47,32 +252,344 @@ def invoke_direct_inference_session(items: InferencePayload):
     logger.info(f"Direct inference with query: {items.query}")
     params = items.ai_model_parameters or AIModelParameters()
 
-    response = invoke_model(prompt=items.query, 
-                            parameters=params)
+    key = coalescing_key("direct-inference", items.query, params)
+    work = functools.partial(ainvoke_model, prompt=items.query, parameters=params)
+    response = await run_until_disconnected(request, coalescer.run("direct-inference", key, work))
 
     logger.info(f"Inference response: {response}")
     return InferenceResponse(response=response)
 
 
+async def to_ndjson(events: AsyncIterator[dict]) -> AsyncIterator[str]:
+    """Serialize stream events as newline-delimited JSON."""
+    async for event in events:
+        yield json.dumps(event) + "\n"
+
+
+@router.post("/inference/stream")
+async def stream_inference_session(items: InferencePayload):
+    """Stream the inference session as NDJSON events.
+    Args:
+        items (InferencePayload): The payload containing the query and parameters.
+
+    Returns:
+        StreamingResponse: A "metadata" event with the retrieved sources, then
+            "token" events, then a "done" event.
+    """
+    logger.info(f"Starting streaming inference session with query: {items.query}")
+    inference = await open_inference(items.collections)
+    params = items.ai_model_parameters or AIModelParameters()
+    session, history = resolve_history(items)
+    key = coalescing_key("inference-stream", items.query, params, history, inference.COLLECTIONS)
+    events = coalescer.stream("inference-stream", key,
+                              functools.partial(inference.stream_inference_session,
+                                                query=items.query,
+                                                history=history,
+                                                params=params))
+    return StreamingResponse(to_ndjson(record_turn(events, session, items.query)),
+                             media_type="application/x-ndjson")
+
+
+@router.post("/chat")
+async def stream_chat_session(items: InferencePayload):
+    """Route a chat message on the server and stream the answer as NDJSON events.
+    Args:
+        items (InferencePayload): The payload containing the message and parameters.
+
+    Returns:
+        StreamingResponse: An "intent" event ("document" or "conversation"),
+            a "metadata" event, then "token" events, then a "done" event.
+    """
+    logger.info(f"Starting chat session with message: {items.query}")
+    inference = await open_inference(items.collections)
+    params = items.ai_model_parameters or AIModelParameters()
+    session, history = resolve_history(items)
+    key = coalescing_key("chat", items.query, params, history, inference.COLLECTIONS)
+    events = coalescer.stream("chat", key,
+                              functools.partial(inference.stream_chat_session,
+                                                query=items.query,
+                                                history=history,
+                                                params=params))
+    return StreamingResponse(to_ndjson(record_turn(events, session, items.query)),
+                             media_type="application/x-ndjson")
+
+
+@router.post("/direct-inference/stream")
+async def stream_direct_inference_session(items: InferencePayload):
+    """Stream the direct inference session as NDJSON events.
+    Args:
+        items (InferencePayload): The payload containing the query and parameters.
+
+    Returns:
+        StreamingResponse: "token" events followed by a "done" event.
+    """
+    logger.info(f"Streaming direct inference with query: {items.query}")
+    params = items.ai_model_parameters or AIModelParameters()
+
+    async def events():
+        yield {"type": "metadata", "sources": []}
+        try:
+            async for token in stream_model(prompt=items.query, parameters=params):
+                yield {"type": "token", "content": token}
+        except Exception as e:
+            logger.error(f"Error during model inference: {e}")
+            yield {"type": "error", "message": "An error occurred while generating the response."}
+        yield {"type": "done"}
+
+    key = coalescing_key("direct-inference-stream", items.query, params)
+    return StreamingResponse(to_ndjson(coalescer.stream("direct-inference-stream", key, events)),
+                             media_type="application/x-ndjson")
+
+
 @router.post("/ingestion", response_model=IngestionResponse)
-def invoke_ingestion_session(files: List[UploadFile] = File(...)):
-    """Invoke the ingestion session with the provided query and parameters.
+async def invoke_ingestion_session(files: List[UploadFile] = File(...),
+                                   collection: str = Query(settings.default_collection,
+                                                           pattern=COLLECTION_NAME_PATTERN)):
+    """Save the uploaded files and queue an ingestion job for them.
+
+    Each file is hashed and size-checked while it is written, once, to a
+    folder of its own, so concurrent uploads never see each other's files.
+    With ARCHIVE_UPLOADS disabled the folder is temporary and removed when
+    the job finishes.
+
     Args:
-        items (IngestionPayload): The payload containing the query and parameters.
+        files (List[UploadFile]): The uploaded PDF, DOCX, or TXT files.
+        collection (str): The collection to ingest into; created on first use.
 
     Returns:
-        IngestionResponse: The response from the ingestion session. 
+        IngestionResponse: The ID of the queued ingestion job. 
     """
+    names = set()
     for file in files:
-        file_path = f"{settings.src_data_path}/{file.filename}"
-        
-        with open(file_path, "wb") as f:
-            shutil.copyfileobj(file.file, f)
-            logger.info(f"File {file.filename} saved to {file_path}")
-    
-    ingestor = FileIngestor()
-    ingestor.start_ingestion_session()
-
-    # Return a success message
-    logger.info("Files ingested successfully.")
-    return IngestionResponse(message="Files ingested successfully.")
+        if Path(file.filename).suffix.lower() not in LOADER_MAPPING:
+            raise HTTPException(status_code=415, detail=f"Unsupported file type: {file.filename}")
+        # Documents are identified by file name, so two files of the same name would overwrite each other
+        name = FileIngestor.document_name(file.filename)
+        if name in names:
+            raise HTTPException(status_code=400, detail=f"Duplicate file name in upload: {name}")
+        names.add(name)
+
+    if settings.archive_uploads:
+        upload_dir = FileIngestor.collection_data_path(collection) / uuid.uuid4().hex
+        upload_dir.mkdir(parents=True, exist_ok=True)
+    else:
+        if settings.upload_temp_path:
+            Path(settings.upload_temp_path).mkdir(parents=True, exist_ok=True)
+        upload_dir = Path(tempfile.mkdtemp(prefix="upload-", dir=settings.upload_temp_path))
+
+    file_paths, file_hashes = [], {}
+    try:
+        for file in files:
+            file_path = upload_dir / Path(file.filename).name
+            # Disk writes run off the event loop so uploads do not stall streaming answers
+            file_hash, size = await asyncio.to_thread(spool_upload, file.file, file_path, settings.upload_max_bytes)
+            logger.info(f"File {file.filename} ({size} bytes) saved to {file_path}")
+            file_paths.append(file_path)
+            file_hashes[str(file_path)] = file_hash
+    except UploadTooLarge as e:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        raise HTTPException(status_code=413, detail=str(e))
+    except BaseException:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        raise
+
+    job = jobs.submit(file_paths,
+                      file_hashes=file_hashes,
+                      cleanup_dir=None if settings.archive_uploads else upload_dir,
+                      collection=collection)
+
+    logger.info(f"Files queued for ingestion as job {job.job_id}.")
+    return IngestionResponse(message="Files queued for ingestion.", job_id=job.job_id)
+
+
+@router.get("/ingestion/jobs", response_model=List[IngestionJobStatus])
+def list_ingestion_jobs():
+    """List the most recent ingestion jobs.
+
+    Returns:
+        List[IngestionJobStatus]: The jobs, newest first.
+    """
+    return jobs.list()
+
+
+@router.get("/ingestion/jobs/{job_id}", response_model=IngestionJobStatus)
+def get_ingestion_job(job_id: str):
+    """Report the status and per-file progress of an ingestion job.
+    Args:
+        job_id (str): The ID returned by the ingestion endpoint.
+
+    Returns:
+        IngestionJobStatus: The job status.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingestion job: {job_id}")
+    return job
+
+
+@router.get("/collections", response_model=List[CollectionInfo])
+def list_collections():
+    """List the collections in the vector store.
+
+    Returns:
+        List[CollectionInfo]: Each collection with its chunk and document counts.
+    """
+    return [CollectionInfo(name=collection,
+                           chunks=resources.get_collection(collection).count(),
+                           documents=len(resources.get_manifest(collection).list_documents()))
+            for collection in resources.list_collections()]
+
+
+@router.get("/documents", response_model=List[DocumentInfo])
+def list_documents(collection: str = Query(settings.default_collection, pattern=COLLECTION_NAME_PATTERN)):
+    """List the documents in a collection.
+    Args:
+        collection (str): The collection, defaults to the default collection.
+
+    Returns:
+        List[DocumentInfo]: Each document with its content hash and chunk count.
+    """
+    check_collections([collection])
+    return resources.get_manifest(collection).list_documents()
+
+
+@router.delete("/documents/{document}", response_model=DeletionResponse)
+def delete_document(document: str,
+                    collection: str = Query(settings.default_collection, pattern=COLLECTION_NAME_PATTERN)):
+    """Remove a document and its chunks from a collection.
+    Args:
+        document (str): The document (file) name.
+        collection (str): The collection, defaults to the default collection.
+
+    Returns:
+        DeletionResponse: The number of chunks deleted.
+    """
+    check_collections([collection])
+    if resources.get_manifest(collection).get_file_hash(document) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown document: {document}")
+
+    try:
+        with resources.writing(blocking=False), resources.claiming(collection, [document]):
+            deleted_chunks = FileIngestor(collection=collection).delete_document(document)
+            resources.get_lexical_index(collection).save()
+            resources.get_document_index(collection).save()
+            resources.reload_vector_store(collection)
+    except IndexBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return DeletionResponse(document=document, deleted_chunks=deleted_chunks)
+
+
+@router.get("/index/versions", response_model=List[IndexVersionInfo])
+def list_index_versions():
+    """List the index versions kept on disk, oldest first.
+
+    Returns:
+        List[IndexVersionInfo]: Each version with how it was built and whether it is active.
+    """
+    return resources.VERSIONS.list()
+
+
+@router.post("/index/maintenance", response_model=MaintenanceJobStatus)
+def start_index_maintenance(request: MaintenanceRequest):
+    """Build a new index version in the background, validate it and switch to it.
+
+    Searches keep being served from the active version while it is built.
+    Args:
+        request (MaintenanceRequest): "rebuild", "reembed" (with an embedder or
+            embeddings model), "compact" or "rollback".
+
+    Returns:
+        MaintenanceJobStatus: The queued job; poll /index/maintenance/{job_id}.
+    """
+    if request.kind == "reembed" and not (request.embedder or request.embeddings_model):
+        raise HTTPException(status_code=400, detail="A reembed needs an embedder or an embeddings model.")
+    if request.kind == "rollback" and request.version is not None:
+        if request.version not in {version["version"] for version in resources.VERSIONS.list()}:
+            raise HTTPException(status_code=404, detail=f"Unknown index version: {request.version}")
+    return maintenance.submit(request)
+
+
+@router.post("/index/rollback", response_model=MaintenanceJobStatus)
+def roll_back_index(request: Optional[RollbackRequest] = None):
+    """Switch back to a kept index version, by default the one the active version replaced.
+
+    Args:
+        request (RollbackRequest): The version to activate, if not the previous one.
+
+    Returns:
+        MaintenanceJobStatus: The queued rollback job.
+    """
+    version = request.version if request else None
+    return start_index_maintenance(MaintenanceRequest(kind="rollback", version=version))
+
+
+@router.get("/index/maintenance", response_model=List[MaintenanceJobStatus])
+def list_index_maintenance_jobs():
+    """List recent index maintenance jobs, newest first."""
+    return maintenance.list()
+
+
+@router.get("/index/maintenance/{job_id}", response_model=MaintenanceJobStatus)
+def get_index_maintenance_job(job_id: str):
+    """Report the progress of an index maintenance job.
+
+    Args:
+        job_id (str): The ID returned by /index/maintenance.
+
+    Returns:
+        MaintenanceJobStatus: The job status.
+    """
+    job = maintenance.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown maintenance job: {job_id}")
+    return job
+
+
+@router.get("/cache/stats")
+def get_cache_stats():
+    """Report hit/miss counters of the inference caches and of request coalescing.
+
+    Returns:
+        dict: Statistics per cache.
+    """
+    return {"embeddings": resources.get_embedding_cache().stats(),
+            "responses": resources.get_response_cache().stats(),
+            "coalescing": coalescer.stats()}
+
+
+
+@router.post("/sessions", response_model=SessionResponse)
+def create_session():
+    """Start a server-side conversation session.
+
+    Returns:
+        SessionResponse: The new, empty session; send its session_id with
+            inference and chat requests instead of the history.
+    """
+    return sessions.get_or_create().to_dict()
+
+
+@router.get("/sessions/{session_id}", response_model=SessionResponse)
+def get_session(session_id: str):
+    """Return the turns and running summary of a session.
+    Args:
+        session_id (str): The session ID.
+
+    Returns:
+        SessionResponse: The session.
+    """
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Unknown session: {session_id}")
+    return session.to_dict()
+
+
+@router.delete("/sessions/{session_id}")
+def delete_session(session_id: str):
+    """Forget a session.
+    Args:
+        session_id (str): The session ID.
+    """
+    if not sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail=f"Unknown session: {session_id}")
+    return {"session_id": session_id, "deleted": True}
@@ -1,32 +1,136 @@
 import os
+from pathlib import Path
+from typing import Dict, Optional
 from pydantic_settings import BaseSettings
 
+# Resources and default data folders are resolved against the package, not the working directory
+CORE_PATH = Path(__file__).resolve().parent
+BACKEND_PATH = CORE_PATH.parent
+
 # Load the prompt template from a file
 # This file contains the prompt template used for the AI model
-prompt_template = ""
-with open("app/be/core/prompt_template.txt", "r", encoding="utf-8") as file:
-    prompt_template = file.read()
-    
+prompt_template = (CORE_PATH / "prompt_template.txt").read_text(encoding="utf-8")
+
 class Settings(BaseSettings):
     """Application configuration settings."""
 
     openai_api_key: str
+    openai_base_url: Optional[str] = None  # OpenAI-compatible endpoint, e.g. the benchmark's fake server
     prompt_template: str = prompt_template
 
+    # Vector store backend settings
+    vector_backend: str = "chroma"  # "chroma" or "matrix" (memory-mapped NumPy matrix)
+    matrix_dtype: str = "float16"  # "float32", "float16" or "int8"
+    matrix_dimensions: Optional[int] = None  # keep only the leading (Matryoshka) components
+    matrix_coarse_dimensions: int = 256  # leading components scored in the first pass, 0 for all
+    matrix_rescore_factor: int = 4  # candidates re-scored exactly per requested result
+
     # Paths
-    vector_store_path: str = "app/be/data/vector_store"
-    src_data_path: str = "app/be/data/raw"
+    vector_store_path: str = str(BACKEND_PATH / "data" / "vector_store")
+    default_collection: str = "langchain"  # the collection used when a request names none
+    src_data_path: str = str(BACKEND_PATH / "data" / "raw")
 
     # Inference and ingestion settings
+    embedder: str = "openai"  # "openai" or "local" (deterministic, offline)
     embeddings_model: str = "text-embedding-3-large"
+    embedding_check_ctx_length: bool = True  # tiktoken-based splitting of over-long inputs
+    local_embedding_dimensions: int = 256
     llm_model: str = "gpt-3.5-turbo"
-    relevance_threshold: float = 0.6
+    min_cosine_similarity: float = 0.3  # minimum cosine similarity of a retrieved chunk
+    relevance_threshold: Optional[float] = None  # no longer read: was a relevance score, see min_cosine_similarity
+    retrieval_fetch_k: int = 20
+    mmr_lambda: float = 0.7
+    duplicate_similarity: float = 0.95
+    intent_min_margin: float = 0.05  # exemplar similarity margin below which the LLM classifies intent
+    speculative_retrieval: bool = True  # search while the intent is being classified
+    retrieval_workers: int = 8
+    shard_search_workers: int = 8  # concurrent collection queries of a fan-out search
+    retrieval_mode: str = "vector"  # "vector" or "hybrid" (BM25 + vector, rank-fused)
+    hybrid_fetch_k: int = 20
+    hybrid_vector_weight: float = 1.0
+    hybrid_lexical_weight: float = 1.0
+    hybrid_min_cosine_similarity: Optional[float] = None  # cosine floor of fused candidates, min_cosine_similarity if unset
+    rrf_k: int = 60
+    bm25_k1: float = 1.5
+    bm25_b: float = 0.75
+    hierarchical_retrieval: bool = False  # pick the top documents first, then search only their chunks
+    hierarchical_top_documents: int = 5  # documents kept per collection by the first stage
+    document_section_chunks: int = 8  # chunks per section summary of documents without pages
+    prompt_token_budget: int = 3000  # history + context + query, excluding the completion
     temperature: float = 0.0
     max_tokens: int = 750  
     top_p: float = 1.0
     frequency_penalty: float = 0.0
     presence_penalty: float = 0.0
 
+    # Resource management settings
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_timeout: float = 60.0
+    inference_timeout: float = 120.0  # seconds a non-streaming inference request may take
+    disconnect_poll_interval: float = 0.5
+    chat_client_cache_size: int = 32
+    warm_up_on_startup: bool = True  # open the vector store and clients in the background at startup
+
+    # Ingestion job settings
+    ingestion_workers: int = 2
+    ingestion_job_history: int = 100
+    ingestion_parse_workers: int = 2
+    ingestion_parse_window: int = 4
+    ingestion_batch_size: int = 64
+    ingestion_queue_size: int = 4
+    chunk_strategy: str = "structured"  # "structured" (tokens, page/heading/paragraph aware) or "character"
+    chunk_tokens: int = 400  # target chunk size in embedding-model tokens
+    chunk_tokens_by_type: Dict[str, int] = {".pdf": 350, ".docx": 450}  # per file suffix, else chunk_tokens
+    chunk_overlap_tokens: int = 40  # only between chunks cut inside a paragraph
+    chunk_min_tokens: int = 100  # shorter chunks are merged into a neighbour when they fit
+    chunk_max_tokens: Optional[int] = None  # longest chunk kept to avoid splitting a section, 1.5 x target by default
+    chunk_size: int = 500  # characters, "character" strategy
+    chunk_overlap: int = 200  # characters, "character" strategy
+    upload_max_bytes: int = 100 * 1024 * 1024  # per file
+    upload_temp_path: Optional[str] = None  # per-request upload folders, defaults to the system temp dir
+    archive_uploads: bool = True  # keep a copy of each upload under src_data_path
+
+    # Index maintenance settings
+    index_versions_kept: int = 2  # inactive index versions kept for rollback, besides the previous one
+    index_rebuild_concurrency: int = 2  # embed/store workers of a rebuild, fewer than ingestion to leave room for queries
+    index_copy_batch_size: int = 1000  # records copied per read by a compaction
+    index_validation_samples: int = 20  # stored chunks searched for to validate a new version
+    index_validation_min_recall: float = 0.9  # share of them that must come back in the top 5
+
+    # Embedding scheduler settings
+    embedding_batch_tokens: int = 20000
+    embedding_concurrency: int = 4
+    embedding_requests_per_minute: int = 3000
+    embedding_tokens_per_minute: int = 1000000
+    embedding_max_retries: int = 5
+    embedding_backoff_base: float = 1.0
+
+    # Batch inference settings
+    batch_max_items: int = 1000
+    batch_concurrency: int = 8
+
+    # Conversation session settings
+    session_max_count: int = 10000
+    session_ttl: float = 86400.0
+    history_recent_tokens: int = 600
+    history_summary_tokens: int = 250
+
+    # Cache settings
+    embedding_cache_size: int = 10000
+    embedding_cache_ttl: float = 86400.0
+    embedding_cache_path: Optional[str] = None
+    response_cache_enabled: bool = True
+    response_cache_size: int = 1000
+    response_cache_ttl: float = 3600.0
+    response_cache_max_temperature: float = 0.0
+    semantic_cache_enabled: bool = False
+    semantic_cache_distance: float = 0.05
+
+    # Request coalescing settings
+    coalescing_enabled: bool = True  # identical concurrent inference requests share one embedding/retrieval/generation
+    coalescing_normalization: str = "whitespace"  # query matching: "exact", "whitespace", "casefold" or "punctuation"
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -41,12 +145,9 @@ def created_directories(path: str):
     if not os.path.exists(path):
         os.makedirs(path, exist_ok=True)
 
-paths = [
-    "app/be/data/raw",
-    "app/be/data/vector_store"
-]
-
-for path in paths:
-    created_directories(path)
-
 settings = Settings()
+
+def create_data_directories():
+    """Create the configured data directories; called at startup rather than on import."""
+    for path in [settings.src_data_path, settings.vector_store_path]:
+        created_directories(path)
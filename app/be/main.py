@@ -1,9 +1,81 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import time
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from loguru import logger
 from app.be.api import routes
+from app.be.core.config import create_data_directories, settings
+from app.be.utils.jobs import jobs
+from app.be.utils.maintenance import maintenance
+from app.be.utils.metrics import (HTTP_REQUEST_SECONDS, REQUEST_ID_HEADER,
+                                  configure_logging, metrics, request_id_var)
+from app.be.utils.resources import resources
+from app.be.utils.sessions import sessions
 
-app = FastAPI(title="RAG AI Assistant App", version="1.0")
+configure_logging()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Own the shared resources for the lifetime of the application."""
+    create_data_directories()
+    if settings.relevance_threshold is not None:
+        logger.warning("RELEVANCE_THRESHOLD is no longer read: retrieval now filters by cosine similarity, "
+                       "set MIN_COSINE_SIMILARITY instead (see the README).")
+    if settings.warm_up_on_startup:
+        resources.start_warm_up()
+    else:
+        resources.READY.set()
+    yield
+    # Fail readiness first so load balancers stop routing to this worker
+    resources.READY.clear()
+    maintenance.shutdown()
+    jobs.shutdown()
+    sessions.shutdown()
+    await resources.aclose()
+
+app = FastAPI(title="RAG AI Assistant App", version="1.0", lifespan=lifespan)
 app.include_router(routes.router)
 
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    """Propagate the caller's request ID into the logs and time the request."""
+    request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers[REQUEST_ID_HEADER] = request_id
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                     method=request.method,
+                                     route=getattr(route, "path", "unmatched"),
+                                     status=status)
+        request_id_var.reset(token)
+
 @app.get("/")
 def root():
-    return {"status": "200 OK"}
\ No newline at end of file
+    return {"status": "200 OK"}
+
+@app.get("/health/live")
+def health_live():
+    """Liveness: the process is up and serving requests."""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def health_ready():
+    """Readiness: the vector store and clients are warm, so the worker can take traffic."""
+    if resources.READY.is_set():
+        return {"status": "ready"}
+    if resources.WARM_UP_ERROR:
+        return JSONResponse(status_code=503, content={"status": "failed", "error": resources.WARM_UP_ERROR})
+    return JSONResponse(status_code=503, content={"status": "starting"})
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Expose latency histograms and counters in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
@@ -1,7 +1,12 @@
-from typing import Optional
-from pydantic import BaseModel
+from typing import List, Optional
+from pydantic import BaseModel, Field, StringConstraints
+from typing_extensions import Annotated
 from app.be.core.config import settings
 
+# Chroma collection names: 3-63 characters of [a-zA-Z0-9._-], starting and ending alphanumeric
+COLLECTION_NAME_PATTERN = r"^[a-zA-Z0-9][a-zA-Z0-9._-]{1,61}[a-zA-Z0-9]$"
+CollectionName = Annotated[str, StringConstraints(pattern=COLLECTION_NAME_PATTERN)]
+
 class AIModelParameters(BaseModel):
     temperature: Optional[float] = settings.temperature
     max_tokens: Optional[int] = settings.max_tokens
@@ -12,8 +17,21 @@ class AIModelParameters(BaseModel):
 class InferencePayload(BaseModel):
     query: str 
     history: Optional[str] = None
+    session_id: Optional[str] = None  # server-side history; takes precedence over history
+    collections: Optional[List[CollectionName]] = Field(default=None, min_length=1)  # searched together; default collection if omitted
     ai_model_parameters: Optional[AIModelParameters] = None
 
 class InferenceResponse(BaseModel):
     response: str
 
+class BatchInferencePayload(BaseModel):
+    items: List[InferencePayload]
+    concurrency: Optional[int] = None  # LLM calls in flight, capped by the server
+
+class BatchInferenceResult(BaseModel):
+    index: int
+    response: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchInferenceResponse(BaseModel):
+    results: List[BatchInferenceResult]
@@ -1,5 +1,50 @@
+from typing import Dict, List, Optional
 from pydantic import BaseModel
+from app.be.core.config import settings
 
 class IngestionResponse(BaseModel):
     message: str
+    job_id: Optional[str] = None
 
+class CollectionInfo(BaseModel):
+    name: str
+    chunks: int
+    documents: int
+
+class DocumentInfo(BaseModel):
+    document: str
+    file_hash: str
+    updated_at: float
+    chunks: int
+
+class DeletionResponse(BaseModel):
+    document: str
+    deleted_chunks: int
+
+class FileProgress(BaseModel):
+    name: str
+    stage: str = "queued"
+    pages: int = 0
+    chunks: int = 0
+    error: Optional[str] = None
+
+class IngestionJobStatus(BaseModel):
+    job_id: str
+    collection: str = settings.default_collection
+    status: str = "queued"
+    files: List[FileProgress] = []
+    documents: int = 0
+    pages: int = 0
+    chunks: int = 0
+    unchanged_documents: int = 0
+    reused_chunks: int = 0
+    deleted_chunks: int = 0
+    chunk_strategy: Optional[str] = None
+    chunk_tokens: int = 0
+    embedded_tokens: int = 0
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    chunks_per_second: Optional[float] = None
+    stages: Dict[str, dict] = {}
\ No newline at end of file
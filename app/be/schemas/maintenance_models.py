@@ -0,0 +1,45 @@
+from typing import Dict, Literal, Optional
+from pydantic import BaseModel
+
+class MaintenanceRequest(BaseModel):
+    kind: Literal["rebuild", "reembed", "compact", "rollback"]
+    embedder: Optional[str] = None  # "reembed": the embedder of the new version, defaults to the active one's
+    embeddings_model: Optional[str] = None  # "reembed": the embedding model of the new version
+    version: Optional[str] = None  # "rollback": the version to activate, defaults to the previous one
+    activate: bool = True  # switch readers to the new version once it validates
+    allow_missing_documents: bool = False  # accept a rebuild without documents whose files are gone
+
+class RollbackRequest(BaseModel):
+    version: Optional[str] = None
+
+class IndexVersionInfo(BaseModel):
+    version: str
+    kind: str
+    status: str
+    active: bool = False
+    previous: bool = False
+    parent: Optional[str] = None
+    embedder: Optional[str] = None
+    embeddings_model: Optional[str] = None
+    created_at: Optional[float] = None
+    collections: Dict[str, dict] = {}
+    error: Optional[str] = None
+
+class MaintenanceJobStatus(BaseModel):
+    job_id: str
+    kind: str
+    status: str = "queued"
+    stage: Optional[str] = None
+    version: Optional[str] = None
+    previous_version: Optional[str] = None
+    embedder: Optional[str] = None
+    embeddings_model: Optional[str] = None
+    activate: bool = True
+    allow_missing_documents: bool = False
+    activated: bool = False
+    collections: Dict[str, dict] = {}
+    pruned_versions: list = []
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
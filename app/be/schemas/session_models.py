@@ -0,0 +1,14 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+class Turn(BaseModel):
+    user: str
+    assistant: Optional[str] = None
+
+class SessionResponse(BaseModel):
+    session_id: str
+    turns: List[Turn] = []
+    summary: str = ""
+    summarized_turns: int = 0
+    created_at: float
+    updated_at: float
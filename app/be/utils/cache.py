@@ -0,0 +1,390 @@
+from array import array
+import asyncio
+from collections import OrderedDict
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+# Third-party libraries
+from loguru import logger
+import numpy as np
+
+if TYPE_CHECKING:
+    # Not imported at runtime: langchain_core pulls in langsmith, which dominates import time
+    from langchain_core.embeddings import Embeddings
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace and case so trivially different queries share a key."""
+    return " ".join(text.split()).casefold()
+
+class EmbeddingCache:
+    """Bounded LRU cache of query embeddings with TTL eviction.
+
+    An optional sqlite file acts as a persistent second tier that survives
+    restarts and is shared by every worker pointing at the same path.
+    """
+
+    def __init__(self,
+                 max_size: int = 10000,
+                 ttl: float = 86400.0,
+                 persist_path: Optional[str] = None):
+        """
+        Initialize the EmbeddingCache.
+
+        Args:
+            max_size (int): Maximum number of embeddings kept in memory.
+            ttl (float): Seconds an entry stays valid, 0 disables expiry.
+            persist_path (str): Optional sqlite file for the persistent tier.
+        """
+        self.MAX_SIZE = max_size
+        self.TTL = ttl
+        self.PERSIST_PATH = persist_path
+
+        self.LOCK = threading.Lock()
+        self.ENTRIES = OrderedDict()
+        self.DB = self.initiate_persistent_tier() if persist_path else None
+
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def initiate_persistent_tier(self) -> sqlite3.Connection:
+        """Open the sqlite file backing the persistent tier."""
+        logger.info(f"Opening persistent embedding cache at {self.PERSIST_PATH}")
+        db = sqlite3.connect(self.PERSIST_PATH, check_same_thread=False, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        db.commit()
+        return db
+
+    @staticmethod
+    def make_key(text: str, model: str) -> str:
+        """Build the cache key from the model name and the normalized text."""
+        payload = f"{model}\x00{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def is_expired(self, created_at: float) -> bool:
+        return self.TTL > 0 and time.time() - created_at > self.TTL
+
+    def get(self, text: str, model: str) -> Optional[List[float]]:
+        """
+        Look up the embedding of a text.
+
+        Args:
+            text (str): The text that was embedded.
+            model (str): The embedding model name.
+
+        Returns:
+            list: The cached embedding, or None on a miss.
+        """
+        key = self.make_key(text, model)
+        with self.LOCK:
+            entry = self.ENTRIES.get(key)
+            if entry is not None:
+                vector, created_at = entry
+                if not self.is_expired(created_at):
+                    self.ENTRIES.move_to_end(key)
+                    self.hits += 1
+                    return vector
+                del self.ENTRIES[key]
+
+            if self.DB is not None:
+                row = self.DB.execute(
+                    "SELECT vector, created_at FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and not self.is_expired(row[1]):
+                    vector = array("f", row[0]).tolist()
+                    self.store(key, vector, row[1])
+                    self.persistent_hits += 1
+                    return vector
+
+            self.misses += 1
+            return None
+
+    def set(self, text: str, model: str, vector: List[float]):
+        """
+        Store the embedding of a text in both tiers.
+
+        Args:
+            text (str): The text that was embedded.
+            model (str): The embedding model name.
+            vector (list): The embedding.
+        """
+        key = self.make_key(text, model)
+        created_at = time.time()
+        with self.LOCK:
+            self.store(key, vector, created_at)
+            if self.DB is not None:
+                self.DB.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                    (key, array("f", vector).tobytes(), created_at)
+                )
+                self.DB.commit()
+
+    def store(self, key: str, vector: List[float], created_at: float):
+        """Insert into the memory tier, evicting the least recently used entry."""
+        self.ENTRIES[key] = (vector, created_at)
+        self.ENTRIES.move_to_end(key)
+        while len(self.ENTRIES) > self.MAX_SIZE:
+            self.ENTRIES.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry from both tiers."""
+        with self.LOCK:
+            self.ENTRIES.clear()
+            if self.DB is not None:
+                self.DB.execute("DELETE FROM embeddings")
+                self.DB.commit()
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current size."""
+        with self.LOCK:
+            lookups = self.hits + self.persistent_hits + self.misses
+            return {
+                "size": len(self.ENTRIES),
+                "hits": self.hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.persistent_hits) / lookups if lookups else 0.0
+            }
+
+class CachedEmbeddings:
+    """Embeddings wrapper that serves query embeddings from an EmbeddingCache.
+
+    Document embeddings made during ingestion pass straight through, so the
+    cache only holds what users actually ask. It implements the langchain
+    Embeddings interface without subclassing it, which keeps langchain out
+    of the import path.
+    """
+
+    def __init__(self, embeddings: "Embeddings", cache: EmbeddingCache, model: str):
+        """
+        Initialize the CachedEmbeddings wrapper.
+
+        Args:
+            embeddings (Embeddings): The underlying embedding client.
+            cache (EmbeddingCache): The cache consulted for queries.
+            model (str): The embedding model name, part of every key.
+        """
+        self.EMBEDDINGS = embeddings
+        self.CACHE = cache
+        self.MODEL = model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.EMBEDDINGS.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.EMBEDDINGS.aembed_documents(texts)
+
+    def lookup(self, texts: List[str]) -> Dict[str, Optional[List[float]]]:
+        found = {}
+        for text in texts:
+            if text not in found:
+                found[text] = self.CACHE.get(text, self.MODEL)
+        return found
+
+    def remember(self, texts: List[str], vectors: List[List[float]]):
+        for text, vector in zip(texts, vectors):
+            self.CACHE.set(text, self.MODEL, vector)
+
+    async def offload(self, function, *args):
+        """Run a cache call in a thread when it may query or write the sqlite tier, inline otherwise."""
+        if self.CACHE.DB is None:
+            return function(*args)
+        return await asyncio.to_thread(function, *args)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed many queries, sending only the cache misses in a single request."""
+        found = self.lookup(texts)
+        missing = [text for text, vector in found.items() if vector is None]
+        if missing:
+            vectors = self.EMBEDDINGS.embed_documents(missing)
+            found.update(zip(missing, vectors))
+            self.remember(missing, vectors)
+        return [found[text] for text in texts]
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        found = await self.offload(self.lookup, texts)
+        missing = [text for text, vector in found.items() if vector is None]
+        if missing:
+            vectors = await self.EMBEDDINGS.aembed_documents(missing)
+            found.update(zip(missing, vectors))
+            await self.offload(self.remember, missing, vectors)
+        return [found[text] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.CACHE.get(text, self.MODEL)
+        if vector is None:
+            vector = self.EMBEDDINGS.embed_query(text)
+            self.CACHE.set(text, self.MODEL, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vector = await self.offload(self.CACHE.get, text, self.MODEL)
+        if vector is None:
+            vector = await self.EMBEDDINGS.aembed_query(text)
+            await self.offload(self.CACHE.set, text, self.MODEL, vector)
+        return vector
+
+class ResponseCache:
+    """Cache of LLM responses with an exact and an optional semantic tier.
+
+    The exact tier is keyed on the fully rendered prompt plus the model
+    parameters. The semantic tier reuses an answer when a new query embeds
+    within a cosine distance of a cached query and retrieval returned the
+    same chunks under the same history and parameters.
+    """
+
+    def __init__(self,
+                 max_size: int = 1000,
+                 ttl: float = 3600.0,
+                 semantic_enabled: bool = False,
+                 semantic_distance: float = 0.05):
+        """
+        Initialize the ResponseCache.
+
+        Args:
+            max_size (int): Maximum number of entries per tier.
+            ttl (float): Seconds an entry stays valid, 0 disables expiry.
+            semantic_enabled (bool): Whether the semantic tier is consulted.
+            semantic_distance (float): Maximum cosine distance for a semantic hit.
+        """
+        self.MAX_SIZE = max_size
+        self.TTL = ttl
+        self.SEMANTIC_ENABLED = semantic_enabled
+        self.SEMANTIC_DISTANCE = semantic_distance
+
+        self.LOCK = threading.Lock()
+        self.ENTRIES = OrderedDict()
+        self.SEMANTIC_ENTRIES = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.semantic_hits = 0
+        self.semantic_misses = 0
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """Hash arbitrary JSON-serializable parts into a cache key."""
+        payload = json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def is_expired(self, created_at: float) -> bool:
+        return self.TTL > 0 and time.time() - created_at > self.TTL
+
+    def get(self, prompt: str, model: str, parameters: dict) -> Optional[str]:
+        """
+        Look up a response by its exact prompt.
+
+        Args:
+            prompt (str): The fully rendered prompt.
+            model (str): The LLM model name.
+            parameters (dict): The model parameters.
+
+        Returns:
+            str: The cached response, or None on a miss.
+        """
+        key = self.make_key(model, prompt, parameters)
+        with self.LOCK:
+            entry = self.ENTRIES.get(key)
+            if entry is not None:
+                response, created_at = entry
+                if not self.is_expired(created_at):
+                    self.ENTRIES.move_to_end(key)
+                    self.hits += 1
+                    return response
+                del self.ENTRIES[key]
+            self.misses += 1
+            return None
+
+    def set(self, prompt: str, model: str, parameters: dict, response: str):
+        """Store a response under its exact prompt."""
+        key = self.make_key(model, prompt, parameters)
+        with self.LOCK:
+            self.ENTRIES[key] = (response, time.time())
+            self.ENTRIES.move_to_end(key)
+            while len(self.ENTRIES) > self.MAX_SIZE:
+                self.ENTRIES.popitem(last=False)
+
+    def get_similar(self,
+                    query_embedding: Sequence[float],
+                    chunk_ids: Sequence[str],
+                    scope: tuple) -> Optional[str]:
+        """
+        Look up a response for a semantically close query.
+
+        Args:
+            query_embedding (list): Embedding of the new query.
+            chunk_ids (list): IDs of the chunks retrieved for the new query.
+            scope (tuple): Anything else the answer depends on (history, parameters).
+
+        Returns:
+            str: The cached response, or None on a miss.
+        """
+        if not self.SEMANTIC_ENABLED:
+            return None
+
+        key = self.make_key(sorted(chunk_ids), scope)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        with self.LOCK:
+            candidates = [(entry_id, entry) for entry_id, entry in self.SEMANTIC_ENTRIES.items()
+                          if entry[0] == key and not self.is_expired(entry[3])]
+            if candidates:
+                matrix = np.stack([entry[1] for _, entry in candidates])
+                distances = 1.0 - matrix @ query
+                best = int(np.argmin(distances))
+                if distances[best] <= self.SEMANTIC_DISTANCE:
+                    entry_id, entry = candidates[best]
+                    self.SEMANTIC_ENTRIES.move_to_end(entry_id)
+                    self.semantic_hits += 1
+                    return entry[2]
+            self.semantic_misses += 1
+            return None
+
+    def set_similar(self,
+                    query_embedding: Sequence[float],
+                    chunk_ids: Sequence[str],
+                    scope: tuple,
+                    response: str):
+        """Store a response in the semantic tier."""
+        if not self.SEMANTIC_ENABLED:
+            return
+
+        key = self.make_key(sorted(chunk_ids), scope)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        entry_id = self.make_key(key, query.tobytes().hex())
+        with self.LOCK:
+            self.SEMANTIC_ENTRIES[entry_id] = (key, query, response, time.time())
+            self.SEMANTIC_ENTRIES.move_to_end(entry_id)
+            while len(self.SEMANTIC_ENTRIES) > self.MAX_SIZE:
+                self.SEMANTIC_ENTRIES.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached response, e.g. after the vector store changed."""
+        with self.LOCK:
+            self.ENTRIES.clear()
+            self.SEMANTIC_ENTRIES.clear()
+
+    def stats(self) -> dict:
+        """Return hit/miss counters, each tier's hit rate over its own lookups, and the current sizes."""
+        with self.LOCK:
+            lookups = self.hits + self.misses
+            semantic_lookups = self.semantic_hits + self.semantic_misses
+            return {
+                "size": len(self.ENTRIES),
+                "semantic_size": len(self.SEMANTIC_ENTRIES),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "semantic_hits": self.semantic_hits,
+                "semantic_misses": self.semantic_misses,
+                "semantic_hit_rate": self.semantic_hits / semantic_lookups if semantic_lookups else 0.0
+            }
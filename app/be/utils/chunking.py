@@ -0,0 +1,259 @@
+import re
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+# Custom libraries
+from app.be.utils.tokens import count_tokens
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+BLANK_LINES = re.compile(r"\n[ \t]*\n\s*")
+SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+(?=[\"'(\[]?[A-Z0-9])")
+WORD = re.compile(r"\S+")
+HEADING = re.compile(
+    r"^(?:#{1,6}\s+\S.*"                                   # Markdown
+    r"|(?:\d+(?:\.\d+)*\.?|[IVXLC]+\.|[A-Z]\.)\s+[A-Z][^.!?]{0,80}"  # 1.2 Scope / IV. Results / A. Terms
+    r"|(?:Chapter|Section|Part|Appendix)\s+\S+.{0,80}"
+    r"|[A-Z][A-Z0-9 ,&/()'-]{2,80})$"                      # ALL CAPS
+)
+BULLET = re.compile(r"^\s*(?:[-*•▪]|\d+[.)])\s+")
+
+# A wrapped PDF line shorter than this share of the block's longest line,
+# ending a sentence, is taken as the last line of a paragraph
+SHORT_LINE_RATIO = 0.85
+
+def is_heading(line: str) -> bool:
+    """Tell whether a standalone line looks like a heading."""
+    line = line.strip()
+    return 0 < len(line) <= 100 and bool(HEADING.match(line))
+
+class Piece:
+    """An unbreakable span of a page: a heading, a paragraph, a sentence or a run of words."""
+
+    def __init__(self, start: int, end: int, tokens: int, heading: bool = False, paragraph_start: bool = False):
+        self.start = start
+        self.end = end
+        self.tokens = tokens
+        self.heading = heading
+        self.paragraph_start = paragraph_start
+
+class StructuredChunker:
+    """Token-measured chunker that cuts at page, heading, paragraph and sentence boundaries.
+
+    A page is broken into blocks: headings, and paragraphs, which for PDF
+    text are recovered from short sentence-ending lines. Paragraphs that fit
+    are kept whole and packed together up to ``chunk_tokens``. A heading
+    always opens a chunk, so it stays with the text it introduces. Longer
+    paragraphs are split by sentence and, as a last resort, by words. Only
+    chunks cut inside a paragraph overlap, by up to ``overlap_tokens`` of
+    whole sentences. Sizes adapt to the structure: a section that
+    overflows the target by less than ``max_tokens`` is kept in one chunk,
+    and a short tail is folded into the chunk before it.
+    """
+
+    def __init__(self,
+                 chunk_tokens: int = 400,
+                 overlap_tokens: int = 40,
+                 min_tokens: int = 100,
+                 max_tokens: Optional[int] = None,
+                 model: Optional[str] = None):
+        """
+        Initialize the StructuredChunker.
+
+        Args:
+            chunk_tokens (int): Target chunk size in model tokens.
+            overlap_tokens (int): Overlap between chunks cut inside a paragraph.
+            min_tokens (int): Chunks smaller than this are merged into a neighbour
+                when the result stays within max_tokens.
+            max_tokens (int): Hard limit of a chunk, defaults to 1.5 x chunk_tokens.
+            model (str): Model whose tokenizer measures the text, defaults to
+                the embeddings model.
+        """
+        self.CHUNK_TOKENS = chunk_tokens
+        self.OVERLAP_TOKENS = overlap_tokens
+        self.MIN_TOKENS = min(min_tokens, chunk_tokens)
+        self.MAX_TOKENS = max(max_tokens or int(chunk_tokens * 1.5), chunk_tokens)
+        self.MODEL = model
+
+    def count(self, text: str) -> int:
+        return count_tokens(text, self.MODEL)
+
+    def split_blocks(self, text: str) -> List[Tuple[int, int, bool]]:
+        """
+        Split a page into heading and paragraph blocks.
+
+        Args:
+            text (str): The page text.
+
+        Returns:
+            list: (start, end, is_heading) character spans, in order.
+        """
+        blocks = []
+        position = 0
+        for separator in list(BLANK_LINES.finditer(text)) + [None]:
+            end = separator.start() if separator else len(text)
+            lines = []
+            offset = position
+            for line in text[position:end].split("\n"):
+                if line.strip():
+                    lines.append((offset, offset + len(line), line))
+                offset += len(line) + 1
+            position = separator.end() if separator else len(text)
+            if not lines:
+                continue
+
+            width = max(len(line.rstrip()) for _, _, line in lines)
+            block_start = None
+            for i, (start, stop, line) in enumerate(lines):
+                if is_heading(line) and (len(lines) == 1 or i == 0 or lines[i - 1][2].rstrip()[-1:] in ".!?:"):
+                    if block_start is not None:
+                        blocks.append((block_start, lines[i - 1][1], False))
+                    blocks.append((start, stop, True))
+                    block_start = None
+                    continue
+                if block_start is None:
+                    block_start = start
+                following = lines[i + 1][2] if i + 1 < len(lines) else None
+                ends_paragraph = following is None or BULLET.match(following) or (
+                    line.rstrip()[-1:] in ".!?:" and len(line.rstrip()) < SHORT_LINE_RATIO * width
+                )
+                if ends_paragraph:
+                    blocks.append((block_start, stop, False))
+                    block_start = None
+        return [(start + len(text[start:end]) - len(text[start:end].lstrip()),
+                 end - (len(text[start:end]) - len(text[start:end].rstrip())),
+                 heading)
+                for start, end, heading in blocks if text[start:end].strip()]
+
+    def split_long(self, text: str, start: int, end: int, pattern: re.Pattern) -> List[Tuple[int, int]]:
+        """Cut a span at every match of a separator pattern."""
+        spans, position = [], start
+        for match in pattern.finditer(text, start, end):
+            spans.append((position, match.start()))
+            position = match.end()
+        spans.append((position, end))
+        return [(s, e) for s, e in spans if text[s:e].strip()]
+
+    def split_words(self, text: str, start: int, end: int) -> List[Piece]:
+        """Last resort for a sentence longer than a chunk: runs of whole words."""
+        pieces, run_start, run_end, run_tokens = [], None, None, 0
+        for word in WORD.finditer(text, start, end):
+            tokens = self.count(word.group()) + 1
+            if run_start is not None and run_tokens + tokens > self.CHUNK_TOKENS:
+                pieces.append(Piece(run_start, run_end, run_tokens))
+                run_start, run_tokens = None, 0
+            if run_start is None:
+                run_start = word.start()
+            run_end = word.end()
+            run_tokens += tokens
+        if run_start is not None:
+            pieces.append(Piece(run_start, run_end, run_tokens))
+        return pieces
+
+    def split_pieces(self, text: str) -> List[Piece]:
+        """Break a page into pieces no larger than a chunk."""
+        pieces = []
+        for start, end, heading in self.split_blocks(text):
+            tokens = self.count(text[start:end])
+            if tokens <= self.CHUNK_TOKENS:
+                pieces.append(Piece(start, end, tokens, heading=heading, paragraph_start=True))
+                continue
+            first = True
+            for sentence_start, sentence_end in self.split_long(text, start, end, SENTENCE_END):
+                sentence_tokens = self.count(text[sentence_start:sentence_end])
+                parts = ([Piece(sentence_start, sentence_end, sentence_tokens)]
+                         if sentence_tokens <= self.CHUNK_TOKENS
+                         else self.split_words(text, sentence_start, sentence_end))
+                parts[0].paragraph_start = first
+                first = False
+                pieces.extend(parts)
+        return pieces
+
+    def pack(self, pieces: List[Piece]) -> List[Tuple[int, int]]:
+        """
+        Group consecutive pieces into chunks.
+
+        Args:
+            pieces (list): The pieces of a page.
+
+        Returns:
+            list: (first, last) piece indexes (inclusive) of each chunk.
+        """
+        def section_end(i: int) -> int:
+            while i + 1 < len(pieces) and not pieces[i + 1].heading:
+                i += 1
+            return i
+
+        chunks = []
+        i = 0
+        while i < len(pieces):
+            tokens = pieces[i].tokens
+            j = i
+            while j + 1 < len(pieces):
+                following = pieces[j + 1]
+                if following.heading and tokens >= self.MIN_TOKENS:
+                    break
+                if tokens + following.tokens > self.CHUNK_TOKENS:
+                    # Keep a slightly longer section whole rather than leave a stub
+                    end = section_end(j)
+                    rest = sum(piece.tokens for piece in pieces[j + 1:end + 1])
+                    if end > j and tokens + rest <= self.MAX_TOKENS:
+                        j, tokens = end, tokens + rest
+                    break
+                j += 1
+                tokens += following.tokens
+            # A heading never ends a chunk; it moves on with the text it introduces
+            if j > i and pieces[j].heading:
+                j -= 1
+            chunks.append((i, j))
+
+            # Overlap only when the cut falls inside a paragraph
+            next_start = j + 1
+            if next_start < len(pieces) and not pieces[next_start].paragraph_start:
+                overlap, k = 0, next_start
+                while k - 1 > i and not pieces[k].paragraph_start and \
+                        overlap + pieces[k - 1].tokens <= self.OVERLAP_TOKENS:
+                    k -= 1
+                    overlap += pieces[k].tokens
+                next_start = k
+            i = next_start
+
+        # Fold a short tail into the chunk before it
+        if len(chunks) > 1:
+            tail_first, tail_last = chunks[-1]
+            first, last = chunks[-2]
+            tail_tokens = sum(piece.tokens for piece in pieces[max(tail_first, last + 1):tail_last + 1])
+            total = sum(piece.tokens for piece in pieces[first:tail_last + 1])
+            if tail_tokens < self.MIN_TOKENS and total <= self.MAX_TOKENS:
+                chunks[-2:] = [(first, tail_last)]
+        return chunks
+
+    def split_text(self, text: str) -> List[Tuple[int, str]]:
+        """
+        Chunk a page.
+
+        Args:
+            text (str): The page text.
+
+        Returns:
+            list: (start_index, chunk text) pairs.
+        """
+        pieces = self.split_pieces(text)
+        return [(pieces[first].start, text[pieces[first].start:pieces[last].end])
+                for first, last in self.pack(pieces)]
+
+    def split_documents(self, documents: List["Document"]) -> List["Document"]:
+        """
+        Chunk loaded documents page by page; chunks never span pages.
+
+        Args:
+            documents (list): Pages (or whole files) from the loaders.
+
+        Returns:
+            list: The chunks, with the page's metadata plus ``start_index``.
+        """
+        from langchain_core.documents import Document
+
+        return [Document(page_content=chunk, metadata={**document.metadata, "start_index": start})
+                for document in documents
+                for start, chunk in self.split_text(document.page_content)]
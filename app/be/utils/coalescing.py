@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import json
+import string
+from typing import AsyncIterator, Awaitable, Callable, Dict
+
+# Third-party libraries
+from loguru import logger
+
+# Custom libraries
+from app.be.core.config import settings
+from app.be.utils.cache import normalize_text
+from app.be.utils.metrics import COALESCED_REQUESTS
+
+NORMALIZATIONS = ("exact", "whitespace", "casefold", "punctuation")
+PUNCTUATION = str.maketrans("", "", string.punctuation)
+
+def normalize_query(query: str, normalization: str) -> str:
+    """
+    Reduce a query to the form under which identical requests are recognised.
+
+    Args:
+        query (str): The user's query.
+        normalization (str): "exact" keeps the text as is, "whitespace"
+            collapses whitespace, "casefold" also ignores case and
+            "punctuation" also drops punctuation.
+
+    Returns:
+        str: The normalized query.
+    """
+    if normalization == "exact":
+        return query
+    if normalization == "whitespace":
+        return " ".join(query.split())
+    if normalization == "casefold":
+        return normalize_text(query)
+    if normalization == "punctuation":
+        return normalize_text(query.translate(PUNCTUATION))
+    raise ValueError(f"Unknown coalescing normalization: {normalization}")
+
+class Flight:
+    """One in-flight piece of work and the requests waiting on it."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.LOOP = loop
+        self.TASK = None
+        self.WAITERS = 0
+        # Streams only: the events produced so far, replayed to late joiners
+        self.EVENTS = []
+        self.CHANGED = asyncio.Event()
+        self.DONE = False
+        self.ERROR = None
+
+    def notify(self):
+        """Wake the subscribers waiting for the next event."""
+        self.CHANGED.set()
+        self.CHANGED = asyncio.Event()
+
+class RequestCoalescer:
+    """Single-flight execution of identical concurrent inference requests.
+
+    The first request for a key (the leader) starts the work as its own
+    task; identical requests arriving while it runs (followers) wait for
+    the same result, or subscribe to the same stream and get the events
+    produced so far replayed before the live ones. The work is cancelled
+    only when every waiting request has gone away, so one client
+    disconnecting does not fail the others. Finished work is forgotten at
+    once: later requests start afresh, and the response cache answers
+    them if the generation was cacheable.
+    """
+
+    def __init__(self, enabled: bool = settings.coalescing_enabled,
+                 normalization: str = settings.coalescing_normalization):
+        """
+        Initialize the RequestCoalescer.
+
+        Args:
+            enabled (bool): Whether identical requests are coalesced at all.
+            normalization (str): How queries are normalized into keys, see normalize_query.
+        """
+        if normalization not in NORMALIZATIONS:
+            raise ValueError(f"Unknown coalescing normalization: {normalization}")
+        self.ENABLED = enabled
+        self.NORMALIZATION = normalization
+        self.FLIGHTS: Dict[str, Flight] = {}
+
+        self.leaders = 0
+        self.followers = 0
+
+    def make_key(self, kind: str, query: str, **scope) -> str:
+        """
+        Build the key under which identical requests meet.
+
+        Args:
+            kind (str): The endpoint, since each produces a different result shape.
+            query (str): The user's query, normalized as configured.
+            **scope: Everything else the result depends on (history,
+                parameters, collections, model, index version). Must be
+                JSON-serializable.
+
+        Returns:
+            str: The key.
+        """
+        payload = json.dumps([kind, normalize_query(query, self.NORMALIZATION), scope],
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def join(self, key: str, kind: str) -> tuple:
+        """Return the live flight for the key on this event loop, or a new one, and whether it is new."""
+        loop = asyncio.get_running_loop()
+        flight = self.FLIGHTS.get(key)
+        leader = flight is None or flight.LOOP is not loop or flight.DONE
+        if leader:
+            flight = Flight(loop)
+            self.FLIGHTS[key] = flight
+            self.leaders += 1
+        else:
+            self.followers += 1
+            logger.info(f"Joining an identical in-flight {kind} request.")
+        COALESCED_REQUESTS.inc(kind=kind, role="leader" if leader else "follower")
+        flight.WAITERS += 1
+        return flight, leader
+
+    def land(self, key: str, flight: Flight):
+        """Forget a finished flight, unless a newer one already took its key."""
+        flight.DONE = True
+        if self.FLIGHTS.get(key) is flight:
+            del self.FLIGHTS[key]
+
+    def leave(self, key: str, flight: Flight):
+        """Drop a waiter, cancelling the work once nobody waits for it."""
+        flight.WAITERS -= 1
+        if flight.WAITERS == 0 and flight.TASK is not None and not flight.TASK.done():
+            logger.info("Every coalesced request went away, cancelling the shared work.")
+            # Landed right away, so a request arriving now starts afresh instead of joining a cancelled task
+            self.land(key, flight)
+            flight.TASK.cancel()
+
+    async def run(self, kind: str, key: str, work: Callable[[], Awaitable]):
+        """
+        Await the work, sharing it with identical requests already in flight.
+
+        Args:
+            kind (str): The endpoint, for the metrics.
+            key (str): The request key from make_key.
+            work (Callable): Starts the work; only called by the leader.
+
+        Returns:
+            The result of the work (its exception is raised to every waiter).
+        """
+        if not self.ENABLED:
+            return await work()
+        flight, leader = self.join(key, kind)
+        if leader:
+            flight.TASK = asyncio.ensure_future(work())
+            flight.TASK.add_done_callback(lambda _: self.land(key, flight))
+        try:
+            # Shielded so a waiter's cancellation only cancels the shared task through leave()
+            return await asyncio.shield(flight.TASK)
+        finally:
+            self.leave(key, flight)
+
+    async def stream(self, kind: str, key: str, events: Callable[[], AsyncIterator[dict]]) -> AsyncIterator[dict]:
+        """
+        Stream the events, sharing one stream with identical requests already in flight.
+
+        Args:
+            kind (str): The endpoint, for the metrics.
+            key (str): The request key from make_key.
+            events (Callable): Opens the event stream; only called by the leader.
+
+        Yields:
+            dict: Every event of the shared stream, from the first one.
+        """
+        if not self.ENABLED:
+            async for event in events():
+                yield event
+            return
+        flight, leader = self.join(key, kind)
+        if leader:
+            flight.TASK = asyncio.ensure_future(self.pump(key, flight, events()))
+        try:
+            position = 0
+            while True:
+                while position < len(flight.EVENTS):
+                    yield flight.EVENTS[position]
+                    position += 1
+                if flight.DONE:
+                    if flight.ERROR is not None:
+                        raise flight.ERROR
+                    return
+                await flight.CHANGED.wait()
+        finally:
+            self.leave(key, flight)
+
+    async def pump(self, key: str, flight: Flight, events: AsyncIterator[dict]):
+        """Read the leader's stream into the flight's buffer, waking subscribers per event."""
+        try:
+            async for event in events:
+                flight.EVENTS.append(event)
+                flight.notify()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            flight.ERROR = e
+        finally:
+            self.land(key, flight)
+            flight.notify()
+            await events.aclose()
+
+    def stats(self) -> dict:
+        return {"enabled": self.ENABLED,
+                "normalization": self.NORMALIZATION,
+                "leaders": self.leaders,
+                "followers": self.followers,
+                "in_flight": len(self.FLIGHTS)}
+
+coalescer = RequestCoalescer()
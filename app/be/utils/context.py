@@ -0,0 +1,137 @@
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+# Custom libraries
+from app.be.utils.cache import normalize_text
+from app.be.utils.tokens import count_tokens, truncate_tokens
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+# Characters of whitespace tolerated between two chunks that still count as adjacent
+ADJACENT_GAP = 2
+
+class Span:
+    """A contiguous stretch of one source page, built from one or more chunks."""
+
+    def __init__(self, document: "Document", rank: int):
+        metadata = document.metadata
+        self.source = metadata.get("source")
+        self.page = metadata.get("page")
+        self.start = metadata.get("start_index")
+        self.text = document.page_content
+        self.end = self.start + len(self.text) if self.start is not None else None
+        self.chunk_ids = [document.id] if document.id else []
+        self.rank = rank
+
+    def copy(self) -> "Span":
+        clone = Span.__new__(Span)
+        clone.__dict__.update(self.__dict__)
+        clone.chunk_ids = list(self.chunk_ids)
+        return clone
+
+    def touches(self, other: "Span") -> bool:
+        return (self.start is not None and other.start is not None and
+                other.start <= self.end + ADJACENT_GAP and self.start <= other.end + ADJACENT_GAP)
+
+    def contains(self, other: "Span") -> bool:
+        return (self.start is not None and other.start is not None and
+                self.start <= other.start and other.end <= self.end)
+
+def merge_spans(spans: List[Span]) -> Span:
+    """Merge touching spans of the same page into one, using start offsets to drop the overlap."""
+    spans = sorted(spans, key=lambda span: span.start)
+    merged = spans[0]
+    for span in spans[1:]:
+        if span.start <= merged.end:
+            if span.end > merged.end:
+                merged.text += span.text[merged.end - span.start:]
+        else:
+            merged.text += "\n" + span.text
+        merged.end = max(merged.end, span.end)
+        merged.chunk_ids += span.chunk_ids
+        merged.rank = min(merged.rank, span.rank)
+    return merged
+
+def render_header(number: int, span: Span) -> str:
+    header = f"[{number}] {Path(span.source).name if span.source else 'unknown source'}"
+    if span.page is not None:
+        header += f", page {int(span.page) + 1}"
+    return header
+
+def pack_context(results: List["Document"],
+                 budget: int,
+                 model: Optional[str] = None) -> Tuple[str, List[Dict]]:
+    """
+    Pack retrieved chunks into a context block within a token budget.
+
+    Chunks are taken greedily in relevance order. A chunk that overlaps or
+    directly follows an already packed chunk of the same page is merged into
+    it using the ``start_index`` metadata, so only its new text costs tokens;
+    a chunk fully covered by packed text, or repeating another one verbatim,
+    costs nothing and is skipped. The packed spans are emitted per source in
+    document order, each under a numbered citation header.
+
+    Args:
+        results (list): Retrieved documents, most relevant first.
+        budget (int): Token budget of the whole context block.
+        model (str): Model used to count tokens.
+
+    Returns:
+        tuple: The context text and one citation per emitted span.
+    """
+    groups: Dict[tuple, List[Span]] = {}
+    seen_texts = set()
+    used = 0
+
+    for rank, document in enumerate(results):
+        text_key = normalize_text(document.page_content)
+        if not text_key or text_key in seen_texts:
+            continue
+        seen_texts.add(text_key)
+
+        span = Span(document, rank)
+        key = (span.source, span.page)
+        spans = groups.get(key, [])
+
+        container = next((existing for existing in spans if existing.contains(span)), None)
+        if container is not None:
+            container.chunk_ids += span.chunk_ids
+            continue
+
+        touching = [existing for existing in spans if existing.touches(span)]
+        before = sum(count_tokens(existing.text, model) for existing in touching)
+        candidate = merge_spans([existing.copy() for existing in touching] + [span])
+        # A new block also pays for its citation header
+        cost = count_tokens(candidate.text, model) - before + (0 if touching else 12)
+
+        if used + cost > budget:
+            if used == 0:
+                candidate.text = truncate_tokens(candidate.text, max(budget - 12, 0), model)
+                candidate.end = candidate.start + len(candidate.text) if candidate.start is not None else None
+                groups[key] = [candidate]
+                break
+            continue
+
+        groups[key] = [existing for existing in spans if existing not in touching] + [candidate]
+        used += cost
+
+    # Sources in order of their best chunk; spans within a source in document order
+    spans = [span for group in groups.values() for span in group]
+    source_rank = {}
+    for span in spans:
+        source_rank[span.source] = min(source_rank.get(span.source, span.rank), span.rank)
+    spans.sort(key=lambda span: (source_rank[span.source], span.source or "",
+                                 span.page if span.page is not None else -1,
+                                 span.start if span.start is not None else span.rank))
+
+    blocks, citations = [], []
+    for number, span in enumerate(spans, start=1):
+        blocks.append(f"{render_header(number, span)}\n{span.text}")
+        citations.append({"citation": number,
+                          "source": span.source,
+                          "page": span.page,
+                          "start_index": span.start,
+                          "end_index": span.end,
+                          "chunk_ids": span.chunk_ids})
+    return "\n\n".join(blocks), citations
@@ -0,0 +1,172 @@
+from itertools import groupby
+import os
+import pickle
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+# Third-party libraries
+from loguru import logger
+import numpy as np
+
+# Custom libraries
+from app.be.utils.retrieval import cosine_similarities, normalize_rows
+
+def representative_vectors(metadatas: Sequence[dict],
+                           vectors: np.ndarray,
+                           section_chunks: int = 8) -> List[Tuple[str, np.ndarray]]:
+    """
+    Summarize a document's chunk embeddings as a few representative vectors.
+
+    The document is represented by the normalized mean of its chunk
+    embeddings, and each section by the mean of its own chunks, so a long
+    document covering several topics is still found by any of them.
+    Sections are pages where the loader reports them, otherwise runs of
+    ``section_chunks`` consecutive chunks.
+
+    Args:
+        metadatas (list): Chunk metadata, with ``page`` and ``start_index`` when known.
+        vectors (np.ndarray): The chunk embeddings, one per row.
+        section_chunks (int): Chunks per section of unpaged documents.
+
+    Returns:
+        list: (section, vector) pairs; the whole document has section "".
+    """
+    if len(vectors) == 0:
+        return []
+    vectors = normalize_rows(vectors)
+    rows = [("", normalize_rows(vectors.mean(axis=0)))]
+
+    # Chunks may come back from the store in any order; sections follow the document
+    order = sorted(range(len(vectors)),
+                   key=lambda i: ((metadatas[i] or {}).get("page") or 0, (metadatas[i] or {}).get("start_index") or 0))
+
+    def section_of(rank: int) -> str:
+        page = (metadatas[order[rank]] or {}).get("page")
+        return f"page {page}" if page is not None else f"part {rank // section_chunks}"
+
+    sections = [(section, [order[rank] for rank in ranks])
+                for section, ranks in groupby(range(len(order)), key=section_of)]
+    if len(sections) > 1:
+        rows.extend((section, normalize_rows(vectors[positions].mean(axis=0))) for section, positions in sections)
+    return rows
+
+def summarize_stored_chunks(collection, chunk_ids: List[str], section_chunks: int = 8) -> List[Tuple[str, np.ndarray]]:
+    """
+    Representative vectors of a document from the embeddings already in the vector store.
+
+    Args:
+        collection: The low-level collection holding the chunks.
+        chunk_ids (list): The IDs of the document's chunks.
+        section_chunks (int): Chunks per section of unpaged documents.
+
+    Returns:
+        list: (section, vector) pairs, see representative_vectors.
+    """
+    if not chunk_ids:
+        return []
+    records = collection.get(ids=list(chunk_ids), include=["metadatas", "embeddings"])
+    if not len(records["ids"]):
+        return []
+    return representative_vectors(records["metadatas"], np.asarray(records["embeddings"], dtype=np.float32),
+                                  section_chunks)
+
+class DocumentIndex:
+    """Document-level index of representative embeddings for two-stage retrieval.
+
+    Holds one row per document and one per section of it, as a dense float32
+    matrix searched by brute force; it is orders of magnitude smaller than
+    the chunk index. The index is pickled to disk after every ingestion
+    session.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the DocumentIndex, loading it from disk when present.
+
+        Args:
+            path (str): The file the index is persisted to.
+        """
+        self.PATH = path
+        self.LOCK = threading.RLock()
+
+        self.documents: List[str] = []
+        self.sections: List[str] = []
+        self.vectors: Optional[np.ndarray] = None
+
+        if os.path.exists(path):
+            self.load()
+
+    def __len__(self) -> int:
+        return len(set(self.documents))
+
+    def replace(self, document: str, rows: List[Tuple[str, np.ndarray]]):
+        """
+        Set the representative vectors of a document, dropping its previous ones.
+
+        Args:
+            document (str): The document name.
+            rows (list): (section, vector) pairs from representative_vectors.
+        """
+        with self.LOCK:
+            self.remove(document)
+            if not rows:
+                return
+            added = np.stack([vector for _, vector in rows]).astype(np.float32)
+            if self.vectors is not None and self.vectors.shape[1] != added.shape[1]:
+                logger.warning(f"Embedding size changed to {added.shape[1]}, resetting the document index.")
+                self.documents, self.sections, self.vectors = [], [], None
+            # New lists rather than in-place appends, so concurrent searches keep a consistent snapshot
+            self.documents = self.documents + [document] * len(rows)
+            self.sections = self.sections + [section for section, _ in rows]
+            self.vectors = added if self.vectors is None else np.concatenate([self.vectors, added])
+
+    def remove(self, document: str):
+        """Remove a document from the index."""
+        with self.LOCK:
+            keep = [row for row, name in enumerate(self.documents) if name != document]
+            if len(keep) == len(self.documents):
+                return
+            self.documents = [self.documents[row] for row in keep]
+            self.sections = [self.sections[row] for row in keep]
+            self.vectors = self.vectors[keep] if keep else None
+
+    def search(self, query_embedding, k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Rank documents by their best-matching representative vector.
+
+        Args:
+            query_embedding (list): Embedding of the query.
+            k (int): The number of documents to return.
+
+        Returns:
+            list: (document, cosine similarity) pairs, best first.
+        """
+        with self.LOCK:
+            documents, vectors = self.documents, self.vectors
+        if vectors is None:
+            return []
+        similarities = cosine_similarities(np.asarray(query_embedding, dtype=np.float32), vectors)
+        ranked = {}
+        for row in np.argsort(-similarities, kind="stable"):
+            ranked.setdefault(documents[row], float(similarities[row]))
+            if len(ranked) == k:
+                break
+        return list(ranked.items())
+
+    def save(self):
+        """Persist the index atomically."""
+        with self.LOCK:
+            state = {"documents": self.documents, "sections": self.sections, "vectors": self.vectors}
+            temp_path = f"{self.PATH}.tmp"
+            with open(temp_path, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.PATH)
+        logger.info(f"Document index with {len(self)} documents saved to {self.PATH}")
+
+    def load(self):
+        """Load the index from disk."""
+        with self.LOCK, open(self.PATH, "rb") as f:
+            state = pickle.load(f)
+            self.documents = state["documents"]
+            self.sections = state["sections"]
+            self.vectors = state["vectors"]
@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import random
+import re
+import threading
+import time
+from typing import TYPE_CHECKING, Iterable, Iterator, List
+
+# Third-party libraries
+from loguru import logger
+import numpy as np
+
+# Custom libraries
+from app.be.core.config import settings
+from app.be.utils.tokens import count_tokens
+
+if TYPE_CHECKING:
+    from langchain_core.embeddings import Embeddings
+
+class HashingEmbeddings:
+    """Deterministic local embedder based on feature hashing.
+
+    Words and word bigrams are hashed into a fixed number of signed buckets
+    and the result is L2-normalized. It needs no network access, which makes
+    ingestion throughput measurable and testable offline. Like
+    CachedEmbeddings, it implements the langchain Embeddings interface
+    without importing langchain.
+    """
+
+    def __init__(self, dimensions: int = 256):
+        """
+        Initialize the HashingEmbeddings.
+
+        Args:
+            dimensions (int): The size of the embedding vectors.
+        """
+        self.DIMENSIONS = dimensions
+
+    def embed_text(self, text: str) -> List[float]:
+        vector = np.zeros(self.DIMENSIONS, dtype=np.float32)
+        words = re.findall(r"\w+", text.lower())
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.DIMENSIONS] += 1.0 if value >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_text(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_text(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.embed_query, text)
+
+class RateLimiter:
+    """Token-bucket limiter for requests per minute and tokens per minute."""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        """
+        Initialize the RateLimiter.
+
+        Args:
+            requests_per_minute (int): Allowed requests per minute.
+            tokens_per_minute (int): Allowed input tokens per minute.
+        """
+        self.REQUESTS_PER_MINUTE = requests_per_minute
+        self.TOKENS_PER_MINUTE = tokens_per_minute
+        self.LOCK = threading.Lock()
+        self.requests = float(requests_per_minute)
+        self.tokens = float(tokens_per_minute)
+        self.updated_at = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated_at
+        self.updated_at = now
+        self.requests = min(self.REQUESTS_PER_MINUTE, self.requests + elapsed * self.REQUESTS_PER_MINUTE / 60)
+        self.tokens = min(self.TOKENS_PER_MINUTE, self.tokens + elapsed * self.TOKENS_PER_MINUTE / 60)
+
+    def acquire(self, tokens: int):
+        """Block until one request of the given size fits in both budgets."""
+        # A request larger than the whole budget waits for a full bucket
+        tokens = min(tokens, self.TOKENS_PER_MINUTE)
+        while True:
+            with self.LOCK:
+                self.refill()
+                if self.requests >= 1 and self.tokens >= tokens:
+                    self.requests -= 1
+                    self.tokens -= tokens
+                    return
+                wait = max((1 - self.requests) * 60 / self.REQUESTS_PER_MINUTE,
+                           (tokens - self.tokens) * 60 / self.TOKENS_PER_MINUTE)
+            time.sleep(min(max(wait, 0.01), 1.0))
+
+class EmbeddingScheduler:
+    """Packs texts into token-budgeted batches and embeds them under a shared rate limit.
+
+    Batches are embedded by the callers' own workers (the embed/store
+    workers of an ingestion session); every batch goes through the shared
+    rate limiter and is retried with exponential backoff, so one throttled
+    or failed request does not lose the whole run.
+    """
+
+    def __init__(self, embeddings: "Embeddings"):
+        """
+        Initialize the EmbeddingScheduler.
+
+        Args:
+            embeddings (Embeddings): The embedder doing the actual work.
+        """
+        self.EMBEDDINGS = embeddings
+        self.BATCH_TOKENS = settings.embedding_batch_tokens
+        self.BATCH_SIZE = settings.ingestion_batch_size
+        self.MAX_RETRIES = settings.embedding_max_retries
+        self.BACKOFF_BASE = settings.embedding_backoff_base
+        self.LIMITER = RateLimiter(settings.embedding_requests_per_minute,
+                                   settings.embedding_tokens_per_minute)
+
+    def pack(self, items: Iterable, text=lambda item: item) -> Iterator[list]:
+        """
+        Group items into batches bounded by token budget and batch size.
+
+        Args:
+            items (Iterable): Texts, or objects holding text.
+            text (Callable): Returns the text of an item.
+
+        Yields:
+            list: Batches of items.
+        """
+        batch, batch_tokens = [], 0
+        for item in items:
+            tokens = count_tokens(text(item))
+            if batch and (batch_tokens + tokens > self.BATCH_TOKENS or len(batch) >= self.BATCH_SIZE):
+                yield batch
+                batch, batch_tokens = [], 0
+            batch.append(item)
+            batch_tokens += tokens
+        if batch:
+            yield batch
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed one batch under the rate limit, retrying with backoff.
+
+        Args:
+            texts (list): The texts of the batch.
+
+        Returns:
+            list: One embedding per text.
+        """
+        tokens = sum(count_tokens(text) for text in texts)
+        for attempt in range(self.MAX_RETRIES + 1):
+            self.LIMITER.acquire(tokens)
+            try:
+                return self.EMBEDDINGS.embed_documents(texts)
+            except Exception as e:
+                if attempt == self.MAX_RETRIES:
+                    raise
+                delay = self.BACKOFF_BASE * 2 ** attempt * (1 + random.random())
+                logger.warning(f"Embedding batch of {len(texts)} failed ({e}), retrying in {delay:.1f}s.")
+                time.sleep(delay)
+
@@ -0,0 +1,170 @@
+import json
+import os
+from pathlib import Path
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional
+import uuid
+
+# Third-party libraries
+from loguru import logger
+
+# The store that lives directly in VECTOR_STORE_PATH, as laid out before versions existed
+BASE_VERSION = "base"
+POINTER_FILE = "ACTIVE_VERSION"
+METADATA_FILE = "version.json"
+
+def write_atomically(path: Path, text: str):
+    """Write a small file through a temporary sibling and os.replace, so readers see the old or the new content."""
+    temporary = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+class IndexVersions:
+    """Catalog of the index versions kept under the vector store path.
+
+    Every version is a complete vector store (Chroma or matrix files plus
+    the manifest, BM25 and document indexes of each collection) in its own
+    directory under ``versions/``. A pointer file names the active version;
+    switching versions is a single atomic rename of that file, so a process
+    restarting mid-switch opens either the old or the new version, never a
+    mix. Without a pointer the store at the root itself is active, which
+    keeps stores created before versions existed working unchanged.
+    """
+
+    def __init__(self, root: str):
+        """
+        Initialize the IndexVersions catalog.
+
+        Args:
+            root (str): The vector store path.
+        """
+        self.ROOT = Path(root)
+        self.VERSIONS_PATH = self.ROOT / "versions"
+        self.POINTER_PATH = self.ROOT / POINTER_FILE
+        self.LOCK = threading.Lock()
+
+    def path(self, version: str) -> str:
+        """Return the directory holding a version."""
+        if version == BASE_VERSION:
+            return str(self.ROOT)
+        return str(self.VERSIONS_PATH / version)
+
+    def read_pointer(self) -> dict:
+        """Return the pointer file: the active version and the one it replaced."""
+        try:
+            return json.loads(self.POINTER_PATH.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {"version": BASE_VERSION, "previous": None}
+
+    def active(self) -> str:
+        """Return the name of the active version."""
+        version = self.read_pointer()["version"]
+        if version != BASE_VERSION and not os.path.isdir(self.path(version)):
+            logger.error(f"Active index version {version} is missing, falling back to the base version.")
+            return BASE_VERSION
+        return version
+
+    def read_metadata(self, version: str) -> dict:
+        """Return the metadata of a version; the base version has none on disk and is described by the settings."""
+        try:
+            return json.loads((Path(self.path(version)) / METADATA_FILE).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {"version": version, "kind": "base" if version == BASE_VERSION else "unknown",
+                    "status": "ready" if version == BASE_VERSION else "unknown"}
+
+    def write_metadata(self, version: str, metadata: dict):
+        write_atomically(Path(self.path(version)) / METADATA_FILE, json.dumps(metadata, indent=2))
+
+    def update_metadata(self, version: str, **fields) -> dict:
+        """Merge fields into a version's metadata."""
+        with self.LOCK:
+            metadata = {**self.read_metadata(version), **fields}
+            self.write_metadata(version, metadata)
+            return metadata
+
+    def create(self, kind: str, parent: str, embedder: str, embeddings_model: str) -> str:
+        """
+        Create an empty version directory for a build.
+
+        Args:
+            kind (str): What builds it: "rebuild", "reembed" or "compact".
+            parent (str): The version it is built from.
+            embedder (str): The embedder its vectors come from.
+            embeddings_model (str): The embedding model its vectors come from.
+
+        Returns:
+            str: The new version's name, sortable by creation time.
+        """
+        version = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        os.makedirs(self.path(version))
+        self.write_metadata(version, {"version": version, "kind": kind, "parent": parent, "status": "building",
+                                      "embedder": embedder, "embeddings_model": embeddings_model,
+                                      "created_at": time.time()})
+        return version
+
+    def list(self) -> List[Dict]:
+        """Return the metadata of every version, oldest first, flagging the active one."""
+        pointer = self.read_pointer()
+        names = sorted(entry.name for entry in self.VERSIONS_PATH.iterdir()
+                       if entry.is_dir()) if self.VERSIONS_PATH.is_dir() else []
+        versions = []
+        for name in [BASE_VERSION] + names:
+            metadata = self.read_metadata(name)
+            versions.append({**metadata, "version": name, "active": name == pointer["version"],
+                             "previous": name == pointer.get("previous")})
+        return versions
+
+    def activate(self, version: str):
+        """Point readers at a version; the version it replaces is remembered for rollback."""
+        with self.LOCK:
+            current = self.read_pointer()["version"]
+            if version == current:
+                return
+            self.ROOT.mkdir(parents=True, exist_ok=True)
+            write_atomically(self.POINTER_PATH, json.dumps({"version": version, "previous": current}))
+        logger.info(f"Activated index version {version} (was {current}).")
+
+    def remove(self, version: str):
+        """Delete a version's directory; the base and the active version are never removed.
+
+        Raises:
+            OSError: When a file cannot be deleted, e.g. one still open on Windows.
+        """
+        if version == BASE_VERSION or version == self.read_pointer()["version"]:
+            raise ValueError(f"Index version {version} cannot be removed.")
+        shutil.rmtree(self.path(version))
+        logger.info(f"Removed index version {version}.")
+
+    def prune(self, keep: int, building: Optional[str] = None) -> List[str]:
+        """
+        Remove old versions, keeping the active and previous ones plus the newest ``keep`` others.
+
+        Args:
+            keep (int): Inactive ready versions kept for rollback, besides the previous one.
+            building (str): A version being built right now, never removed.
+
+        Returns:
+            list: The removed versions. Versions that could not be removed
+                are logged and tried again by the next prune.
+        """
+        pointer = self.read_pointer()
+        protected = {BASE_VERSION, pointer["version"], pointer.get("previous"), building}
+        candidates = [version for version in self.list() if version["version"] not in protected]
+        ready = [version["version"] for version in candidates if version.get("status") == "ready"]
+        # Failed and abandoned builds go first; ready versions beyond the newest `keep`
+        expired = [version["version"] for version in candidates if version.get("status") != "ready"]
+        expired += ready[:max(len(ready) - keep, 0)]
+        removed = []
+        for version in expired:
+            try:
+                self.remove(version)
+            except OSError as e:
+                logger.error(f"Failed to remove index version {version}, keeping it for the next prune: {e}")
+                continue
+            removed.append(version)
+        return removed
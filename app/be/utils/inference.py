@@ -1,89 +1,725 @@
 # Third-party libraries
-from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
-from langchain.prompts import ChatPromptTemplate
+import asyncio
+import contextvars
+import functools
 from loguru import logger
-from typing import Optional
+import numpy as np
+from typing import TYPE_CHECKING, AsyncIterator, List, Optional
 
 # Custom libraries
 from app.be.core.config import settings
-from app.be.utils.model import invoke_model
+from app.be.utils.model import ainvoke_model, is_cacheable, stream_model
+from app.be.utils.context import pack_context
+from app.be.utils.intent import INTENT_PROMPT, parse_intent
+from app.be.utils.lexical import reciprocal_rank_fusion
+from app.be.utils.metrics import INFERENCE_STAGE_SECONDS, INTENT_DECISIONS, RESPONSE_CACHE_LOOKUPS, timed
+from app.be.utils.resources import resources
+from app.be.utils.retrieval import cosine_similarities, maximal_marginal_relevance
+from app.be.utils.tokens import count_tokens, truncate_tokens
 from app.be.schemas.inference_models import AIModelParameters
 
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
 class ModelInference:
-    def __init__(self):
-        """Initialize the ModelInference class."""
+    def __init__(self, collections: Optional[List[str]] = None):
+        """
+        Initialize the ModelInference class.
+
+        Args:
+            collections (list): The collections to search, defaults to
+                DEFAULT_COLLECTION. Several collections are searched in
+                parallel and their results merged by score.
+        """
         self.EMBEDDINGS_MODEL = settings.embeddings_model
         self.VECTOR_STORE_PATH = settings.vector_store_path
         self.API_KEY = settings.openai_api_key
         self.PROMPT_TEMPLATE = settings.prompt_template
-        self.VECTOR_STORE = self.initiate_vector_store()        
-        self.RELEVANCE_THRESHOLD = settings.relevance_threshold
-
-    def initiate_vector_store(self):
-        """Initialize the vector store with OpenAI embeddings."""
-        logger.info("Initializing vector store...")
-        embeddings = OpenAIEmbeddings(model=self.EMBEDDINGS_MODEL,
-                                      openai_api_key=self.API_KEY)
-        vector_store = Chroma(
-            persist_directory=self.VECTOR_STORE_PATH,
-            embedding_function=embeddings
-        )
-        return vector_store
+        self.COLLECTIONS = list(dict.fromkeys(collections or [settings.default_collection]))
+        self.MIN_SIMILARITY = settings.min_cosine_similarity
+        self.RETRIEVAL_MODE = settings.retrieval_mode
+        self.HYBRID_MIN_SIMILARITY = (self.MIN_SIMILARITY if settings.hybrid_min_cosine_similarity is None
+                                      else settings.hybrid_min_cosine_similarity)
+        self.HIERARCHICAL = settings.hierarchical_retrieval
+        self.TOP_DOCUMENTS = settings.hierarchical_top_documents
+        self.PROMPT_TOKEN_BUDGET = settings.prompt_token_budget
+        self.LEXICAL_INDEXES = {}
+        self.DOCUMENT_INDEXES = {}
+        self.MANIFESTS = {}
+        # Opened first outside the lock: loading a side index may mean rebuilding it
+        self.borrow_indexes()
+        # Borrowed together, so an index version switch never gives a request a mix of two versions
+        with resources.LOCK:
+            self.VECTOR_STORES = self.initiate_vector_store()
+            self.EMBEDDINGS = resources.get_embeddings()
+            self.borrow_indexes()
+
+    def initiate_vector_store(self) -> dict:
+        """Borrow the process-wide collection handles from the resource manager."""
+        return {collection: resources.get_collection(collection) for collection in self.COLLECTIONS}
+
+    def borrow_indexes(self):
+        """Borrow the side indexes the configured retrieval reads."""
+        for collection in self.COLLECTIONS:
+            if self.RETRIEVAL_MODE == "hybrid":
+                self.LEXICAL_INDEXES[collection] = resources.get_lexical_index(collection)
+            if self.HIERARCHICAL:
+                self.DOCUMENT_INDEXES[collection] = resources.get_document_index(collection)
+                self.MANIFESTS[collection] = resources.get_manifest(collection)
     
-    def perform_similarity_search(self, query: str, k: int = 5) -> list:
+    def embed_query(self, query: str) -> list:
+        """Embed the query once so search and the semantic cache can share it."""
+        return self.EMBEDDINGS.embed_query(query)
+
+    def embed_queries(self, queries: list) -> list:
+        """Embed many queries with one request for the ones not already cached."""
+        return self.EMBEDDINGS.embed_queries(queries)
+
+    def fetch_candidates(self, query_embedding: list, fetch_k: int) -> tuple:
+        """
+        Over-fetch nearest chunks together with their stored embeddings.
+
+        Args:
+            query_embedding (list): Embedding of the query.
+            fetch_k (int): The number of candidates to fetch.
+
+        Returns:
+            tuple: Candidate documents and their embedding matrix.
+        """
+        return self.fetch_candidates_batch([query_embedding], fetch_k)[0]
+
+    def fetch_candidates_batch(self, query_embeddings: list, fetch_k: int) -> list:
+        """
+        Over-fetch nearest chunks for several queries with a single query per collection.
+
+        With several collections, the collections are queried in parallel
+        and each query keeps the fetch_k candidates most similar to it.
+
+        Args:
+            query_embeddings (list): Embeddings of the queries.
+            fetch_k (int): The number of candidates to fetch per query.
+
+        Returns:
+            list: (documents, embedding matrix) per query.
+        """
+        if len(self.COLLECTIONS) == 1:
+            return self.query_collection(self.COLLECTIONS[0], query_embeddings, fetch_k)
+
+        with timed(INFERENCE_STAGE_SECONDS, stage="fan_out"):
+            executor = resources.get_shard_executor()
+            futures = [executor.submit(contextvars.copy_context().run,
+                                       self.query_collection, collection, query_embeddings, fetch_k)
+                       for collection in self.COLLECTIONS]
+            shards = [future.result() for future in futures]
+        return [self.merge_shards(query_embedding, [shard[i] for shard in shards], fetch_k)
+                for i, query_embedding in enumerate(query_embeddings)]
+
+    @staticmethod
+    def to_document(doc_id: str, text: str, metadata: Optional[dict], collection: str) -> "Document":
+        """Wrap a stored chunk as a Document tagged with the collection it came from."""
+        from langchain_core.documents import Document
+
+        return Document(page_content=text, metadata={**(metadata or {}), "collection": collection}, id=doc_id)
+
+    def query_collection(self, collection: str, query_embeddings: list, fetch_k: int) -> list:
+        """Query one collection, tagging each chunk with the collection it came from.
+
+        With HIERARCHICAL_RETRIEVAL, collections that have a document index
+        are searched in two stages; the others are searched flat.
+        """
+        if self.HIERARCHICAL and len(self.DOCUMENT_INDEXES[collection]):
+            return self.query_top_documents(collection, query_embeddings, fetch_k)
+
+        results = self.VECTOR_STORES[collection].query(
+            query_embeddings=query_embeddings,
+            n_results=fetch_k,
+            include=["documents", "metadatas", "embeddings"]
+        )
+        candidates = []
+        for ids, texts, metadatas, embeddings in zip(results["ids"], results["documents"],
+                                                     results["metadatas"], results["embeddings"]):
+            documents = [self.to_document(doc_id, text, metadata, collection)
+                         for doc_id, text, metadata in zip(ids, texts, metadatas)]
+            vectors = np.asarray(embeddings, dtype=np.float32) if documents else np.zeros((0, 0))
+            candidates.append((documents, vectors))
+        return candidates
+
+    def query_top_documents(self, collection: str, query_embeddings: list, fetch_k: int) -> list:
+        """
+        Two-stage search of one collection: pick documents, then rank their chunks.
+
+        The first stage ranks documents by their document and section
+        summary vectors and keeps HIERARCHICAL_TOP_DOCUMENTS of them. The
+        second scores only the chunks of those documents, so its cost is
+        bounded by their size rather than the size of the collection, and
+        the context stays within a few relevant documents.
+
+        Args:
+            collection (str): The collection to search.
+            query_embeddings (list): Embeddings of the queries.
+            fetch_k (int): The number of candidates to keep per query.
+
+        Returns:
+            list: (documents, embedding matrix) per query.
+        """
+        document_index = self.DOCUMENT_INDEXES[collection]
+        with timed(INFERENCE_STAGE_SECONDS, stage="document_search"):
+            selected = [[document for document, _ in document_index.search(query_embedding, k=self.TOP_DOCUMENTS)]
+                        for query_embedding in query_embeddings]
+            manifest = self.MANIFESTS[collection]
+            chunk_ids = {document: manifest.get_chunk_ids(document)
+                         for document in dict.fromkeys(document for documents in selected for document in documents)}
+
+        # Chunks of documents picked by several queries are read once
+        records = self.VECTOR_STORES[collection].get(
+            ids=[chunk_id for ids in chunk_ids.values() for chunk_id in ids],
+            include=["documents", "metadatas", "embeddings"]
+        ) if chunk_ids else {"ids": []}
+        stored = {doc_id: (text, metadata, np.asarray(vector, dtype=np.float32))
+                  for doc_id, text, metadata, vector in zip(records["ids"], records.get("documents", []),
+                                                            records.get("metadatas", []), records.get("embeddings", []))}
+
+        candidates = []
+        for query_embedding, documents in zip(query_embeddings, selected):
+            ids = [chunk_id for document in documents for chunk_id in chunk_ids[document] if chunk_id in stored]
+            if not ids:
+                candidates.append(([], np.zeros((0, 0))))
+                continue
+            vectors = np.stack([stored[chunk_id][2] for chunk_id in ids])
+            similarities = cosine_similarities(np.asarray(query_embedding, dtype=np.float32), vectors)
+            top = np.argsort(-similarities, kind="stable")[:fetch_k]
+            candidates.append(([self.to_document(ids[i], stored[ids[i]][0], stored[ids[i]][1], collection) for i in top],
+                               vectors[top]))
+        return candidates
+
+    @staticmethod
+    def merge_shards(query_embedding: list, shard_candidates: list, fetch_k: int) -> tuple:
+        """Keep the fetch_k candidates across collections with the highest cosine similarity."""
+        shard_candidates = [(documents, vectors) for documents, vectors in shard_candidates if documents]
+        if not shard_candidates:
+            return [], np.zeros((0, 0))
+        documents = [document for shard_documents, _ in shard_candidates for document in shard_documents]
+        vectors = np.concatenate([shard_vectors for _, shard_vectors in shard_candidates])
+        similarities = cosine_similarities(np.asarray(query_embedding, dtype=np.float32), vectors)
+        top = np.argsort(-similarities, kind="stable")[:fetch_k]
+        return [documents[i] for i in top], vectors[top]
+
+    def search_lexical(self, query: str, k: int) -> list:
+        """BM25 search over every collection, merged by score; returns (chunk_id, collection) pairs."""
+        results = [(score, doc_id, collection)
+                   for collection in self.COLLECTIONS
+                   for doc_id, score in self.LEXICAL_INDEXES[collection].search(query, k=k)]
+        results.sort(key=lambda result: -result[0])
+        return [(doc_id, collection) for _, doc_id, collection in results[:k]]
+
+    def perform_similarity_search(self, 
+                                  query: str, 
+                                  k: int = 5, 
+                                  query_embedding: Optional[list] = None) -> list:
         """
         Perform similarity search on the vector store.
+
+        Scores are cosine similarities computed from the stored embeddings
+        (in [-1, 1], higher is better), independent of the distance function
+        of the Chroma collection. Chunks below MIN_COSINE_SIMILARITY are dropped
+        and the rest are re-ranked with maximal marginal relevance so
+        near-duplicate (e.g. overlapping) chunks do not waste context tokens.
         
         Args:
             query (str): The query string to search for.
             k (int): The number of results to return (default is 5).
+            query_embedding (list): Precomputed embedding of the query, if any.
         
         Returns:
-            list: List of documents similar to the query.
+            list: List of documents similar to the query, each with its
+                cosine similarity in ``metadata["similarity"]``.
         """
         logger.info("Performing similarity search...")
-        results_with_scores = self.VECTOR_STORE.similarity_search_with_score(query, k=k)
-        
-        filtered_results = [doc for doc, score in results_with_scores if score >= self.RELEVANCE_THRESHOLD]
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
+
+        if self.RETRIEVAL_MODE == "hybrid":
+            return self.perform_hybrid_search(query=query, k=k, query_embedding=query_embedding)
+
+        documents, vectors = self.fetch_candidates(query_embedding, fetch_k=max(k, settings.retrieval_fetch_k))
+        return self.rank_candidates(query_embedding, documents, vectors, k)
+
+    def perform_batch_search(self, queries: list, query_embeddings: list, k: int = 5) -> list:
+        """
+        Similarity search for many queries at once.
+
+        Vector mode fetches the candidates of all queries with one query per
+        collection and re-ranks each in memory; hybrid mode searches per query.
+
+        Args:
+            queries (list): The query strings.
+            query_embeddings (list): Their embeddings.
+            k (int): The number of results per query.
 
-        # Fallback to top 2 raw results if no results meet threshold
-        if len(filtered_results) == 0:
+        Returns:
+            list: The documents for each query, in query order.
+        """
+        if self.RETRIEVAL_MODE == "hybrid":
+            return [self.perform_hybrid_search(query=query, k=k, query_embedding=embedding)
+                    for query, embedding in zip(queries, query_embeddings)]
+
+        candidates = self.fetch_candidates_batch(query_embeddings, fetch_k=max(k, settings.retrieval_fetch_k))
+        return [self.rank_candidates(embedding, documents, vectors, k)
+                for embedding, (documents, vectors) in zip(query_embeddings, candidates)]
+
+    def rank_candidates(self, query_embedding: list, documents: list, vectors: np.ndarray, k: int) -> list:
+        """Score candidates by cosine similarity, apply the threshold and re-rank with MMR."""
+        similarities = cosine_similarities(np.asarray(query_embedding, dtype=np.float32), vectors)
+        for document, similarity in zip(documents, similarities):
+            document.metadata["similarity"] = round(float(similarity), 4)
+
+        keep = np.flatnonzero(similarities >= self.MIN_SIMILARITY)
+
+        # Fallback to the 2 most similar results if no results meet threshold
+        if len(keep) == 0:
             logger.warning("No results met threshold, using top 2 raw results instead.")
-            filtered_results = [doc for doc, _ in results_with_scores[:2]]
-        return filtered_results
+            return [documents[i] for i in np.argsort(-similarities)[:2]]
+
+        selected = maximal_marginal_relevance(relevance=similarities[keep],
+                                              vectors=vectors[keep],
+                                              k=k,
+                                              lambda_mult=settings.mmr_lambda,
+                                              duplicate_similarity=settings.duplicate_similarity)
+        return [documents[keep[i]] for i in selected]
     
-    def start_inference_session(self, 
-                                query: str, 
-                                history: str = "",
-                                params: Optional[AIModelParameters] = AIModelParameters()) -> str:
+    def perform_hybrid_search(self, query: str, k: int, query_embedding: list) -> list:
+        """
+        Fuse BM25 and vector rankings with weighted reciprocal rank fusion.
+
+        Lexical search catches exact identifiers, part numbers and error
+        codes that dense similarity misses, so k can stay small. Fused
+        candidates whose cosine similarity to the query is below
+        HYBRID_MIN_COSINE_SIMILARITY are dropped, and the rest are diversified
+        with maximal marginal relevance, using the fused score as relevance.
+
+        Args:
+            query (str): The query string to search for.
+            k (int): The number of results to return.
+            query_embedding (list): Embedding of the query.
+
+        Returns:
+            list: List of documents, best first, each with its cosine
+                similarity in ``metadata["similarity"]``.
+        """
+        fetch_k = max(k, settings.hybrid_fetch_k)
+        documents, vectors = self.fetch_candidates(query_embedding, fetch_k=fetch_k)
+        lexical_results = self.search_lexical(query, k=fetch_k)
+
+        # Keyed by collection too: the same file ingested into two collections gets the same chunk IDs
+        fused = reciprocal_rank_fusion(
+            rankings=[[(doc.metadata["collection"], doc.id) for doc in documents],
+                      [(collection, doc_id) for doc_id, collection in lexical_results]],
+            weights=[settings.hybrid_vector_weight, settings.hybrid_lexical_weight],
+            rrf_k=settings.rrf_k
+        )[:fetch_k]
+
+        candidates = {(doc.metadata["collection"], doc.id): (doc, vector) for doc, vector in zip(documents, vectors)}
+        missing = {}
+        for (collection, doc_id), _ in fused:
+            if (collection, doc_id) not in candidates:
+                missing.setdefault(collection, []).append(doc_id)
+        for collection, doc_ids in missing.items():
+            records = self.VECTOR_STORES[collection].get(ids=doc_ids,
+                                                         include=["documents", "metadatas", "embeddings"])
+            for doc_id, text, metadata, vector in zip(records["ids"], records["documents"],
+                                                      records["metadatas"], records["embeddings"]):
+                candidates[(collection, doc_id)] = (self.to_document(doc_id, text, metadata, collection),
+                                                    np.asarray(vector, dtype=np.float32))
+
+        fused = [(key, score) for key, score in fused if key in candidates]
+        if not fused:
+            return []
+
+        vectors = np.stack([candidates[key][1] for key, _ in fused])
+        similarities = cosine_similarities(np.asarray(query_embedding, dtype=np.float32), vectors)
+        for (key, _), similarity in zip(fused, similarities):
+            candidates[key][0].metadata["similarity"] = round(float(similarity), 4)
+
+        keep = np.flatnonzero(similarities >= self.HYBRID_MIN_SIMILARITY)
+
+        # Fallback to the 2 best fused results if no results meet threshold
+        if len(keep) == 0:
+            logger.warning("No hybrid results met threshold, using top 2 fused results instead.")
+            return [candidates[key][0] for key, _ in fused[:2]]
+
+        relevance = np.asarray([fused[i][1] for i in keep], dtype=np.float32)
+        selected = maximal_marginal_relevance(relevance=relevance / relevance.max(),
+                                              vectors=vectors[keep],
+                                              k=k,
+                                              lambda_mult=settings.mmr_lambda,
+                                              duplicate_similarity=settings.duplicate_similarity)
+        return [candidates[fused[keep[i]][0]][0] for i in selected]
+
+    def build_prompt(self, query: str, history: str, filtered_results: list) -> str:
+        """
+        Render the RAG prompt from the retrieved chunks.
+
+        Args:
+            query (str): The user's query.
+            history (str): Conversation history for context.
+            filtered_results (list): Documents returned by the similarity search.
+
+        Returns:
+            str: The prompt for the LLM.
+        """
+        prompt, _ = self.assemble_prompt(query=query, history=history, filtered_results=filtered_results)
+        return prompt
+
+    def assemble_prompt(self, query: str, history: str, filtered_results: list) -> tuple:
+        """
+        Render the RAG prompt within PROMPT_TOKEN_BUDGET and list its citations.
+
+        The query is always kept whole. History may take up to half of what
+        the template leaves and is cut from its oldest end; the context
+        packer fills the rest, merging overlapping chunks of the same source.
+
+        Args:
+            query (str): The user's query.
+            history (str): Conversation history for context.
+            filtered_results (list): Documents returned by the similarity search.
+
+        Returns:
+            tuple: The prompt for the LLM and the citations of its context.
+        """
+        if filtered_results and any(result.page_content.strip() for result in filtered_results):
+            # Deferred: importing langchain's prompt classes is slow, the warm-up loads them
+            from langchain_core.prompts import ChatPromptTemplate
+
+            prompt_template = ChatPromptTemplate.from_template(self.PROMPT_TEMPLATE)
+            model = settings.llm_model
+
+            available = self.PROMPT_TOKEN_BUDGET - count_tokens(
+                prompt_template.format(context="", query=query, history=""), model
+            )
+            history = truncate_tokens(history or "", available // 2, model, keep="end")
+            available -= count_tokens(history, model)
+
+            context, citations = pack_context(filtered_results, budget=available, model=model)
+            return prompt_template.format(context=context, query=query, history=history), citations
+
+        logger.warning("Context is empty after retrieval. Falling back to general knowledge answer.")
+        return f"Answer the following question based on your general knowledge:\n\nQuestion: {query}", []
+
+    @staticmethod
+    def describe_sources(filtered_results: list) -> list:
+        """Summarize the retrieved chunks for clients, without their text."""
+        return [{"id": result.id,
+                 "collection": result.metadata.get("collection"),
+                 "source": result.metadata.get("source"),
+                 "page": result.metadata.get("page"),
+                 "start_index": result.metadata.get("start_index"),
+                 "similarity": result.metadata.get("similarity")}
+                for result in filtered_results]
+
+    @staticmethod
+    def get_similar_response(query_embedding: list, chunk_ids: list, cache_scope: tuple) -> Optional[str]:
+        """Consult the semantic response cache and record the outcome."""
+        cache = resources.get_response_cache()
+        if not cache.SEMANTIC_ENABLED:
+            return None
+        with timed(INFERENCE_STAGE_SECONDS, stage="semantic_cache"):
+            cached = cache.get_similar(query_embedding, chunk_ids, cache_scope)
+        RESPONSE_CACHE_LOOKUPS.inc(tier="semantic", result="miss" if cached is None else "hit")
+        return cached
+
+    async def aembed_query(self, query: str) -> list:
+        """Embed the query without blocking the event loop."""
+        with timed(INFERENCE_STAGE_SECONDS, stage="embed_query"):
+            return await self.EMBEDDINGS.aembed_query(query)
+
+    @staticmethod
+    async def run_blocking(function, *args):
+        """Run a blocking call (Chroma, BM25, numpy ranking) on the retrieval pool."""
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            resources.get_retrieval_executor(), functools.partial(context.run, function, *args)
+        )
+
+    async def asearch(self, query: str, query_embedding: list) -> list:
+        """Similarity search that keeps the event loop free while Chroma works."""
+        return await self.run_blocking(self.timed_similarity_search, query, query_embedding)
+
+    async def start_inference_session(self, 
+                                      query: str, 
+                                      history: str = "",
+                                      params: Optional[AIModelParameters] = AIModelParameters(),
+                                      query_embedding: Optional[list] = None,
+                                      filtered_results: Optional[list] = None) -> str:
         """
         Main method to handle the inference process.
         Args:
             query (str): The user's query.
             history (str): Conversation history for context.
             params (AIModelParameters): Inference parameters including temperature, max_tokens, etc.
+            query_embedding (list): Precomputed embedding of the query, if any.
+            filtered_results (list): Precomputed retrieval results, if any.
         
         Returns:
             str: The response from the LLM based on the query and context.
         """
-        filtered_results = self.perform_similarity_search(query=query)
+        if query_embedding is None:
+            query_embedding = await self.aembed_query(query)
+        if filtered_results is None:
+            filtered_results = await self.asearch(query, query_embedding)
 
-        # Context construction
-        if filtered_results and any(result.page_content.strip() for result in filtered_results):
-            context = "\n\n".join([result.page_content for result in filtered_results])
-            
-            prompt_template = ChatPromptTemplate.from_template(self.PROMPT_TEMPLATE)
-            prompt = prompt_template.format(context=context, query=query, history=history)
+        # Semantic cache: a near-identical question over the same chunks
+        use_cache = is_cacheable(params)
+        chunk_ids = [result.id for result in filtered_results if result.id]
+        cache_scope = (history, params.model_dump(), settings.llm_model)
+        if use_cache:
+            cached = self.get_similar_response(query_embedding, chunk_ids, cache_scope)
+            if cached is not None:
+                logger.info("Serving response from semantic cache.")
+                return cached
 
-        else:
-            logger.warning("Context is empty after retrieval. Falling back to general knowledge answer.")
-            prompt = f"Answer the following question based on your general knowledge:\n\nQuestion: {query}"
+        with timed(INFERENCE_STAGE_SECONDS, stage="prompt"):
+            prompt = self.build_prompt(query=query, history=history, filtered_results=filtered_results)
 
         try:
-            response = invoke_model(prompt=prompt, parameters=params)
+            response = await ainvoke_model(prompt=prompt, parameters=params)
+            if use_cache:
+                resources.get_response_cache().set_similar(query_embedding, chunk_ids, cache_scope, response)
             return response
 
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logger.error(f"Error during model inference: {e}")
             return "An error occurred while generating the response."
+
+    async def stream_inference_session(self, 
+                                       query: str, 
+                                       history: str = "",
+                                       params: Optional[AIModelParameters] = AIModelParameters(),
+                                       query_embedding: Optional[list] = None,
+                                       filtered_results: Optional[list] = None) -> AsyncIterator[dict]:
+        """
+        Streaming variant of start_inference_session.
+
+        Yields a "metadata" event describing the retrieved sources and the
+        citations of the packed context as soon as the prompt is ready, then
+        "token" events as the LLM produces them, and finally a "done" event
+        (preceded by an "error" event if retrieval or generation fails).
+
+        Args:
+            query (str): The user's query.
+            history (str): Conversation history for context.
+            params (AIModelParameters): Inference parameters including temperature, max_tokens, etc.
+            query_embedding (list): Precomputed embedding of the query, if any.
+            filtered_results (list): Precomputed retrieval results, if any.
+
+        Yields:
+            dict: Stream events.
+        """
+        try:
+            if query_embedding is None:
+                query_embedding = await self.aembed_query(query)
+            if filtered_results is None:
+                filtered_results = await self.asearch(query, query_embedding)
+        except Exception as e:
+            logger.error(f"Error during retrieval: {e}")
+            yield {"type": "error", "message": "An error occurred while searching the documents."}
+            yield {"type": "done"}
+            return
+        with timed(INFERENCE_STAGE_SECONDS, stage="prompt"):
+            prompt, citations = self.assemble_prompt(query=query, history=history, filtered_results=filtered_results)
+        yield {"type": "metadata", "sources": self.describe_sources(filtered_results), "citations": citations}
+
+        use_cache = is_cacheable(params)
+        chunk_ids = [result.id for result in filtered_results if result.id]
+        cache_scope = (history, params.model_dump(), settings.llm_model)
+        cached = None
+        if use_cache:
+            cached = self.get_similar_response(query_embedding, chunk_ids, cache_scope)
+
+        if cached is not None:
+            logger.info("Serving response from semantic cache.")
+            yield {"type": "token", "content": cached}
+            yield {"type": "done"}
+            return
+
+        try:
+            tokens = []
+            async for token in stream_model(prompt=prompt, parameters=params):
+                tokens.append(token)
+                yield {"type": "token", "content": token}
+            if use_cache:
+                resources.get_response_cache().set_similar(query_embedding, chunk_ids, cache_scope, "".join(tokens))
+
+        except Exception as e:
+            logger.error(f"Error during model inference: {e}")
+            yield {"type": "error", "message": "An error occurred while generating the response."}
+
+        yield {"type": "done"}
+
+    async def classify_intent(self, query: str, query_embedding: list) -> str:
+        """
+        Decide whether a message needs the documents, asking the LLM only when unsure.
+
+        Args:
+            query (str): The user's message.
+            query_embedding (list): Embedding of the message.
+
+        Returns:
+            str: "document" or "conversation".
+        """
+        with timed(INFERENCE_STAGE_SECONDS, stage="intent"):
+            classifier = resources.get_intent_classifier()
+            # After a switch to a version with another embedding model, leave it to the LLM
+            intent, confidence = (classifier.classify(query, query_embedding)
+                                  if classifier.EMBEDDINGS is self.EMBEDDINGS else (None, 0.0))
+        if intent is not None:
+            INTENT_DECISIONS.inc(intent=intent, method="local")
+            logger.info(f"Detected intent locally: {intent} (confidence {confidence:.3f})")
+            return intent
+
+        with timed(INFERENCE_STAGE_SECONDS, stage="intent_llm"):
+            response = await ainvoke_model(prompt=INTENT_PROMPT.format(query=query),
+                                           parameters=AIModelParameters(temperature=0.0, max_tokens=5))
+        intent = parse_intent(response)
+        INTENT_DECISIONS.inc(intent=intent, method="llm")
+        logger.info(f"Detected intent with the LLM fallback: {intent}")
+        return intent
+
+    @staticmethod
+    def build_chat_prompt(query: str, history: str) -> str:
+        """Render the prompt for conversational messages that need no documents."""
+        return ("You are a friendly, helpful AI assistant having an ongoing conversation. "
+                "Here is the conversation so far:\n\n"
+                f"{history or ''}\n"
+                "Now, respond naturally to the user's latest message:\n\n"
+                f"{query}")
+
+    async def stream_chat_session(self,
+                                  query: str,
+                                  history: str = "",
+                                  params: Optional[AIModelParameters] = AIModelParameters()) -> AsyncIterator[dict]:
+        """
+        Route a chat message and stream the answer in a single round trip.
+
+        The intent is classified locally; with speculative retrieval the
+        similarity search runs in parallel, so document answers do not wait
+        for routing and conversational answers simply discard the results.
+
+        Args:
+            query (str): The user's message.
+            history (str): Conversation history for context.
+            params (AIModelParameters): Inference parameters including temperature, max_tokens, etc.
+
+        Yields:
+            dict: An "intent" event, then the events of the chosen path.
+        """
+        query_embedding = await self.aembed_query(query)
+
+        search = None
+        if settings.speculative_retrieval:
+            search = asyncio.create_task(self.asearch(query, query_embedding))
+
+        try:
+            intent = await self.classify_intent(query, query_embedding)
+            yield {"type": "intent", "intent": intent}
+
+            if intent == "document":
+                filtered_results = None
+                if search is not None:
+                    # Waited on rather than awaited, so a failed or cancelled search ends the stream properly
+                    await asyncio.wait({search})
+                    if search.cancelled() or search.exception() is not None:
+                        error = "cancelled" if search.cancelled() else search.exception()
+                        logger.error(f"Error during retrieval: {error}")
+                        yield {"type": "error", "message": "An error occurred while searching the documents."}
+                        yield {"type": "done"}
+                        return
+                    filtered_results = search.result()
+                async for event in self.stream_inference_session(query=query,
+                                                                 history=history,
+                                                                 params=params,
+                                                                 query_embedding=query_embedding,
+                                                                 filtered_results=filtered_results):
+                    yield event
+                return
+        finally:
+            if search is not None:
+                if not search.done():
+                    search.cancel()
+                elif not search.cancelled():
+                    # Retrieved so a search that failed while the answer was conversational is not reported unhandled
+                    search.exception()
+
+        yield {"type": "metadata", "sources": []}
+        try:
+            async for token in stream_model(prompt=self.build_chat_prompt(query, history), parameters=params):
+                yield {"type": "token", "content": token}
+        except Exception as e:
+            logger.error(f"Error during model inference: {e}")
+            yield {"type": "error", "message": "An error occurred while generating the response."}
+        yield {"type": "done"}
+
+    def timed_similarity_search(self, query: str, query_embedding: list) -> list:
+        with timed(INFERENCE_STAGE_SECONDS, stage="retrieval"):
+            return self.perform_similarity_search(query=query, query_embedding=query_embedding)
+
+    async def iter_batch_inference(self, items: list, concurrency: int) -> AsyncIterator[dict]:
+        """
+        Answer many questions, yielding each result as soon as it completes.
+
+        All queries are embedded in one request and retrieved with one
+        query per collection set; at most ``concurrency`` LLM calls are then
+        in flight. Unfinished calls are cancelled if the consumer goes away.
+
+        Args:
+            items (list): InferencePayload objects.
+            concurrency (int): Maximum number of LLM calls in flight.
+
+        Yields:
+            dict: {"index", "response", "error"} per item, in completion order.
+        """
+        queries = [item.query for item in items]
+        with timed(INFERENCE_STAGE_SECONDS, stage="batch_embed_query"):
+            query_embeddings = await self.EMBEDDINGS.aembed_queries(queries)
+
+        # Items searching the same collections share one batched search
+        groups = {}
+        for index, item in enumerate(items):
+            groups.setdefault(tuple(item.collections or self.COLLECTIONS), []).append(index)
+        results = [None] * len(items)
+        with timed(INFERENCE_STAGE_SECONDS, stage="batch_retrieval"):
+            for collections, indexes in groups.items():
+                searcher = (self if list(collections) == self.COLLECTIONS
+                            else await self.run_blocking(ModelInference, list(collections)))
+                group_results = await self.run_blocking(searcher.perform_batch_search,
+                                                        [queries[i] for i in indexes],
+                                                        [query_embeddings[i] for i in indexes])
+                for index, result in zip(indexes, group_results):
+                    results[index] = result
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def answer(index: int) -> dict:
+            item = items[index]
+            async with semaphore:
+                try:
+                    response = await self.start_inference_session(query=item.query,
+                                                                  history=item.history or "",
+                                                                  params=item.ai_model_parameters or AIModelParameters(),
+                                                                  query_embedding=query_embeddings[index],
+                                                                  filtered_results=results[index])
+                    return {"index": index, "response": response, "error": None}
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Batch item {index} failed: {e}")
+                    return {"index": index, "response": None, "error": str(e)}
+
+        tasks = [asyncio.create_task(answer(index)) for index in range(len(items))]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
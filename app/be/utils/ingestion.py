@@ -1,133 +1,623 @@
+from concurrent.futures import Executor, FIRST_COMPLETED, wait
+import contextvars
+import importlib
+from itertools import groupby
 from pathlib import Path
+import queue
+import threading
 import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 # Third-party libraries
-from langchain_chroma import Chroma
-from langchain_community.document_loaders.directory import DirectoryLoader
-from langchain_community.document_loaders.pdf import PyPDFLoader
-from langchain_community.document_loaders.word_document import Docx2txtLoader
-from langchain_community.document_loaders.text import TextLoader
-from langchain_openai import OpenAIEmbeddings
-from langchain_text_splitters.character import RecursiveCharacterTextSplitter
 from loguru import logger
 
 # Custom libraries
 from app.be.core.config import settings
+from app.be.utils.chunking import StructuredChunker
+from app.be.utils.document_index import summarize_stored_chunks
+from app.be.utils.manifest import hash_file, make_chunk_ids
+from app.be.utils.metrics import EMBEDDED_TOKENS, INGESTION_ITEMS, INGESTION_STAGE_SECONDS
+from app.be.utils.resources import ResourceManager, resources
+from app.be.utils.tokens import count_tokens
+
+# Loader (module, class) per suffix, imported on first use: langchain_community is slow to import
+LOADER_MAPPING = {
+    ".pdf": ("langchain_community.document_loaders.pdf", "PyPDFLoader"),
+    ".docx": ("langchain_community.document_loaders.word_document", "Docx2txtLoader"),
+    ".txt": ("langchain_community.document_loaders.text", "TextLoader")
+}
+
+def load_file(file_path: str) -> list:
+    """
+    Parse a single PDF, DOCX, or TXT file.
+
+    Kept at module level so it can run in a worker process.
+
+    Args:
+        file_path (str): The file to parse.
+
+    Returns:
+        list: The documents (pages) of the file.
+    """
+    loader = LOADER_MAPPING.get(Path(file_path).suffix.lower())
+    if not loader:
+        raise ValueError("Unsupported file type.")
+    module, name = loader
+    loader_cls = getattr(importlib.import_module(module), name)
+    return loader_cls(file_path).load()
+
+class StageStats:
+    """Item count and busy time of one pipeline stage, mirrored to the metrics registry."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.seconds = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, items: int, seconds: float):
+        with self.lock:
+            self.items += items
+            self.seconds += seconds
+        INGESTION_STAGE_SECONDS.observe(seconds, stage=self.name)
+        INGESTION_ITEMS.inc(items, stage=self.name)
+
+    def to_dict(self) -> dict:
+        return {"items": self.items,
+                "seconds": round(self.seconds, 4),
+                "per_second": round(self.items / self.seconds, 2) if self.seconds > 0 else None}
 
 class FileIngestor:
 
-    def __init__(self):
-        """Initialize the FileIngestor"""
-        self.DATA_PATH = settings.src_data_path
-        self.VECTOR_STORE_PATH = settings.vector_store_path
-        self.EMBEDDINGS_MODEL = settings.embeddings_model
+    def __init__(self,
+                 progress: Optional[Callable] = None,
+                 parse_executor: Optional[Executor] = None,
+                 file_hashes: Optional[Dict[str, str]] = None,
+                 collection: Optional[str] = None,
+                 resource_manager: Optional[ResourceManager] = None):
+        """
+        Initialize the FileIngestor
+
+        Args:
+            progress (Callable): Optional callback invoked as
+                progress(file_path, stage, **info) whenever a file reaches a
+                new stage ("unchanged", "parsed", "chunked", "embedded",
+                "stored", "failed").
+            parse_executor (Executor): Optional (process) pool used to parse
+                files in parallel. Files are parsed in-thread without one.
+            file_hashes (dict): Content hashes already known, keyed by file
+                path (e.g. computed while an upload was written).
+            collection (str): The collection to ingest into, defaults to
+                DEFAULT_COLLECTION.
+            resource_manager (ResourceManager): The vector store and clients to
+                ingest with, defaults to the live ones; index maintenance
+                passes the manager of the version it builds.
+        """
+        self.RESOURCES = resource_manager or resources
+        self.VECTOR_STORE_PATH = self.RESOURCES.VECTOR_STORE_PATH
+        self.COLLECTION = collection or settings.default_collection
+        self.DATA_PATH = self.collection_data_path(self.COLLECTION)
+        self.EMBEDDINGS_MODEL = self.RESOURCES.EMBEDDINGS_MODEL
         self.API_KEY = settings.openai_api_key
+        self.PROGRESS = progress
+        self.PARSE_EXECUTOR = parse_executor
+        self.PARSE_WINDOW = settings.ingestion_parse_window
+        self.QUEUE_SIZE = settings.ingestion_queue_size
+        self.CONCURRENCY = settings.embedding_concurrency
+        self.CHUNK_STRATEGY = settings.chunk_strategy
+        self.CHUNKERS = {}
 
-    def load_documents(self):
-        """Load PDF, DOCX, and TXT documents from the specified directory."""
-        logger.info(f"Loading documents from {self.DATA_PATH} path.")
-        documents = []
-        file_patterns = ["*.pdf", "*.docx", "*.txt"]
-        loader_mapping = {
-            ".pdf": PyPDFLoader,
-            ".docx": Docx2txtLoader,
-            ".txt": TextLoader
-        }
+        self.STAGES = {name: StageStats(name) for name in ("parse", "chunk", "embed", "store")}
+        self.KNOWN_HASHES = file_hashes or {}
+        self.FILE_HASHES = {}
+        self.COUNTS = {"documents": 0, "unchanged_documents": 0, "reused_chunks": 0, "deleted_chunks": 0,
+                       "chunk_tokens": 0, "embedded_tokens": 0}
 
+    def report(self, file_path: str, stage: str, **info):
+        """Forward a per-file progress update to the progress callback."""
+        if self.PROGRESS:
+            self.PROGRESS(str(file_path), stage, **info)
+
+    @staticmethod
+    def collection_data_path(collection: str) -> Path:
+        """Where uploads to a collection are archived; the default collection uses SRC_DATA_PATH itself."""
+        if collection == settings.default_collection:
+            return Path(settings.src_data_path)
+        return Path(settings.src_data_path) / "collections" / collection
+
+    @staticmethod
+    def document_name(file_path) -> str:
+        """Documents are identified by file name, so a re-upload replaces the previous version."""
+        return Path(file_path).name
+
+    def list_files(self) -> List[Path]:
+        """List the PDF, DOCX, and TXT files in the data directory, newest copy per document."""
+        file_patterns = ["*.pdf", "*.docx", "*.txt"]
+        latest = {}
         for pattern in file_patterns:
-            for file_path in Path(self.DATA_PATH).glob(pattern):
-                
-                # Skip files already marked as ingested
-                if file_path.name.endswith(".ingested"):
+            for file_path in Path(self.DATA_PATH).rglob(pattern):
+                # Archives of named collections live below the default collection's folder
+                if self.COLLECTION == settings.default_collection and \
+                        file_path.relative_to(self.DATA_PATH).parts[0] == "collections":
                     continue
+                name = self.document_name(file_path)
+                if name not in latest or file_path.stat().st_mtime > latest[name].stat().st_mtime:
+                    latest[name] = file_path
+        return list(latest.values())
 
-                file_ext = file_path.suffix.lower()
-                loader_cls = loader_mapping.get(file_ext)
+    def iter_changed(self, file_paths: Iterable[Path]) -> Iterator[Path]:
+        """
+        Skip files whose content hash matches the version already ingested.
+
+        Args:
+            file_paths (list): Candidate files.
+
+        Yields:
+            Path: Files that are new or changed.
+        """
+        manifest = self.RESOURCES.get_manifest(self.COLLECTION)
+        for file_path in file_paths:
+            try:
+                file_hash = self.KNOWN_HASHES.get(str(file_path)) or hash_file(str(file_path))
+            except OSError as e:
+                logger.error(f"Failed to read {file_path}: {e}")
+                self.report(file_path, "failed", error=str(e))
+                continue
 
-                if not loader_cls:
-                    logger.warning(f"Unknown file type: {file_path.name}. Skipping.")
-                    continue 
+            if manifest.get_file_hash(self.document_name(file_path)) == file_hash:
+                logger.info(f"{file_path.name} is unchanged, skipping.")
+                self.COUNTS["unchanged_documents"] += 1
+                self.report(file_path, "unchanged")
+                continue
+
+            self.FILE_HASHES[str(file_path)] = file_hash
+            yield file_path
+
+    def iter_documents(self, file_paths: Iterable[Path]) -> Iterator[Tuple[Path, list]]:
+        """
+        Parse files, yielding each file's documents as soon as it is ready.
+
+        With a parse executor at most PARSE_WINDOW files are in flight, so
+        parsed pages never pile up ahead of the chunking stage.
+
+        Args:
+            file_paths (list): Files to parse.
+
+        Yields:
+            tuple: The file path and its documents.
+        """
+        def finish(file_path: Path, doc: list, started: float):
+            self.STAGES["parse"].record(len(doc), time.time() - started)
+            self.report(file_path, "parsed", pages=len(doc))
 
+        if self.PARSE_EXECUTOR is None:
+            for file_path in file_paths:
+                started = time.time()
                 try:
-                    loader = loader_cls(str(file_path))
-                    doc = loader.load()
-                    documents.extend(doc)
+                    doc = load_file(str(file_path))
+                    finish(file_path, doc, started)
+                    yield file_path, doc
+                except Exception as e:
+                    logger.error(f"Failed to load {file_path}: {e}")
+                    self.report(file_path, "failed", error=str(e))
+            return
+
+        pending = {}
+        remaining = iter(file_paths)
+        while True:
+            while len(pending) < self.PARSE_WINDOW:
+                file_path = next(remaining, None)
+                if file_path is None:
+                    break
+                future = self.PARSE_EXECUTOR.submit(load_file, str(file_path))
+                pending[future] = (file_path, time.time())
 
-                    # Rename file to prevent re-ingestion
-                    ingested_path = file_path.with_name(file_path.name + ".ingested")
-                    file_path.rename(ingested_path)
+            if not pending:
+                return
 
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_path, started = pending.pop(future)
+                try:
+                    doc = future.result()
+                    finish(file_path, doc, started)
+                    yield file_path, doc
                 except Exception as e:
-                    print(f"Failed to load {file_path}: {e}")
+                    logger.error(f"Failed to load {file_path}: {e}")
+                    self.report(file_path, "failed", error=str(e))
 
+    def load_documents(self, file_paths: Optional[List[Path]] = None):
+        """
+        Load PDF, DOCX, and TXT documents.
+
+        Args:
+            file_paths (list): Files to load, defaults to every file in the
+                data directory.
+        """
+        logger.info(f"Loading documents from {self.DATA_PATH} path.")
+        if file_paths is None:
+            file_paths = self.list_files()
+
+        documents = []
+        for _, doc in self.iter_documents([Path(file_path) for file_path in file_paths]):
+            documents.extend(doc)
         return documents
-    
-    def transform_docs_to_chunks(self, 
-                                 documents, 
-                                 CHUNK_SIZE=500, 
-                                 CHUNK_OVERLAP=200):
+
+    def get_chunker(self, suffix: str) -> StructuredChunker:
+        """Return the structured chunker for a file type, sized by CHUNK_TOKENS_BY_TYPE."""
+        if suffix not in self.CHUNKERS:
+            self.CHUNKERS[suffix] = StructuredChunker(
+                chunk_tokens=settings.chunk_tokens_by_type.get(suffix, settings.chunk_tokens),
+                overlap_tokens=settings.chunk_overlap_tokens,
+                min_tokens=settings.chunk_min_tokens,
+                max_tokens=settings.chunk_max_tokens,
+                model=self.EMBEDDINGS_MODEL
+            )
+        return self.CHUNKERS[suffix]
+
+    def transform_docs_to_chunks(self,
+                                 documents,
+                                 CHUNK_SIZE: Optional[int] = None,
+                                 CHUNK_OVERLAP: Optional[int] = None):
         """
         Transform loaded documents into chunks for vector storage.
-        
+
+        CHUNK_STRATEGY "structured" measures chunks in embedding-model tokens
+        and cuts at page, heading, paragraph and sentence boundaries (see
+        StructuredChunker); "character" is the plain recursive splitter
+        measured in characters.
+
         Args:
             documents (list): List of documents to be chunked.
-            CHUNK_SIZE (int): Size of each chunk.
-            CHUNK_OVERLAP (int): Overlap size between chunks.
-        
+            CHUNK_SIZE (int): Size of each chunk in characters, "character" strategy only.
+            CHUNK_OVERLAP (int): Overlap size between chunks in characters, "character" strategy only.
+
         Returns:
             list: List of text chunks."""
-        
-        logger.info(f"Transforming {len(documents)} documents into chunks with size {CHUNK_SIZE} and overlap {CHUNK_OVERLAP}.")
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP,
-            length_function=len,
-            add_start_index=True
-        )
-
-        chunks = text_splitter.split_documents(documents)
+
+        started = time.time()
+        if self.CHUNK_STRATEGY == "structured":
+            logger.info(f"Transforming {len(documents)} documents into token-sized chunks.")
+            chunks = []
+            for suffix, group in groupby(documents, key=lambda document: Path(document.metadata.get("source", "")).suffix.lower()):
+                chunks.extend(self.get_chunker(suffix).split_documents(list(group)))
+        elif self.CHUNK_STRATEGY == "character":
+            CHUNK_SIZE = CHUNK_SIZE or settings.chunk_size
+            CHUNK_OVERLAP = settings.chunk_overlap if CHUNK_OVERLAP is None else CHUNK_OVERLAP
+            logger.info(f"Transforming {len(documents)} documents into chunks with size {CHUNK_SIZE} and overlap {CHUNK_OVERLAP}.")
+            from langchain_text_splitters.character import RecursiveCharacterTextSplitter
+
+            text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=CHUNK_SIZE,
+                chunk_overlap=CHUNK_OVERLAP,
+                length_function=len,
+                add_start_index=True
+            )
+            chunks = text_splitter.split_documents(documents)
+        else:
+            raise ValueError(f"Unknown chunk strategy: {self.CHUNK_STRATEGY}. Use 'structured' or 'character'.")
+
+        self.STAGES["chunk"].record(len(chunks), time.time() - started)
         logger.info(f"Number of chunks created: {len(chunks)}")
+        for source, group in groupby(chunks, key=lambda chunk: chunk.metadata.get("source")):
+            self.report(source, "chunked", chunks=len(list(group)))
         return chunks
 
+    def iter_chunks(self, file_paths: List[Path]) -> Iterator[Tuple[str, list]]:
+        """
+        Chunk files one at a time as they come out of the parse stage.
+
+        Args:
+            file_paths (list): Files to parse and chunk.
+
+        Yields:
+            tuple: The file path and its chunks.
+        """
+        for file_path, doc in self.iter_documents(file_paths):
+            chunks = self.transform_docs_to_chunks(doc)
+            for chunk in chunks:
+                chunk.metadata["document"] = self.document_name(file_path)
+            yield str(file_path), chunks
+
+    def embed_chunks(self, chunks) -> list:
+        """
+        Embed a batch of chunks through the rate-limited scheduler.
+
+        Args:
+            chunks (list): List of text chunks.
+
+        Returns:
+            list: One embedding per chunk.
+        """
+        started = time.time()
+        scheduler = self.RESOURCES.get_embedding_scheduler()
+        vectors = scheduler.embed_batch([chunk.page_content for chunk in chunks])
+        self.STAGES["embed"].record(len(chunks), time.time() - started)
+        return vectors
+
+    def store_chunks(self, chunks, vectors):
+        """
+        Write a batch of embedded chunks to the vector store.
+
+        Upserting by deterministic ID makes a re-run after a crash idempotent.
+
+        Args:
+            chunks (list): List of text chunks, each with an ``id``.
+            vectors (list): Their embeddings.
+        """
+        # Write through the shared vector store so readers see the same client
+        collection = self.RESOURCES.get_collection(self.COLLECTION)
+        started = time.time()
+        with self.RESOURCES.WRITE_LOCK:
+            collection.upsert(ids=[chunk.id for chunk in chunks],
+                              embeddings=vectors,
+                              documents=[chunk.page_content for chunk in chunks],
+                              metadatas=[chunk.metadata for chunk in chunks])
+        self.STAGES["store"].record(len(chunks), time.time() - started)
+
     def save_vector_store(self, chunks):
         """
-        Save the vector store to the specified directory.
-        
+        Embed a batch of chunks and save them to the vector store.
+
         Args:
             chunks (list): List of text chunks to be saved in the vector store.
         """
-        
-        logger.info("Converting chunks to embeddings and saving to vector store.")
-        start_time = time.time()
+        scheduler = self.RESOURCES.get_embedding_scheduler()
+        for batch in scheduler.pack(chunks, text=lambda chunk: chunk.page_content):
+            self.store_chunks(batch, self.embed_chunks(batch))
+
+    def plan_document(self, source: str, chunks: list) -> Tuple[list, dict]:
+        """
+        Diff a document's fresh chunks against the manifest.
+
+        Args:
+            source (str): The file the chunks came from.
+            chunks (list): All chunks of the new version of the file.
+
+        Returns:
+            tuple: The chunks that need embedding, and the plan used to
+                finalize the document once they are stored.
+        """
+        document = self.document_name(source)
+        existing = set(self.RESOURCES.get_manifest(self.COLLECTION).get_chunk_ids(document))
+        ids = make_chunk_ids(document, [chunk.page_content for chunk in chunks])
+
+        # Chunks written by an interrupted earlier run act as a checkpoint:
+        # they are already embedded, so they are reused rather than redone
+        unrecorded = [chunk_id for chunk_id, _ in ids if chunk_id not in existing]
+        if unrecorded:
+            collection = self.RESOURCES.get_collection(self.COLLECTION)
+            checkpointed = set(collection.get(ids=unrecorded, include=[])["ids"])
+            if checkpointed:
+                logger.info(f"Resuming {document}: {len(checkpointed)} chunks already embedded.")
+        else:
+            checkpointed = set()
+
+        new_chunks, kept_chunks = [], []
+        for chunk, (chunk_id, _) in zip(chunks, ids):
+            chunk.id = chunk_id
+            tokens = count_tokens(chunk.page_content, self.EMBEDDINGS_MODEL)
+            self.COUNTS["chunk_tokens"] += tokens
+            if chunk_id in existing or chunk_id in checkpointed:
+                kept_chunks.append(chunk)
+            else:
+                new_chunks.append(chunk)
+                self.COUNTS["embedded_tokens"] += tokens
+                EMBEDDED_TOKENS.inc(tokens, strategy=self.CHUNK_STRATEGY)
+
+        plan = {
+            "document": document,
+            "chunks": chunks,
+            "file_hash": self.FILE_HASHES[source],
+            "ids": ids,
+            "kept": kept_chunks,
+            "removed": sorted(existing - {chunk_id for chunk_id, _ in ids})
+        }
+        return new_chunks, plan
+
+    def finalize_document(self, source: str, plan: dict):
+        """
+        Refresh metadata of reused chunks, drop stale chunks, update the
+        lexical and document indexes and record the new version of a
+        document once all of its new chunks are stored.
+
+        Args:
+            source (str): The file the chunks came from.
+            plan (dict): The plan returned by plan_document.
+        """
+        collection = self.RESOURCES.get_collection(self.COLLECTION)
+        with self.RESOURCES.WRITE_LOCK:
+            if plan["kept"]:
+                collection.update(ids=[chunk.id for chunk in plan["kept"]],
+                                  metadatas=[chunk.metadata for chunk in plan["kept"]])
+            if plan["removed"]:
+                collection.delete(ids=plan["removed"])
+            self.RESOURCES.get_manifest(self.COLLECTION).replace_document(plan["document"], plan["file_hash"], plan["ids"])
+            self.COUNTS["documents"] += 1
+
+            lexical_index = self.RESOURCES.get_lexical_index(self.COLLECTION)
+            lexical_index.remove(plan["removed"])
+            lexical_index.add([chunk.id for chunk in plan["chunks"]],
+                              [chunk.page_content for chunk in plan["chunks"]])
+
+        # Document and section summaries for two-stage retrieval, from the stored embeddings
+        rows = summarize_stored_chunks(collection, [chunk_id for chunk_id, _ in plan["ids"]],
+                                       settings.document_section_chunks)
+        self.RESOURCES.get_document_index(self.COLLECTION).replace(plan["document"], rows)
+
+        self.COUNTS["reused_chunks"] += len(plan["kept"])
+        self.COUNTS["deleted_chunks"] += len(plan["removed"])
+        self.report(source, "stored", chunks=len(plan["ids"]))
+
+    def delete_document(self, document: str) -> int:
+        """
+        Remove a document and all of its chunks from the vector store.
+
+        Args:
+            document (str): The document name.
+
+        Returns:
+            int: The number of chunks deleted.
+        """
+        manifest = self.RESOURCES.get_manifest(self.COLLECTION)
+        chunk_ids = manifest.get_chunk_ids(document)
+        with self.RESOURCES.WRITE_LOCK:
+            if chunk_ids:
+                self.RESOURCES.get_collection(self.COLLECTION).delete(ids=chunk_ids)
+                self.RESOURCES.get_lexical_index(self.COLLECTION).remove(chunk_ids)
+            self.RESOURCES.get_document_index(self.COLLECTION).remove(document)
+            manifest.remove_document(document)
+        logger.info(f"Deleted {len(chunk_ids)} chunks of {document}.")
+        return len(chunk_ids)
 
-        # Ensure no existing Vector Store instance is holding the folder
-        if hasattr(self, "VECTOR_STORE") and self.VECTOR_STORE:
-            self.VECTOR_STORE._collection = None
-            self.VECTOR_STORE = None
-        
-        embeddings = OpenAIEmbeddings(model=self.EMBEDDINGS_MODEL,
-                                      openai_api_key=self.API_KEY)
-        Chroma.from_documents(
-            chunks, embeddings, persist_directory=self.VECTOR_STORE_PATH
-        )
-        end_time = time.time()
-        run_time = end_time - start_time
-        logger.info(f"Vector store created in {run_time:.2f} seconds.")
-        logger.info(f"Vector store saved to {self.VECTOR_STORE_PATH}")
-
-    def start_ingestion_session(self):
-        """Main method to run the file ingestion process."""
+    def advance(self, sources: list, remaining: dict, failed: set, lock) -> list:
+        """Count chunks through a stage, returning files whose last chunk just passed."""
+        finished = []
+        with lock:
+            for source in sources:
+                remaining[source] -= 1
+                if remaining[source] == 0 and source not in failed:
+                    finished.append(source)
+        return finished
+
+    def run_pipeline(self, file_paths: List[Path]):
+        """
+        Parse, chunk, embed and store files through the producer/consumer pipeline.
+
+        Args:
+            file_paths (list): Files to ingest.
+        """
+        batches = queue.Queue(maxsize=self.QUEUE_SIZE)
+        to_embed = {}
+        to_store = {}
+        plans = {}
+        errors = []
+        lock = threading.Lock()
+
+        def iter_new_chunks():
+            for source, chunks in self.iter_chunks(self.iter_changed(file_paths)):
+                chunks, plan = self.plan_document(source, chunks)
+                if not chunks:
+                    self.finalize_document(source, plan)
+                    continue
+                with lock:
+                    plans[source] = plan
+                    to_embed[source] = to_store[source] = len(chunks)
+                yield from chunks
+
+        def produce():
+            try:
+                scheduler = self.RESOURCES.get_embedding_scheduler()
+                for batch in scheduler.pack(iter_new_chunks(), text=lambda chunk: chunk.page_content):
+                    batches.put(batch)
+            except Exception as e:
+                logger.error(f"Ingestion producer failed: {e}")
+                errors.append(e)
+            finally:
+                for _ in range(self.CONCURRENCY):
+                    batches.put(None)
+
+        failed = set()
+
+        def consume():
+            while True:
+                batch = batches.get()
+                if batch is None:
+                    return
+
+                sources = [chunk.metadata.get("source") for chunk in batch]
+                try:
+                    vectors = self.embed_chunks(batch)
+                    for source in self.advance(sources, to_embed, failed, lock):
+                        self.report(source, "embedded")
+                    self.store_chunks(batch, vectors)
+                    for source in self.advance(sources, to_store, failed, lock):
+                        with lock:
+                            plan = plans.pop(source)
+                        self.finalize_document(source, plan)
+                except Exception as e:
+                    logger.error(f"Failed to store a batch of {len(batch)} chunks: {e}")
+                    with lock:
+                        newly_failed = set(sources) - failed
+                        failed.update(newly_failed)
+                    for source in newly_failed:
+                        self.report(source, "failed", error=str(e))
+
+        # Pipeline threads log under the request ID of the job that started them
+        producer = threading.Thread(target=contextvars.copy_context().run, args=(produce,),
+                                    name="ingestion-producer", daemon=True)
+        producer.start()
+
+        consumers = [threading.Thread(target=contextvars.copy_context().run, args=(consume,),
+                                      name=f"ingestion-embedder-{i}", daemon=True)
+                     for i in range(self.CONCURRENCY)]
+        for consumer in consumers:
+            consumer.start()
+        for consumer in consumers:
+            consumer.join()
+
+        producer.join()
+        if errors:
+            raise errors[0]
+
+    def start_ingestion_session(self, file_paths: Optional[List[Path]] = None) -> dict:
+        """
+        Main method to run the file ingestion process.
+
+        Indexing is incremental: unchanged files are skipped by content hash,
+        only chunks whose content is new get embedded, and chunks of the
+        previous version that disappeared are deleted.
+
+        Parsing and chunking run in a producer thread that packs new chunks
+        into token-budgeted batches and feeds them through a bounded queue to
+        EMBEDDING_CONCURRENCY embed/store workers, so parsing overlaps
+        embedding and memory stays flat regardless of corpus size.
+
+        Args:
+            file_paths (list): Files to ingest, defaults to every file in the
+                data directory. A full scan also deletes documents whose
+                files are gone.
+
+        Returns:
+            dict: Number of documents (files) ingested, pages parsed and
+                chunks stored, the chunk strategy with the tokens chunked and
+                sent for embedding, and per-stage throughput.
+        """
         logger.info("Starting document ingestion...")
-        documents = self.load_documents()
-        logger.info(f"Loaded {len(documents)} documents from {self.DATA_PATH} path.")
-        if not documents:
-            logger.warning("No documents found to ingest.")
-            return
-        
-        chunks = self.transform_docs_to_chunks(documents)
-        if not chunks:
-            logger.warning("No chunks created from the documents.")
-            return
-        
-        self.save_vector_store(chunks)
-        logger.info("Document ingestion completed.")
\ No newline at end of file
+        full_scan = file_paths is None
+        if full_scan:
+            file_paths = self.list_files()
+        file_paths = [Path(file_path) for file_path in file_paths]
+        start_time = time.time()
+
+        # Other writers of the same documents wait, so each diffs against the version the last one recorded
+        documents = None if full_scan else {self.document_name(file_path) for file_path in file_paths}
+        with self.RESOURCES.claiming(self.COLLECTION, documents):
+            self.run_pipeline(file_paths)
+            if full_scan:
+                present = {self.document_name(file_path) for file_path in file_paths}
+                for entry in self.RESOURCES.get_manifest(self.COLLECTION).list_documents():
+                    if entry["document"] not in present:
+                        self.COUNTS["deleted_chunks"] += self.delete_document(entry["document"])
+
+        summary = {
+            "pages": self.STAGES["parse"].items,
+            "chunks": self.STAGES["store"].items,
+            "chunk_strategy": self.CHUNK_STRATEGY,
+            **self.COUNTS,
+            "stages": {name: stage.to_dict() for name, stage in self.STAGES.items()}
+        }
+        if not summary["pages"] and not summary["deleted_chunks"]:
+            logger.warning("No new or changed documents to ingest.")
+            return summary
+
+        # Persist the lexical and document indexes and hand readers a fresh collection handle
+        self.RESOURCES.get_lexical_index(self.COLLECTION).save()
+        self.RESOURCES.get_document_index(self.COLLECTION).save()
+        self.RESOURCES.reload_vector_store(self.COLLECTION)
+
+        run_time = time.time() - start_time
+        logger.info(f"Vector store updated in {run_time:.2f} seconds: {summary['stages']}")
+        logger.info(f"Vector store collection {self.COLLECTION} saved to {self.VECTOR_STORE_PATH}")
+        logger.info("Document ingestion completed.")
+        return summary
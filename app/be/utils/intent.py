@@ -0,0 +1,107 @@
+import re
+import threading
+from typing import Optional, Tuple
+
+# Third-party libraries
+from loguru import logger
+import numpy as np
+
+# Custom libraries
+from app.be.core.config import settings
+from app.be.utils.retrieval import cosine_similarities, normalize_rows
+
+CONVERSATION_EXEMPLARS = [
+    "hi", "hello there", "hey, how are you?", "good morning", "thanks a lot", "thank you, that helps",
+    "who are you?", "what can you do?", "tell me a joke", "how is your day going?", "bye, see you later",
+    "nice to meet you", "can you help me?", "what is your name?", "that's great", "ok cool",
+]
+
+DOCUMENT_EXEMPLARS = [
+    "what does the document say about the refund policy?", "summarize the uploaded report",
+    "according to the file, what is the revenue for 2023?", "what are the key findings in the pdf?",
+    "list the requirements mentioned in the contract", "what is the part number of the pump?",
+    "what does error code E42 mean?", "which section describes the warranty?",
+    "who is responsible for maintenance according to the manual?", "what are the company's main products?",
+    "explain the installation steps", "what is the deadline for the project?",
+]
+
+SMALL_TALK_PATTERN = re.compile(
+    r"^\s*(hi|hello|hey|yo|thanks|thank you|thx|good (morning|afternoon|evening|night)|bye|goodbye|"
+    r"see you|how are you|who are you|what('s| is) your name|nice to meet you|ok(ay)?|cool|great)"
+    r"([\s,]+(there|you|so much|a lot|again|later|today|doing))*[\s!?.]*$",
+    re.IGNORECASE
+)
+
+DOCUMENT_CUE_PATTERN = re.compile(
+    r"\b(document|documents|file|files|pdf|docx|report|manual|contract|page|section|chapter|uploaded|"
+    r"according to|summari[sz]e|attached)\b",
+    re.IGNORECASE
+)
+
+INTENT_PROMPT = (
+    "Classify the following user message as either 'conversation' or 'document'. "
+    "Only respond with 'conversation' or 'document', nothing else.\n\n"
+    "User message: {query}"
+)
+
+class IntentClassifier:
+    """Local router deciding whether a message needs document retrieval.
+
+    Obvious small talk and explicit document references are settled by
+    keyword rules. Everything else is compared against embedded exemplar
+    messages of both intents; when the margin between the two is too thin to
+    trust, the caller falls back to asking the LLM.
+    """
+
+    def __init__(self, embeddings, min_margin: float = 0.05):
+        """
+        Initialize the IntentClassifier.
+
+        Args:
+            embeddings (Embeddings): Client used to embed the exemplars once.
+            min_margin (float): Similarity margin below which the result is uncertain.
+        """
+        self.EMBEDDINGS = embeddings
+        self.MIN_MARGIN = min_margin
+        self.LOCK = threading.Lock()
+        self.EXEMPLARS = None
+
+    def get_exemplars(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Embed the exemplars on first use; returns unit-length (conversation, document) matrices."""
+        with self.LOCK:
+            if self.EXEMPLARS is None:
+                vectors = self.EMBEDDINGS.embed_documents(CONVERSATION_EXEMPLARS + DOCUMENT_EXEMPLARS)
+                vectors = normalize_rows(np.asarray(vectors, dtype=np.float32))
+                split = len(CONVERSATION_EXEMPLARS)
+                self.EXEMPLARS = (vectors[:split], vectors[split:])
+            return self.EXEMPLARS
+
+    def classify(self, query: str, query_embedding: list) -> Tuple[Optional[str], float]:
+        """
+        Classify a message as "conversation" or "document".
+
+        Args:
+            query (str): The user's message.
+            query_embedding (list): Embedding of the message.
+
+        Returns:
+            tuple: The intent, or None when uncertain, and the confidence.
+        """
+        if DOCUMENT_CUE_PATTERN.search(query):
+            return "document", 1.0
+        if SMALL_TALK_PATTERN.match(query):
+            return "conversation", 1.0
+
+        conversation, document = self.get_exemplars()
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        # Mean of the 3 closest exemplars is steadier than the single best match
+        scores = {intent: float(np.sort(cosine_similarities(query_vector, vectors))[-3:].mean())
+                  for intent, vectors in (("conversation", conversation), ("document", document))}
+        margin = scores["document"] - scores["conversation"]
+        if abs(margin) < self.MIN_MARGIN:
+            return None, abs(margin)
+        return ("document" if margin > 0 else "conversation"), abs(margin)
+
+def parse_intent(response: str) -> str:
+    """Map the LLM's free-text classification to an intent, preferring retrieval when unclear."""
+    return "conversation" if "conversation" in response.strip().lower() else "document"
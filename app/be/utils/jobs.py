@@ -0,0 +1,184 @@
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import contextvars
+import multiprocessing
+from pathlib import Path
+import shutil
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+import uuid
+
+# Third-party libraries
+from loguru import logger
+
+# Custom libraries
+from app.be.core.config import settings
+from app.be.schemas.ingestion_models import FileProgress, IngestionJobStatus
+from app.be.utils.ingestion import FileIngestor
+from app.be.utils.resources import resources
+
+class IngestionJobManager:
+    """Runs ingestion sessions as background jobs on a worker pool.
+
+    Jobs parse, chunk and embed concurrently; writes to the shared Chroma
+    directory are serialized by the resource manager's write lock, and jobs
+    wait while index maintenance runs. File parsing is CPU-bound, so it is
+    farmed out to a shared process pool.
+    """
+
+    def __init__(self):
+        """Initialize the IngestionJobManager."""
+        self.MAX_WORKERS = settings.ingestion_workers
+        self.HISTORY_SIZE = settings.ingestion_job_history
+        self.PARSE_WORKERS = settings.ingestion_parse_workers
+
+        self.LOCK = threading.Lock()
+        self.JOBS = OrderedDict()
+        self.EXECUTOR = None
+        self.PARSE_EXECUTOR = None
+
+    def get_parse_executor(self) -> Optional[ProcessPoolExecutor]:
+        """Return the shared parse pool, or None when parsing runs in-thread."""
+        if self.PARSE_WORKERS <= 0:
+            return None
+        with self.LOCK:
+            if self.PARSE_EXECUTOR is None:
+                self.PARSE_EXECUTOR = ProcessPoolExecutor(
+                    max_workers=self.PARSE_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self.PARSE_EXECUTOR
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        with self.LOCK:
+            if self.EXECUTOR is None:
+                self.EXECUTOR = ThreadPoolExecutor(max_workers=self.MAX_WORKERS,
+                                                   thread_name_prefix="ingestion")
+            return self.EXECUTOR
+
+    def submit(self,
+               file_paths: List[Path],
+               file_hashes: Optional[Dict[str, str]] = None,
+               cleanup_dir: Optional[Path] = None,
+               collection: Optional[str] = None) -> IngestionJobStatus:
+        """
+        Queue an ingestion job for the given files.
+
+        Args:
+            file_paths (list): Files already written to disk.
+            file_hashes (dict): Content hashes computed while the files were
+                written, keyed by path, so they are not read again to hash.
+            cleanup_dir (Path): A temporary folder to remove once the job ends.
+            collection (str): The collection to ingest into.
+
+        Returns:
+            IngestionJobStatus: The newly queued job.
+        """
+        job = IngestionJobStatus(
+            job_id=uuid.uuid4().hex,
+            collection=collection or settings.default_collection,
+            files=[FileProgress(name=Path(file_path).name) for file_path in file_paths],
+            created_at=time.time()
+        )
+        with self.LOCK:
+            self.JOBS[job.job_id] = job
+            while len(self.JOBS) > self.HISTORY_SIZE:
+                self.JOBS.popitem(last=False)
+
+        logger.info(f"Queued ingestion job {job.job_id} with {len(file_paths)} files.")
+        context = contextvars.copy_context()
+        self.get_executor().submit(context.run, self.run, job, [str(file_path) for file_path in file_paths],
+                                   file_hashes, cleanup_dir)
+        return job.model_copy(deep=True)
+
+    def run(self,
+            job: IngestionJobStatus,
+            file_paths: List[str],
+            file_hashes: Optional[Dict[str, str]] = None,
+            cleanup_dir: Optional[Path] = None):
+        """Execute a queued job and record its progress."""
+        files = dict(zip(file_paths, job.files))
+
+        def progress(file_path: str, stage: str, **info):
+            file = files.get(file_path)
+            if file is None:
+                return
+            with self.LOCK:
+                file.stage = stage
+                file.pages = info.get("pages", file.pages)
+                file.chunks = info.get("chunks", file.chunks)
+                file.error = info.get("error", file.error)
+
+        # A queued job waits here while index maintenance runs
+        with resources.writing():
+            with self.LOCK:
+                job.status = "running"
+                job.started_at = time.time()
+            self.ingest(job, file_paths, file_hashes, progress)
+
+        if cleanup_dir is not None:
+            shutil.rmtree(cleanup_dir, ignore_errors=True)
+
+        with self.LOCK:
+            job.finished_at = time.time()
+            duration = job.finished_at - job.started_at
+            job.chunks_per_second = job.chunks / duration if duration > 0 else None
+        logger.info(f"Ingestion job {job.job_id} {job.status} in {duration:.2f} seconds.")
+
+    def ingest(self,
+               job: IngestionJobStatus,
+               file_paths: List[str],
+               file_hashes: Optional[Dict[str, str]],
+               progress: Callable):
+        """Run the ingestion session of a job and record its summary."""
+        try:
+            ingestor = FileIngestor(progress=progress,
+                                    parse_executor=self.get_parse_executor(),
+                                    file_hashes=file_hashes,
+                                    collection=job.collection)
+            summary = ingestor.start_ingestion_session(file_paths=[Path(file_path) for file_path in file_paths])
+            with self.LOCK:
+                job.documents = summary["documents"]
+                job.pages = summary["pages"]
+                job.chunks = summary["chunks"]
+                job.unchanged_documents = summary["unchanged_documents"]
+                job.reused_chunks = summary["reused_chunks"]
+                job.deleted_chunks = summary["deleted_chunks"]
+                job.chunk_strategy = summary["chunk_strategy"]
+                job.chunk_tokens = summary["chunk_tokens"]
+                job.embedded_tokens = summary["embedded_tokens"]
+                job.stages = summary["stages"]
+                failed = [file for file in job.files if file.stage == "failed"]
+                job.status = "failed" if failed and len(failed) == len(job.files) else "completed"
+
+        except Exception as e:
+            logger.error(f"Ingestion job {job.job_id} failed: {e}")
+            with self.LOCK:
+                job.status = "failed"
+                job.error = str(e)
+
+    def get(self, job_id: str) -> Optional[IngestionJobStatus]:
+        """Return a snapshot of a job, or None if it is unknown."""
+        with self.LOCK:
+            job = self.JOBS.get(job_id)
+            return job.model_copy(deep=True) if job else None
+
+    def list(self) -> List[IngestionJobStatus]:
+        """Return snapshots of the most recent jobs, newest first."""
+        with self.LOCK:
+            return [job.model_copy(deep=True) for job in reversed(self.JOBS.values())]
+
+    def shutdown(self):
+        """Wait for running jobs to finish and stop the worker pools."""
+        with self.LOCK:
+            executor, self.EXECUTOR = self.EXECUTOR, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+        with self.LOCK:
+            parse_executor, self.PARSE_EXECUTOR = self.PARSE_EXECUTOR, None
+        if parse_executor is not None:
+            parse_executor.shutdown(wait=True)
+
+jobs = IngestionJobManager()
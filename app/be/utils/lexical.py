@@ -0,0 +1,209 @@
+from array import array
+from collections import Counter
+import math
+import os
+import pickle
+import re
+import threading
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+# Third-party libraries
+from loguru import logger
+
+TOKEN_PATTERN = re.compile(r"\w+(?:[-_./:]\w+)*")
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase terms for BM25.
+
+    Identifiers such as part numbers ("XJ-9000") and error codes ("E42.1")
+    are kept whole and also indexed by their parts, so both exact and
+    partial mentions match.
+
+    Args:
+        text (str): The text to tokenize.
+
+    Returns:
+        list: The terms.
+    """
+    terms = []
+    for match in TOKEN_PATTERN.findall(text.lower()):
+        terms.append(match)
+        parts = re.split(r"[-_./:]", match)
+        if len(parts) > 1:
+            terms.extend(part for part in parts if part)
+    return terms
+
+class BM25Index:
+    """In-process BM25 inverted index over the chunks of the vector store.
+
+    Postings are stored as compact ``array`` pairs of (document number, term
+    frequency). Removed chunks are tombstoned and the postings are compacted
+    once tombstones make up a quarter of the index. The index is pickled to
+    disk after every ingestion session.
+    """
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        """
+        Initialize the BM25Index, loading it from disk when present.
+
+        Args:
+            path (str): The file the index is persisted to.
+            k1 (float): BM25 term-frequency saturation.
+            b (float): BM25 length normalization.
+        """
+        self.PATH = path
+        self.K1 = k1
+        self.B = b
+        self.LOCK = threading.RLock()
+
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.doc_ids: List[str] = []
+        self.doc_lengths = array("I")
+        self.numbers: Dict[str, int] = {}
+        self.deleted = set()
+        self.total_length = 0
+
+        if os.path.exists(path):
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    def add(self, doc_ids: Iterable[str], texts: Iterable[str]):
+        """
+        Index chunks, replacing any previous version of the same IDs.
+
+        Args:
+            doc_ids (Iterable): Chunk IDs.
+            texts (Iterable): Chunk texts.
+        """
+        with self.LOCK:
+            for doc_id, text in zip(doc_ids, texts):
+                self.remove_one(doc_id)
+                terms = Counter(tokenize(text))
+                length = sum(terms.values())
+                number = len(self.doc_ids)
+                self.doc_ids.append(doc_id)
+                self.doc_lengths.append(length)
+                self.numbers[doc_id] = number
+                self.total_length += length
+                for term, frequency in terms.items():
+                    numbers, frequencies = self.postings.setdefault(term, (array("I"), array("I")))
+                    numbers.append(number)
+                    frequencies.append(frequency)
+
+    def remove_one(self, doc_id: str):
+        number = self.numbers.pop(doc_id, None)
+        if number is not None:
+            self.deleted.add(number)
+            self.total_length -= self.doc_lengths[number]
+
+    def remove(self, doc_ids: Iterable[str]):
+        """Remove chunks from the index."""
+        with self.LOCK:
+            for doc_id in doc_ids:
+                self.remove_one(doc_id)
+            if len(self.deleted) > 0.25 * max(len(self.doc_ids), 1):
+                self.compact()
+
+    def compact(self):
+        """Rewrite the postings without tombstoned chunks."""
+        with self.LOCK:
+            remap = {}
+            doc_ids, doc_lengths = [], array("I")
+            for number, doc_id in enumerate(self.doc_ids):
+                if number not in self.deleted:
+                    remap[number] = len(doc_ids)
+                    doc_ids.append(doc_id)
+                    doc_lengths.append(self.doc_lengths[number])
+
+            postings = {}
+            for term, (numbers, frequencies) in self.postings.items():
+                kept = [(remap[number], frequency) for number, frequency in zip(numbers, frequencies)
+                        if number in remap]
+                if kept:
+                    postings[term] = (array("I", [n for n, _ in kept]), array("I", [f for _, f in kept]))
+
+            self.postings = postings
+            self.doc_ids = doc_ids
+            self.doc_lengths = doc_lengths
+            self.numbers = {doc_id: number for number, doc_id in enumerate(doc_ids)}
+            self.deleted = set()
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Rank chunks against a query with BM25.
+
+        Args:
+            query (str): The query text.
+            k (int): The number of results to return.
+
+        Returns:
+            list: (chunk_id, score) pairs, best first.
+        """
+        with self.LOCK:
+            count = len(self.numbers)
+            if count == 0:
+                return []
+            average_length = self.total_length / count
+            scores = Counter()
+            for term in set(tokenize(query)):
+                posting = self.postings.get(term)
+                if posting is None:
+                    continue
+                numbers, frequencies = posting
+                live = sum(1 for number in numbers if number not in self.deleted)
+                if live == 0:
+                    continue
+                idf = math.log(1 + (count - live + 0.5) / (live + 0.5))
+                for number, frequency in zip(numbers, frequencies):
+                    if number in self.deleted:
+                        continue
+                    norm = self.K1 * (1 - self.B + self.B * self.doc_lengths[number] / average_length)
+                    scores[number] += idf * frequency * (self.K1 + 1) / (frequency + norm)
+            return [(self.doc_ids[number], score) for number, score in scores.most_common(k)]
+
+    def save(self):
+        """Persist the index atomically."""
+        with self.LOCK:
+            if len(self.deleted) > 0:
+                self.compact()
+            state = {"postings": self.postings, "doc_ids": self.doc_ids,
+                     "doc_lengths": self.doc_lengths, "total_length": self.total_length}
+            temp_path = f"{self.PATH}.tmp"
+            with open(temp_path, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.PATH)
+        logger.info(f"BM25 index with {len(self)} chunks saved to {self.PATH}")
+
+    def load(self):
+        """Load the index from disk."""
+        with self.LOCK, open(self.PATH, "rb") as f:
+            state = pickle.load(f)
+            self.postings = state["postings"]
+            self.doc_ids = state["doc_ids"]
+            self.doc_lengths = state["doc_lengths"]
+            self.total_length = state["total_length"]
+            self.numbers = {doc_id: number for number, doc_id in enumerate(self.doc_ids)}
+            self.deleted = set()
+
+def reciprocal_rank_fusion(rankings: List[List[Hashable]],
+                           weights: List[float],
+                           rrf_k: int = 60) -> List[Tuple[Hashable, float]]:
+    """
+    Fuse several rankings of the same items with weighted reciprocal rank fusion.
+
+    Args:
+        rankings (list): Lists of item keys (e.g. chunk IDs), best first.
+        weights (list): One weight per ranking.
+        rrf_k (int): Damping constant; larger values flatten the rank curve.
+
+    Returns:
+        list: (item key, fused score) pairs, best first.
+    """
+    scores = Counter()
+    for ranking, weight in zip(rankings, weights):
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] += weight / (rrf_k + rank)
+    return scores.most_common()
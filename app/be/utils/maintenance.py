@@ -0,0 +1,488 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import threading
+import time
+from typing import Dict, List, Optional
+import uuid
+
+# Third-party libraries
+from loguru import logger
+
+# Custom libraries
+from app.be.core.config import settings
+from app.be.schemas.maintenance_models import MaintenanceJobStatus, MaintenanceRequest
+from app.be.utils.document_index import summarize_stored_chunks
+from app.be.utils.ingestion import FileIngestor
+from app.be.utils.jobs import jobs
+from app.be.utils.manifest import hash_file
+from app.be.utils.resources import ResourceManager, resources
+
+# Neighbours searched per sample when validating a version
+VALIDATION_K = 5
+
+class IndexMaintenanceManager:
+    """Builds new index versions next to the live one and switches readers to them.
+
+    A job builds a complete version in its own directory: a "rebuild"
+    re-ingests the source files (picking up new chunking settings), a
+    "reembed" does the same with another embedding model, and a "compact"
+    copies the live records without re-embedding, which drops the space
+    held by deleted and replaced chunks and rebuilds the ANN index fresh.
+    The version is then validated and, if it passes, activated with an
+    atomic pointer switch; a "rollback" switches back to a kept version.
+
+    Searches and writers (ingestion jobs, deletions) keep running against
+    the live version while it is built: the build only reads it. Writers
+    are held off just for the catch-up, which redoes the documents they
+    changed in the meantime, and the switch, which only swaps handles, so
+    the new version misses no change. Jobs run one at a time.
+    """
+
+    def __init__(self):
+        """Initialize the IndexMaintenanceManager."""
+        self.HISTORY_SIZE = settings.ingestion_job_history
+        self.VERSIONS_KEPT = settings.index_versions_kept
+        self.CONCURRENCY = settings.index_rebuild_concurrency
+        self.COPY_BATCH_SIZE = settings.index_copy_batch_size
+        self.VALIDATION_SAMPLES = settings.index_validation_samples
+        self.MIN_RECALL = settings.index_validation_min_recall
+
+        self.VERSIONS = resources.VERSIONS
+
+        self.LOCK = threading.Lock()
+        self.JOBS = OrderedDict()
+        self.EXECUTOR = None
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        with self.LOCK:
+            if self.EXECUTOR is None:
+                self.EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="maintenance")
+            return self.EXECUTOR
+
+    def submit(self, request: MaintenanceRequest) -> MaintenanceJobStatus:
+        """
+        Queue a maintenance job.
+
+        Args:
+            request (MaintenanceRequest): What to build or which version to roll back to.
+
+        Returns:
+            MaintenanceJobStatus: The newly queued job.
+        """
+        job = MaintenanceJobStatus(
+            job_id=uuid.uuid4().hex,
+            kind=request.kind,
+            version=request.version if request.kind == "rollback" else None,
+            embedder=request.embedder,
+            embeddings_model=request.embeddings_model,
+            activate=request.activate,
+            allow_missing_documents=request.allow_missing_documents,
+            created_at=time.time()
+        )
+        with self.LOCK:
+            self.JOBS[job.job_id] = job
+            while len(self.JOBS) > self.HISTORY_SIZE:
+                self.JOBS.popitem(last=False)
+
+        logger.info(f"Queued index maintenance job {job.job_id} ({job.kind}).")
+        self.get_executor().submit(contextvars.copy_context().run, self.run, job)
+        return job.model_copy(deep=True)
+
+    def set_stage(self, job: MaintenanceJobStatus, stage: str):
+        with self.LOCK:
+            job.stage = stage
+        logger.info(f"Index maintenance job {job.job_id}: {stage}.")
+
+    def run(self, job: MaintenanceJobStatus):
+        """Execute a queued job and record its outcome."""
+        with self.LOCK:
+            job.status = "running"
+            job.started_at = time.time()
+            job.previous_version = resources.INDEX_VERSION
+        try:
+            if job.kind == "rollback":
+                self.set_stage(job, "waiting for writers")
+                with resources.maintaining():
+                    self.roll_back(job)
+            else:
+                self.build(job)
+            with self.LOCK:
+                job.status = "completed"
+        except Exception as e:
+            logger.error(f"Index maintenance job {job.job_id} failed: {e}")
+            with self.LOCK:
+                job.status = "failed"
+                job.error = str(e)
+
+        try:
+            pruned = self.VERSIONS.prune(self.VERSIONS_KEPT)
+            with self.LOCK:
+                job.pruned_versions = pruned
+        except Exception as e:
+            logger.error(f"Failed to prune index versions: {e}")
+
+        with self.LOCK:
+            job.stage = None
+            job.finished_at = time.time()
+        logger.info(f"Index maintenance job {job.job_id} {job.status} in "
+                    f"{job.finished_at - job.started_at:.2f} seconds.")
+
+    def roll_back(self, job: MaintenanceJobStatus):
+        """Switch back to a kept version, by default the one the active version replaced."""
+        version = job.version or self.VERSIONS.read_pointer().get("previous")
+        if not version:
+            raise ValueError("There is no previous index version to roll back to.")
+        if self.VERSIONS.read_metadata(version).get("status") != "ready":
+            raise ValueError(f"Index version {version} is not a ready version.")
+        with self.LOCK:
+            job.version = version
+        self.set_stage(job, "activating")
+        resources.activate_version(version)
+        with self.LOCK:
+            job.activated = True
+
+    def build(self, job: MaintenanceJobStatus):
+        """
+        Build, validate and (optionally) activate a new version.
+
+        The build and the validation run while writers keep changing the
+        live version. Only then are writers held off, for the catch-up of
+        the documents they changed and the switch.
+        """
+        if job.kind == "reembed" and not (job.embedder or job.embeddings_model):
+            raise ValueError("A reembed needs an embedder or an embeddings model.")
+        embedder = job.embedder or resources.EMBEDDER
+        embeddings_model = job.embeddings_model or resources.EMBEDDINGS_MODEL
+        version = self.VERSIONS.create(job.kind, parent=resources.INDEX_VERSION,
+                                       embedder=embedder, embeddings_model=embeddings_model)
+        with self.LOCK:
+            job.version = version
+            job.embedder = embedder
+            job.embeddings_model = embeddings_model
+
+        builder = ResourceManager(vector_store_path=self.VERSIONS.path(version), embedder=embedder,
+                                  embeddings_model=embeddings_model, shared=resources)
+        try:
+            started = time.time()
+            # What each collection's live manifest held when the build read it
+            baselines = {}
+            collections = resources.list_collections()
+            for collection in collections:
+                self.set_stage(job, f"building {collection}")
+                if job.kind == "compact":
+                    summary, baselines[collection] = self.compact_collection(builder, collection)
+                else:
+                    summary, baselines[collection] = self.rebuild_collection(builder, collection)
+                with self.LOCK:
+                    job.collections[collection] = summary
+
+            self.set_stage(job, "validating")
+            problems = []
+            for collection in collections:
+                report = self.validate_collection(builder, collection, job)
+                problems += [f"{collection}: {problem}" for problem in report["problems"]]
+                with self.LOCK:
+                    job.collections[collection].update(report)
+            if problems:
+                raise ValueError(f"Index version {version} failed validation: {'; '.join(problems)}")
+
+            self.set_stage(job, "waiting for writers")
+            with resources.maintaining():
+                self.set_stage(job, "catching up")
+                for collection in resources.list_collections():
+                    caught_up = self.catch_up(builder, collection, job, baselines.get(collection, {}))
+                    report = self.check_counts(builder, collection, job)
+                    problems += [f"{collection}: {problem}" for problem in report["problems"]]
+                    with self.LOCK:
+                        job.collections.setdefault(collection, {}).update(report, caught_up_documents=caught_up)
+                if problems:
+                    raise ValueError(f"Index version {version} failed validation after catching up: "
+                                     f"{'; '.join(problems)}")
+
+                self.VERSIONS.update_metadata(version, status="ready", built_in=round(time.time() - started, 2),
+                                              collections=job.collections)
+                if job.activate:
+                    self.set_stage(job, "activating")
+                    resources.activate_version(version, prepared=builder)
+                    with self.LOCK:
+                        job.activated = True
+            if not job.activate:
+                builder.close()
+        except Exception as e:
+            builder.close()
+            self.VERSIONS.update_metadata(version, status="failed", error=str(e), collections=job.collections)
+            raise
+
+    @staticmethod
+    def snapshot(collection: str) -> Dict[str, tuple]:
+        """Return (file_hash, updated_at) per document of a live collection; any write changes its entry."""
+        return {entry["document"]: (entry["file_hash"], entry["updated_at"])
+                for entry in resources.get_manifest(collection).list_documents()}
+
+    def get_ingestor(self, builder: ResourceManager, collection: str) -> FileIngestor:
+        ingestor = FileIngestor(parse_executor=jobs.get_parse_executor(),
+                                collection=collection,
+                                resource_manager=builder)
+        ingestor.CONCURRENCY = self.CONCURRENCY
+        return ingestor
+
+    def rebuild_collection(self, builder: ResourceManager, collection: str) -> tuple:
+        """Re-ingest the source files of a collection's live documents into the new version.
+
+        Returns:
+            tuple: The build summary, and the live snapshot it was built from.
+        """
+        baseline = self.snapshot(collection)
+        ingestor = self.get_ingestor(builder, collection)
+        restored = self.rebuild_documents(ingestor, collection,
+                                          {document: file_hash for document, (file_hash, _) in baseline.items()})
+        return ({"documents": ingestor.COUNTS["documents"], "chunks": ingestor.STAGES["store"].items,
+                 "embedded_tokens": ingestor.COUNTS["embedded_tokens"], "restored_documents": restored},
+                baseline)
+
+    def rebuild_documents(self, ingestor: FileIngestor, collection: str, documents: Dict[str, str]) -> int:
+        """
+        Rebuild live documents into the ingestor's version.
+
+        Only documents in the live manifest are rebuilt, so archived copies
+        of deleted documents do not come back. Documents without a source
+        file matching their live version (uploaded with ARCHIVE_UPLOADS off,
+        or replaced on disk) are rebuilt from the chunk texts of the live
+        store instead, re-embedded but not re-chunked.
+
+        Args:
+            ingestor (FileIngestor): An ingestor of the new version.
+            collection (str): The collection.
+            documents (dict): The live file hash per document to rebuild.
+
+        Returns:
+            int: The documents rebuilt from the live store.
+        """
+        file_paths = []
+        for file_path in ingestor.list_files():
+            if ingestor.document_name(file_path) not in documents:
+                continue
+            try:
+                file_hash = hash_file(str(file_path))
+            except OSError as e:
+                logger.warning(f"Failed to read {file_path}, rebuilding it from the live store: {e}")
+                continue
+            if file_hash == documents[ingestor.document_name(file_path)]:
+                ingestor.KNOWN_HASHES[str(file_path)] = file_hash
+                file_paths.append(file_path)
+        if file_paths:
+            ingestor.start_ingestion_session(file_paths=file_paths)
+
+        with_files = {ingestor.document_name(file_path) for file_path in file_paths}
+        without_files = sorted(document for document in documents if document not in with_files)
+        if without_files:
+            logger.info(f"Rebuilding {len(without_files)} documents of {collection} without a source file "
+                        f"from the live store.")
+            for document in without_files:
+                self.restore_document(ingestor, collection, document, documents[document])
+            ingestor.RESOURCES.get_lexical_index(collection).save()
+            ingestor.RESOURCES.get_document_index(collection).save()
+        return len(without_files)
+
+    @staticmethod
+    def restore_document(ingestor: FileIngestor, collection: str, document: str, file_hash: str):
+        """Re-embed a live document's stored chunks into the ingestor's version, keeping their text and IDs."""
+        from langchain_core.documents import Document
+
+        chunk_ids = resources.get_manifest(collection).get_chunk_ids(document)
+        if not chunk_ids:
+            return
+        records = resources.get_collection(collection).get(ids=chunk_ids, include=["documents", "metadatas"])
+        chunks = [Document(page_content=text, metadata=dict(metadata or {}))
+                  for text, metadata in zip(records["documents"], records["metadatas"])]
+        # Back in document order, so the content-based chunk IDs come out as in the live version
+        chunks.sort(key=lambda chunk: (chunk.metadata.get("page") or 0, chunk.metadata.get("start_index") or 0))
+
+        ingestor.FILE_HASHES[document] = file_hash
+        new_chunks, plan = ingestor.plan_document(document, chunks)
+        ingestor.save_vector_store(new_chunks)
+        ingestor.finalize_document(document, plan)
+
+    def compact_collection(self, builder: ResourceManager, collection: str) -> tuple:
+        """Copy a collection's live records, vectors included, into the new version.
+
+        The records listed in a copy of the live manifest are copied; chunks
+        of documents changed meanwhile may be missing, and are redone by the
+        catch-up.
+
+        Returns:
+            tuple: The build summary, and the live snapshot it was built from.
+        """
+        manifest = builder.get_manifest(collection)
+        resources.get_manifest(collection).copy_to(manifest)
+        documents = manifest.list_documents()
+        baseline = {entry["document"]: (entry["file_hash"], entry["updated_at"]) for entry in documents}
+
+        source = resources.get_collection(collection)
+        target = builder.get_collection(collection)
+        copied, batch = 0, []
+        for entry in documents:
+            batch += manifest.get_chunk_ids(entry["document"])
+            if len(batch) >= self.COPY_BATCH_SIZE:
+                copied += len(self.copy_records(source, target, batch)["ids"])
+                batch = []
+        copied += len(self.copy_records(source, target, batch)["ids"])
+
+        # Both are rebuilt from the copied records when missing on disk
+        builder.get_lexical_index(collection)
+        builder.get_document_index(collection)
+        return {"documents": len(documents), "chunks": copied, "embedded_tokens": 0}, baseline
+
+    @staticmethod
+    def copy_records(source, target, chunk_ids: List[str]) -> dict:
+        """Copy records, vectors included, between low-level collections; returns those found."""
+        if not chunk_ids:
+            return {"ids": [], "documents": []}
+        records = source.get(ids=chunk_ids, include=["documents", "metadatas", "embeddings"])
+        if len(records["ids"]):
+            target.upsert(ids=records["ids"], embeddings=records["embeddings"],
+                          documents=records["documents"], metadatas=records["metadatas"])
+        return records
+
+    def copy_document(self, builder: ResourceManager, collection: str, document: str):
+        """Copy one live document, vectors included, into the new version with its indexes."""
+        live_manifest = resources.get_manifest(collection)
+        chunks = live_manifest.get_chunks(document)
+        chunk_ids = [chunk_id for chunk_id, _ in chunks]
+        target = builder.get_collection(collection)
+        records = self.copy_records(resources.get_collection(collection), target, chunk_ids)
+        builder.get_manifest(collection).replace_document(document, live_manifest.get_file_hash(document), chunks)
+        builder.get_lexical_index(collection).add(records["ids"], records["documents"])
+        builder.get_document_index(collection).replace(
+            document, summarize_stored_chunks(target, chunk_ids, settings.document_section_chunks))
+
+    def catch_up(self, builder: ResourceManager, collection: str, job: MaintenanceJobStatus,
+                 baseline: Dict[str, tuple]) -> int:
+        """
+        Redo the documents writers changed while the new version was built.
+
+        Runs inside maintaining(), so the live version holds still. A
+        document is redone when its live entry differs from the snapshot
+        the build started from, or when the new version holds another file
+        version of it (a source file replaced on disk mid-build).
+
+        Args:
+            builder (ResourceManager): The manager of the new version.
+            collection (str): The collection.
+            job (MaintenanceJobStatus): The job, for its kind.
+            baseline (dict): The snapshot the build started from.
+
+        Returns:
+            int: The documents redone.
+        """
+        live = self.snapshot(collection)
+        built = {entry["document"]: entry["file_hash"] for entry in builder.get_manifest(collection).list_documents()}
+
+        def stale(document: str) -> bool:
+            if document not in live:
+                return document in built
+            return live[document] != baseline.get(document) or built.get(document) != live[document][0]
+
+        changed = sorted(document for document in set(live) | set(built) if stale(document))
+        if not changed:
+            return 0
+        logger.info(f"Catching up {len(changed)} documents of {collection} changed during the build.")
+
+        ingestor = self.get_ingestor(builder, collection)
+        for document in changed:
+            if document in built:
+                ingestor.delete_document(document)
+        present = {document: live[document][0] for document in changed if document in live}
+        if job.kind == "compact":
+            for document in present:
+                self.copy_document(builder, collection, document)
+        else:
+            self.rebuild_documents(ingestor, collection, present)
+        builder.get_lexical_index(collection).save()
+        builder.get_document_index(collection).save()
+        return len(changed)
+
+    def validate_collection(self, builder: ResourceManager, collection: str, job: MaintenanceJobStatus) -> dict:
+        """
+        Check the search quality of a collection of the new version, while writers still run.
+
+        Randomly sampled chunks must be found again both by their stored
+        vector and by embedding their text with the version's model, which
+        catches a broken ANN index and a query/document embedding mismatch
+        alike. The counts are checked by check_counts once writers are held
+        off.
+
+        Returns:
+            dict: The two recalls and the problems found.
+        """
+        store = builder.get_collection(collection)
+        manifest = builder.get_manifest(collection)
+        report = {"problems": []}
+
+        sample = manifest.sample_chunk_ids(self.VALIDATION_SAMPLES)
+        if sample:
+            records = store.get(ids=sample, include=["documents", "embeddings"])
+            report["vector_recall"] = self.recall(store, records["ids"], list(records["embeddings"]))
+            report["text_recall"] = self.recall(store, records["ids"],
+                                                builder.get_embeddings().embed_queries(list(records["documents"])))
+            for name in ("vector_recall", "text_recall"):
+                if report[name] < self.MIN_RECALL:
+                    report["problems"].append(f"{name} {report[name]:.2f} is below {self.MIN_RECALL}")
+        return report
+
+    def check_counts(self, builder: ResourceManager, collection: str, job: MaintenanceJobStatus) -> dict:
+        """
+        Compare a collection of the new version with its manifest and the live version.
+
+        The chunk count must match the new manifest (and, for a compaction,
+        the live collection), and no document of the live version may be
+        missing. Runs after the catch-up, while writers are held off.
+
+        Returns:
+            dict: The counts and the problems found.
+        """
+        store = builder.get_collection(collection)
+        documents = builder.get_manifest(collection).list_documents()
+        live_documents = {entry["document"] for entry in resources.get_manifest(collection).list_documents()}
+        missing = sorted(live_documents - {entry["document"] for entry in documents})
+        report = {"stored_chunks": store.count(), "manifest_chunks": sum(entry["chunks"] for entry in documents),
+                  "missing_documents": missing, "problems": []}
+
+        if report["stored_chunks"] != report["manifest_chunks"]:
+            report["problems"].append(f"{report['stored_chunks']} chunks stored but "
+                                      f"{report['manifest_chunks']} in the manifest")
+        if job.kind == "compact" and report["stored_chunks"] != resources.get_collection(collection).count():
+            report["problems"].append("chunk count differs from the live collection")
+        if missing and not job.allow_missing_documents:
+            report["problems"].append(f"{len(missing)} documents missing, e.g. {missing[0]}")
+        return report
+
+    @staticmethod
+    def recall(store, ids: List[str], query_embeddings: list) -> float:
+        """Share of chunks found among the VALIDATION_K nearest neighbours of their query vector."""
+        if not len(ids):
+            return 0.0
+        results = store.query(query_embeddings=query_embeddings, n_results=VALIDATION_K, include=[])
+        hits = sum(chunk_id in found for chunk_id, found in zip(ids, results["ids"]))
+        return round(hits / len(ids), 4)
+
+    def get(self, job_id: str) -> Optional[MaintenanceJobStatus]:
+        """Return a snapshot of a job, or None if it is unknown."""
+        with self.LOCK:
+            job = self.JOBS.get(job_id)
+            return job.model_copy(deep=True) if job else None
+
+    def list(self) -> List[MaintenanceJobStatus]:
+        """Return snapshots of the most recent jobs, newest first."""
+        with self.LOCK:
+            return [job.model_copy(deep=True) for job in reversed(self.JOBS.values())]
+
+    def shutdown(self):
+        """Wait for the running job to finish and drop queued ones."""
+        with self.LOCK:
+            executor, self.EXECUTOR = self.EXECUTOR, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+maintenance = IndexMaintenanceManager()
@@ -0,0 +1,147 @@
+import hashlib
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Third-party libraries
+from loguru import logger
+
+def hash_file(file_path: str) -> str:
+    """Return the SHA-256 of a file's contents, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def hash_text(text: str) -> str:
+    """Return the SHA-256 of a chunk's text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def make_chunk_ids(document: str, texts: List[str]) -> List[Tuple[str, str]]:
+    """
+    Build deterministic chunk IDs from the document name and chunk content.
+
+    IDs depend on the text rather than the position, so an edit only changes
+    the IDs of the chunks it touches. Repeated texts within a document are
+    told apart by their occurrence number.
+
+    Args:
+        document (str): The document name.
+        texts (list): The chunk texts, in document order.
+
+    Returns:
+        list: (chunk_id, chunk_hash) per chunk.
+    """
+    seen = {}
+    ids = []
+    for text in texts:
+        chunk_hash = hash_text(text)
+        occurrence = seen.get(chunk_hash, 0)
+        seen[chunk_hash] = occurrence + 1
+        chunk_id = hashlib.sha256(f"{document}\x00{chunk_hash}\x00{occurrence}".encode("utf-8")).hexdigest()[:32]
+        ids.append((chunk_id, chunk_hash))
+    return ids
+
+class IngestionManifest:
+    """Record of which file versions and chunks are in the vector store.
+
+    Keyed by document name; stores the file content hash and the IDs and
+    hashes of its chunks so re-ingestion only embeds what changed.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the IngestionManifest.
+
+        Args:
+            path (str): The sqlite file holding the manifest.
+        """
+        self.PATH = path
+        self.LOCK = threading.Lock()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.DB = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.DB.execute("PRAGMA journal_mode=WAL")
+        self.DB.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "document TEXT PRIMARY KEY, file_hash TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self.DB.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "chunk_id TEXT PRIMARY KEY, document TEXT NOT NULL, chunk_hash TEXT NOT NULL)"
+        )
+        self.DB.execute("CREATE INDEX IF NOT EXISTS chunks_document ON chunks (document)")
+        self.DB.commit()
+
+    def get_file_hash(self, document: str) -> Optional[str]:
+        """Return the content hash of the ingested version of a document."""
+        with self.LOCK:
+            row = self.DB.execute("SELECT file_hash FROM files WHERE document = ?", (document,)).fetchone()
+            return row[0] if row else None
+
+    def get_chunk_ids(self, document: str) -> List[str]:
+        """Return the IDs of the chunks stored for a document."""
+        with self.LOCK:
+            rows = self.DB.execute("SELECT chunk_id FROM chunks WHERE document = ?", (document,)).fetchall()
+            return [row[0] for row in rows]
+
+    def get_chunks(self, document: str) -> List[Tuple[str, str]]:
+        """Return (chunk_id, chunk_hash) of the chunks stored for a document."""
+        with self.LOCK:
+            return self.DB.execute("SELECT chunk_id, chunk_hash FROM chunks WHERE document = ?", (document,)).fetchall()
+
+    def list_documents(self) -> List[Dict]:
+        """Return every ingested document with its hash and chunk count."""
+        with self.LOCK:
+            rows = self.DB.execute(
+                "SELECT f.document, f.file_hash, f.updated_at, COUNT(c.chunk_id) "
+                "FROM files f LEFT JOIN chunks c ON c.document = f.document "
+                "GROUP BY f.document ORDER BY f.document"
+            ).fetchall()
+            return [{"document": row[0], "file_hash": row[1], "updated_at": row[2], "chunks": row[3]}
+                    for row in rows]
+
+    def replace_document(self, document: str, file_hash: str, chunks: List[Tuple[str, str]]):
+        """
+        Record the current version of a document and its chunks.
+
+        Args:
+            document (str): The document name.
+            file_hash (str): The content hash of the file.
+            chunks (list): (chunk_id, chunk_hash) per chunk.
+        """
+        with self.LOCK, self.DB:
+            self.DB.execute("DELETE FROM chunks WHERE document = ?", (document,))
+            self.DB.executemany(
+                "INSERT OR REPLACE INTO chunks (chunk_id, document, chunk_hash) VALUES (?, ?, ?)",
+                [(chunk_id, document, chunk_hash) for chunk_id, chunk_hash in chunks]
+            )
+            self.DB.execute(
+                "INSERT OR REPLACE INTO files (document, file_hash, updated_at) VALUES (?, ?, ?)",
+                (document, file_hash, time.time())
+            )
+
+    def remove_document(self, document: str):
+        """Forget a document and its chunks."""
+        with self.LOCK, self.DB:
+            self.DB.execute("DELETE FROM chunks WHERE document = ?", (document,))
+            self.DB.execute("DELETE FROM files WHERE document = ?", (document,))
+        logger.info(f"Removed {document} from the ingestion manifest.")
+
+    def sample_chunk_ids(self, count: int) -> List[str]:
+        """Return up to count chunk IDs picked at random."""
+        with self.LOCK:
+            rows = self.DB.execute("SELECT chunk_id FROM chunks ORDER BY RANDOM() LIMIT ?", (count,)).fetchall()
+            return [row[0] for row in rows]
+
+    def copy_to(self, manifest: "IngestionManifest"):
+        """Overwrite another manifest with a consistent copy of this one."""
+        with self.LOCK, manifest.LOCK:
+            self.DB.backup(manifest.DB)
+
+    def close(self):
+        with self.LOCK:
+            self.DB.close()
@@ -0,0 +1,439 @@
+import json
+from pathlib import Path
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Sequence
+import weakref
+
+# Third-party libraries
+from loguru import logger
+import numpy as np
+
+# Custom libraries
+from app.be.utils.retrieval import normalize_rows
+
+DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+class MatrixIndex:
+    """Vector collection stored as a memory-mapped NumPy matrix.
+
+    Implements the part of the Chroma collection API the application uses
+    (``query``, ``get``, ``upsert``, ``update``, ``delete``, ``count``), so
+    it can stand in for a Chroma collection in retrieval and ingestion.
+
+    Embeddings are unit-normalized, optionally truncated to their leading
+    ``dimensions`` components (Matryoshka embeddings such as
+    text-embedding-3 keep most of their quality when truncated), and stored
+    as float32, float16 or int8 with a per-row scale. Text and metadata
+    live in SQLite keyed by matrix row. Opening a collection maps the file
+    instead of reading it, so startup cost does not grow with the corpus.
+
+    Search scores every live row on the leading ``coarse_dimensions``
+    components, block by block, then re-scores the best
+    ``rescore_factor * n_results`` rows exactly on all stored components.
+    Replaced and deleted rows are tombstoned and compacted once they make
+    up a quarter of the matrix.
+
+    Growing or compacting the matrix writes a new file generation
+    (``vectors.<generation>.npy``) instead of replacing the mapped file,
+    which Windows refuses while it is mapped. Searches already running keep
+    the old mapping; its file is removed once nothing maps it any more.
+    """
+
+    def __init__(self,
+                 path: str,
+                 dimensions: Optional[int] = None,
+                 dtype: str = "float16",
+                 coarse_dimensions: int = 256,
+                 rescore_factor: int = 4,
+                 block_rows: int = 65536):
+        """
+        Initialize the MatrixIndex, opening it from disk when present.
+
+        Args:
+            path (str): The folder holding the matrix and its records.
+            dimensions (int): Leading embedding components to keep, None for all.
+            dtype (str): Storage type: "float32", "float16" or "int8".
+            coarse_dimensions (int): Leading components scored in the first
+                pass, 0 to score all of them.
+            rescore_factor (int): Candidates re-scored per requested result.
+            block_rows (int): Rows scored per step, bounding temporary memory.
+        """
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown matrix dtype: {dtype}. Use one of {', '.join(DTYPES)}.")
+        self.PATH = Path(path)
+        self.TRUNCATE = dimensions
+        self.DTYPE = dtype
+        self.COARSE_DIMENSIONS = coarse_dimensions
+        self.RESCORE_FACTOR = max(1, rescore_factor)
+        self.BLOCK_ROWS = block_rows
+        self.LOCK = threading.RLock()
+
+        self.PATH.mkdir(parents=True, exist_ok=True)
+        self.DB = sqlite3.connect(str(self.PATH / "records.sqlite3"), check_same_thread=False, timeout=30)
+        self.DB.execute("PRAGMA journal_mode=WAL")
+        self.DB.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            "row INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, document TEXT, metadata TEXT)"
+        )
+        self.DB.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.DB.commit()
+
+        self.matrix = None
+        self.scales = None
+        self.dimensions = None
+        self.size = 0
+        self.live = np.zeros(0, dtype=bool)
+        self.generation = 0
+        # (file, weak reference to its mapping) of generations searches may still read
+        self.RETIRED_FILES = []
+        self.load()
+
+    def file_path(self, name: str, generation: int) -> Path:
+        """Return the file of a generation; generation 0 is the unsuffixed file of older stores."""
+        return self.PATH / (f"{name}.npy" if generation == 0 else f"{name}.{generation}.npy")
+
+    def load(self):
+        """Map the matrix stored on disk, if any, and remove files of other generations."""
+        meta = dict(self.DB.execute("SELECT key, value FROM meta").fetchall())
+        if "dimensions" not in meta:
+            return
+        if meta["dtype"] != self.DTYPE:
+            logger.warning(f"{self.PATH} stores {meta['dtype']} vectors, ignoring the configured {self.DTYPE}.")
+        self.DTYPE = meta["dtype"]
+        self.dimensions = int(meta["dimensions"])
+        self.size = int(meta["size"])
+        self.generation = int(meta.get("generation", 0))
+        self.matrix = np.load(self.file_path("vectors", self.generation), mmap_mode="r+")
+        if self.DTYPE == "int8":
+            self.scales = np.load(self.file_path("scales", self.generation), mmap_mode="r+")
+        self.live = np.zeros(len(self.matrix), dtype=bool)
+        rows = [row for (row,) in self.DB.execute("SELECT row FROM records")]
+        self.live[rows] = True
+        logger.info(f"Mapped {len(rows)} vectors of {self.dimensions} {self.DTYPE} components from {self.PATH}")
+
+        # Left behind by a crash, or still mapped by another process when they were retired
+        current = {self.file_path("vectors", self.generation), self.file_path("scales", self.generation)}
+        for path in list(self.PATH.glob("vectors*.npy")) + list(self.PATH.glob("scales*.npy")):
+            if path not in current:
+                self.RETIRED_FILES.append((path, lambda: None))
+        self.remove_retired()
+
+    def write_generation(self, capacity: int, rows: np.ndarray) -> tuple:
+        """
+        Copy stored rows, in order, to the files of a new generation with room for ``capacity`` rows.
+
+        Args:
+            capacity (int): Rows the new files hold.
+            rows (np.ndarray): The current rows to copy, to rows 0, 1, ... of the new files.
+
+        Returns:
+            tuple: The new generation and its vector and scale mappings.
+        """
+        generation = self.generation + 1
+
+        def write(name: str, dtype, shape: tuple, current: Optional[np.ndarray]) -> np.ndarray:
+            mapping = np.lib.format.open_memmap(self.file_path(name, generation), mode="w+", dtype=dtype, shape=shape)
+            if current is not None:
+                for start in range(0, len(rows), self.BLOCK_ROWS):
+                    block = rows[start:start + self.BLOCK_ROWS]
+                    mapping[start:start + len(block)] = current[block]
+            mapping.flush()
+            return mapping
+
+        matrix = write("vectors", DTYPES[self.DTYPE], (capacity, self.dimensions), self.matrix)
+        scales = write("scales", np.float32, (capacity,), self.scales) if self.DTYPE == "int8" else None
+        return generation, matrix, scales
+
+    def switch_generation(self, generation: int, matrix: np.ndarray, scales: Optional[np.ndarray]):
+        """Point searches at a new generation and retire the files of the current one."""
+        if self.matrix is not None:
+            self.RETIRED_FILES.append((self.file_path("vectors", self.generation), weakref.ref(self.matrix)))
+            if self.scales is not None:
+                self.RETIRED_FILES.append((self.file_path("scales", self.generation), weakref.ref(self.scales)))
+        self.matrix, self.scales, self.generation = matrix, scales, generation
+        self.remove_retired()
+
+    def remove_retired(self):
+        """Delete retired files that are no longer mapped; the others are tried again later."""
+        kept = []
+        for path, mapping in self.RETIRED_FILES:
+            if mapping() is None:
+                try:
+                    path.unlink(missing_ok=True)
+                    continue
+                except OSError as e:
+                    # Windows refuses while another process still maps the file
+                    logger.debug(f"Keeping {path} for now: {e}")
+            kept.append((path, mapping))
+        self.RETIRED_FILES = kept
+
+    def allocate(self, capacity: int):
+        """Move the matrix to a new generation with room for ``capacity`` rows."""
+        self.switch_generation(*self.write_generation(capacity, np.arange(self.size)))
+        live = np.zeros(capacity, dtype=bool)
+        live[:self.size] = self.live[:self.size]
+        self.live = live
+
+    def prepare(self, embeddings) -> np.ndarray:
+        """Truncate and unit-normalize embeddings to the stored layout."""
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        if self.TRUNCATE:
+            vectors = vectors[:, :self.TRUNCATE]
+        return normalize_rows(vectors)
+
+    def encode(self, vectors: np.ndarray) -> tuple:
+        """Quantize normalized vectors, returning the stored rows and their scales."""
+        if self.DTYPE != "int8":
+            return vectors.astype(DTYPES[self.DTYPE]), None
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+    def decode(self, matrix: np.ndarray, scales: Optional[np.ndarray], rows: np.ndarray) -> np.ndarray:
+        """Return stored rows as float32 vectors."""
+        vectors = np.asarray(matrix[rows], dtype=np.float32)
+        if scales is not None:
+            vectors *= scales[rows][:, None]
+        return vectors
+
+    def count(self) -> int:
+        """Return the number of stored vectors."""
+        with self.LOCK:
+            return self.DB.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def lookup_rows(self, ids: Sequence[str]) -> List[int]:
+        rows = []
+        for start in range(0, len(ids), 500):
+            batch = list(ids[start:start + 500])
+            placeholders = ",".join("?" * len(batch))
+            rows.extend(row for (row,) in self.DB.execute(
+                f"SELECT row FROM records WHERE id IN ({placeholders})", batch))
+        return rows
+
+    def fetch_records(self, rows: Sequence[int]) -> Dict[int, tuple]:
+        records = {}
+        rows = [int(row) for row in rows]
+        for start in range(0, len(rows), 500):
+            batch = rows[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            for row, doc_id, document, metadata in self.DB.execute(
+                    f"SELECT row, id, document, metadata FROM records WHERE row IN ({placeholders})", batch):
+                records[row] = (doc_id, document, json.loads(metadata) if metadata else None)
+        return records
+
+    def upsert(self, ids: List[str], embeddings, documents: List[str], metadatas: List[dict]):
+        """
+        Store vectors with their text and metadata, replacing existing IDs.
+
+        Args:
+            ids (list): Chunk IDs.
+            embeddings (list): Their embeddings.
+            documents (list): Their texts.
+            metadatas (list): Their metadata.
+        """
+        if not ids:
+            return
+        vectors = self.prepare(embeddings)
+        with self.LOCK:
+            if self.matrix is None:
+                self.dimensions = vectors.shape[1]
+                self.allocate(max(1024, len(ids)))
+            elif vectors.shape[1] != self.dimensions:
+                raise ValueError(f"Expected {self.dimensions}-dimensional embeddings, got {vectors.shape[1]}.")
+
+            replaced = self.lookup_rows(ids)
+            if self.size + len(ids) > len(self.matrix):
+                self.allocate(max(2 * len(self.matrix), self.size + len(ids)))
+
+            rows = np.arange(self.size, self.size + len(ids))
+            stored, scales = self.encode(vectors)
+            self.matrix[rows] = stored
+            self.matrix.flush()
+            if scales is not None:
+                self.scales[rows] = scales
+                self.scales.flush()
+
+            with self.DB:
+                for start in range(0, len(ids), 500):
+                    batch = ids[start:start + 500]
+                    self.DB.execute(f"DELETE FROM records WHERE id IN ({','.join('?' * len(batch))})", batch)
+                self.DB.executemany(
+                    "INSERT INTO records (row, id, document, metadata) VALUES (?, ?, ?, ?)",
+                    [(int(row), doc_id, document, json.dumps(metadata))
+                     for row, doc_id, document, metadata in zip(rows, ids, documents, metadatas)]
+                )
+                self.write_meta(self.size + len(ids))
+
+            self.live[replaced] = False
+            self.live[rows] = True
+            self.size += len(ids)
+            self.compact_if_needed()
+            self.remove_retired()
+
+    def write_meta(self, size: int, generation: Optional[int] = None):
+        generation = self.generation if generation is None else generation
+        self.DB.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                            [("dimensions", str(self.dimensions)), ("dtype", self.DTYPE), ("size", str(size)),
+                             ("generation", str(generation))])
+
+    def update(self, ids: List[str], metadatas: List[dict]):
+        """Replace the metadata of stored vectors."""
+        with self.LOCK, self.DB:
+            self.DB.executemany("UPDATE records SET metadata = ? WHERE id = ?",
+                                [(json.dumps(metadata), doc_id) for doc_id, metadata in zip(ids, metadatas)])
+
+    def delete(self, ids: List[str]):
+        """Remove vectors by ID."""
+        with self.LOCK:
+            rows = self.lookup_rows(ids)
+            with self.DB:
+                for start in range(0, len(ids), 500):
+                    batch = ids[start:start + 500]
+                    self.DB.execute(f"DELETE FROM records WHERE id IN ({','.join('?' * len(batch))})", batch)
+            self.live[rows] = False
+            self.compact_if_needed()
+            self.remove_retired()
+
+    def compact_if_needed(self):
+        live = int(self.live[:self.size].sum())
+        if self.size >= 1024 and self.size - live > 0.25 * self.size:
+            self.compact()
+
+    def compact(self):
+        """Rewrite the matrix without tombstoned rows and renumber the records."""
+        with self.LOCK:
+            rows = np.flatnonzero(self.live[:self.size])
+            logger.info(f"Compacting {self.PATH}: {self.size - len(rows)} of {self.size} rows are tombstones.")
+            capacity = max(1024, 2 * len(rows))
+            generation, matrix, scales = self.write_generation(capacity, rows)
+
+            # Rows only move down, so renumbering in ascending order never collides.
+            # The new generation is recorded in the same transaction, so a restart maps the matching file.
+            with self.DB:
+                self.DB.executemany("UPDATE records SET row = ? WHERE row = ?",
+                                    [(new, int(old)) for new, old in enumerate(rows) if new != old])
+                self.write_meta(len(rows), generation)
+            self.switch_generation(generation, matrix, scales)
+            self.size = len(rows)
+            self.live = np.zeros(capacity, dtype=bool)
+            self.live[:self.size] = True
+
+    def get(self,
+            ids: Optional[List[str]] = None,
+            include: Sequence[str] = ("documents", "metadatas"),
+            limit: Optional[int] = None,
+            offset: int = 0) -> dict:
+        """
+        Return stored records by ID, or a page of all records in storage order.
+
+        Args:
+            ids (list): The IDs to return; all records when None.
+            include (list): Any of "documents", "metadatas", "embeddings".
+            limit (int): Page size when listing all records.
+            offset (int): Page start when listing all records.
+
+        Returns:
+            dict: "ids" plus the included fields, as Chroma returns them.
+        """
+        with self.LOCK:
+            if ids is not None:
+                rows = self.lookup_rows(ids)
+            else:
+                rows = [row for (row,) in self.DB.execute("SELECT row FROM records ORDER BY row LIMIT ? OFFSET ?",
+                                                          (-1 if limit is None else limit, offset))]
+            records = self.fetch_records(rows)
+            rows = [row for row in rows if row in records]
+            vectors = (self.decode(self.matrix, self.scales, np.asarray(rows, dtype=np.int64))
+                       if "embeddings" in include and rows else np.zeros((0, self.dimensions or 0), dtype=np.float32))
+
+        result = {"ids": [records[row][0] for row in rows]}
+        if "documents" in include:
+            result["documents"] = [records[row][1] for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [records[row][2] for row in rows]
+        if "embeddings" in include:
+            result["embeddings"] = list(vectors)
+        return result
+
+    def score(self, matrix: np.ndarray, scales: Optional[np.ndarray], size: int, queries: np.ndarray) -> np.ndarray:
+        """Coarse scores of every stored row against each query, block by block."""
+        dimensions = matrix.shape[1]
+        coarse = min(self.COARSE_DIMENSIONS, dimensions) if self.COARSE_DIMENSIONS else dimensions
+        queries = queries[:, :coarse].T
+        scores = np.empty((queries.shape[1], size), dtype=np.float32)
+        for start in range(0, size, self.BLOCK_ROWS):
+            end = min(start + self.BLOCK_ROWS, size)
+            block = np.asarray(matrix[start:end, :coarse], dtype=np.float32) @ queries
+            if scales is not None:
+                block *= scales[start:end, None]
+            scores[:, start:end] = block.T
+        return scores
+
+    def query(self,
+              query_embeddings: List[List[float]],
+              n_results: int = 10,
+              include: Sequence[str] = ("documents", "metadatas", "distances")) -> dict:
+        """
+        Find the nearest stored vectors of each query by cosine similarity.
+
+        Args:
+            query_embeddings (list): The query embeddings.
+            n_results (int): Results per query.
+            include (list): Any of "documents", "metadatas", "embeddings", "distances".
+
+        Returns:
+            dict: Per-query lists of "ids" and the included fields, best
+                first, with cosine distances (1 - similarity).
+        """
+        queries = self.prepare(query_embeddings)
+        while True:
+            with self.LOCK:
+                matrix, scales, size, generation = self.matrix, self.scales, self.size, self.generation
+                live = self.live[:size].copy()
+            if matrix is None or not live.any():
+                hits, records = [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)) for _ in queries], {}
+                break
+
+            if queries.shape[1] != matrix.shape[1]:
+                raise ValueError(f"Expected {matrix.shape[1]}-dimensional queries, got {queries.shape[1]}.")
+
+            scores = self.score(matrix, scales, size, queries)
+            scores[:, ~live] = -np.inf
+            candidates = min(int(live.sum()), n_results * self.RESCORE_FACTOR)
+            hits = []
+            for query, query_scores in zip(queries, scores):
+                top = np.argpartition(-query_scores, candidates - 1)[:candidates]
+                top = top[live[top]]
+                exact = normalize_rows(self.decode(matrix, scales, top)) @ query
+                order = np.argsort(-exact, kind="stable")[:n_results]
+                hits.append((top[order], exact[order]))
+
+            with self.LOCK:
+                # The matrix moved to a new generation (a compaction renumbers rows); score again against it
+                if generation != self.generation:
+                    continue
+                records = self.fetch_records(np.unique(np.concatenate([rows for rows, _ in hits])))
+            break
+
+        result = {"ids": [], "documents": [], "metadatas": [], "embeddings": [], "distances": []}
+        for rows, similarities in hits:
+            keep = [i for i, row in enumerate(rows) if int(row) in records]
+            rows, similarities = [int(rows[i]) for i in keep], similarities[keep]
+            result["ids"].append([records[row][0] for row in rows])
+            result["documents"].append([records[row][1] for row in rows])
+            result["metadatas"].append([records[row][2] for row in rows])
+            result["distances"].append([float(1 - similarity) for similarity in similarities])
+            result["embeddings"].append(list(self.decode(matrix, scales, np.asarray(rows, dtype=np.int64)))
+                                        if "embeddings" in include and rows else [])
+        return {key: value for key, value in result.items() if key == "ids" or key in include}
+
+    def close(self):
+        """Close the records and drop the mappings; searches still holding one finish on it."""
+        with self.LOCK:
+            self.DB.close()
+            self.matrix = self.scales = None
+            self.live = np.zeros(0, dtype=bool)
+            self.remove_retired()
@@ -0,0 +1,152 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Tuple
+
+# Third-party libraries
+from loguru import logger
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (16, 64, 256, 1024, 2048, 4096, 8192, 16384, 32768, 65536)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+LOG_FORMAT = ("<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | "
+              "<magenta>{extra[request_id]}</magenta> | "
+              "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>")
+
+def configure_logging():
+    """Tag every log record with the request ID of the current context."""
+    logger.remove()
+    logger.configure(extra={"request_id": "-"},
+                     patcher=lambda record: record["extra"].update(request_id=request_id_var.get()))
+    logger.add(sys.stderr, format=LOG_FORMAT)
+
+def format_labels(labels: Tuple[Tuple[str, str], ...], **extra) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = [(key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+               for key, value in pairs]
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    def __init__(self, name: str, description: str):
+        self.NAME = name
+        self.DESCRIPTION = description
+        self.LOCK = threading.Lock()
+        self.values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.LOCK:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.NAME} {self.DESCRIPTION}", f"# TYPE {self.NAME} counter"]
+        with self.LOCK:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.NAME}{format_labels(key)} {value}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram with labels, in the Prometheus layout."""
+
+    def __init__(self, name: str, description: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.NAME = name
+        self.DESCRIPTION = description
+        self.BUCKETS = tuple(sorted(buckets))
+        self.LOCK = threading.Lock()
+        self.values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.LOCK:
+            series = self.values.get(key)
+            if series is None:
+                # Per-bucket counts (last one is +Inf), sum, count
+                series = self.values[key] = [[0] * (len(self.BUCKETS) + 1), 0.0, 0]
+            series[0][bisect_left(self.BUCKETS, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.NAME} {self.DESCRIPTION}", f"# TYPE {self.NAME} histogram"]
+        with self.LOCK:
+            for key, (counts, total, count) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, bucket in zip(self.BUCKETS + (float("inf"),), counts):
+                    cumulative += bucket
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{self.NAME}_bucket{format_labels(key, le=le)} {cumulative}")
+                lines.append(f"{self.NAME}_sum{format_labels(key)} {total}")
+                lines.append(f"{self.NAME}_count{format_labels(key)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """Process-wide registry of counters and histograms.
+
+    Collectors are callables run at scrape time that return extra
+    exposition lines, used for values owned elsewhere (e.g. cache counters).
+    """
+
+    def __init__(self):
+        self.LOCK = threading.Lock()
+        self.METRICS: Dict[str, object] = {}
+        self.COLLECTORS: List[Callable[[], List[str]]] = []
+
+    def counter(self, name: str, description: str) -> Counter:
+        with self.LOCK:
+            if name not in self.METRICS:
+                self.METRICS[name] = Counter(name, description)
+            return self.METRICS[name]
+
+    def histogram(self, name: str, description: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        with self.LOCK:
+            if name not in self.METRICS:
+                self.METRICS[name] = Histogram(name, description, buckets)
+            return self.METRICS[name]
+
+    def register_collector(self, collector: Callable[[], List[str]]):
+        with self.LOCK:
+            self.COLLECTORS.append(collector)
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        with self.LOCK:
+            metrics = list(self.METRICS.values())
+            collectors = list(self.COLLECTORS)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = metrics.histogram("rag_http_request_seconds", "HTTP request latency by route and status.")
+INFERENCE_STAGE_SECONDS = metrics.histogram("rag_inference_stage_seconds", "Time spent per inference stage.")
+INGESTION_STAGE_SECONDS = metrics.histogram("rag_ingestion_stage_seconds", "Time spent per ingestion stage batch.")
+INGESTION_ITEMS = metrics.counter("rag_ingestion_items_total", "Pages or chunks processed per ingestion stage.")
+EMBEDDED_TOKENS = metrics.counter("rag_ingestion_embedded_tokens_total", "Tokens of new chunks sent for embedding, by chunking strategy.")
+LLM_TOKENS = metrics.counter("rag_llm_tokens_total", "Estimated prompt and completion tokens sent to the LLM.")
+PROMPT_CHARACTERS = metrics.histogram("rag_prompt_characters", "Size of rendered prompts in characters.", SIZE_BUCKETS)
+INTENT_DECISIONS = metrics.counter("rag_intent_decisions_total", "Chat intent decisions by intent and method.")
+RESPONSE_CACHE_LOOKUPS = metrics.counter("rag_response_cache_lookups_total", "Response cache lookups by tier and result.")
+COALESCED_REQUESTS = metrics.counter("rag_coalesced_requests_total", "Inference requests that led or joined identical in-flight work, by endpoint.")
+
+@contextmanager
+def timed(histogram: Histogram, **labels) -> Iterator[None]:
+    """Observe the wall-clock duration of the block, also when it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started, **labels)
@@ -1,13 +1,47 @@
-from langchain_openai import ChatOpenAI
+import time
 from app.be.core.config import settings
+from app.be.utils.metrics import (INFERENCE_STAGE_SECONDS, LLM_TOKENS, PROMPT_CHARACTERS,
+                                  RESPONSE_CACHE_LOOKUPS, timed)
+from app.be.utils.resources import resources
+from app.be.utils.tokens import count_tokens
 from loguru import logger
-from typing import Optional
+from typing import AsyncIterator, Optional
 from app.be.schemas.inference_models import AIModelParameters
 
+def is_cacheable(parameters: AIModelParameters) -> bool:
+    """Only (near-)deterministic generations are safe to serve from cache."""
+    return (settings.response_cache_enabled and
+            parameters.temperature is not None and
+            parameters.temperature <= settings.response_cache_max_temperature)
+
+def record_generation(prompt: str, response: str):
+    """Count the tokens of an LLM call that was not served from cache."""
+    PROMPT_CHARACTERS.observe(len(prompt))
+    LLM_TOKENS.inc(count_tokens(prompt, settings.llm_model), kind="prompt")
+    LLM_TOKENS.inc(count_tokens(response, settings.llm_model), kind="completion")
+
+def get_cached_response(prompt: str, parameters: AIModelParameters) -> Optional[str]:
+    """Look the prompt up in the exact response cache, if the parameters allow caching."""
+    if not is_cacheable(parameters):
+        return None
+    cached = resources.get_response_cache().get(prompt, settings.llm_model, parameters.model_dump())
+    RESPONSE_CACHE_LOOKUPS.inc(tier="exact", result="miss" if cached is None else "hit")
+    if cached is not None:
+        logger.info("Serving response from cache.")
+    return cached
+
+def store_response(prompt: str, parameters: AIModelParameters, response: str):
+    """Record a fresh generation in the metrics and, if allowed, the response cache."""
+    record_generation(prompt, response)
+    if is_cacheable(parameters) and response:
+        resources.get_response_cache().set(prompt, settings.llm_model, parameters.model_dump(), response)
+
 def invoke_model(prompt: str,
                  parameters: Optional[AIModelParameters] = AIModelParameters()) -> str:
     """
     Invoke the LLM with the given prompt and parameters.
+
+    Blocking variant for worker threads (e.g. session summaries).
     
     Args:
         prompt (str): The input prompt for the LLM.
@@ -18,15 +52,79 @@ def invoke_model(prompt: str,
         str: The response from the LLM.
     """
     logger.info(f"Parameters: {parameters}")
-    LLM = ChatOpenAI(
-                openai_api_key=settings.openai_api_key,
-                model=settings.llm_model,
-                temperature=parameters.temperature,
-                max_tokens=parameters.max_tokens,
-                top_p=parameters.top_p,
-                frequency_penalty=parameters.frequency_penalty,
-                presence_penalty=parameters.presence_penalty
-            )
-
-    response = LLM.invoke(prompt)
-    return response.content if response else "No response from the model."
+    cached = get_cached_response(prompt, parameters)
+    if cached is not None:
+        return cached
+
+    LLM = resources.get_chat_model(parameters)
+
+    with timed(INFERENCE_STAGE_SECONDS, stage="llm"):
+        response = LLM.invoke(prompt)
+    if not response:
+        return "No response from the model."
+
+    store_response(prompt, parameters, response.content)
+    return response.content
+
+
+async def ainvoke_model(prompt: str,
+                        parameters: Optional[AIModelParameters] = AIModelParameters()) -> str:
+    """
+    Invoke the LLM without blocking the event loop.
+
+    Args:
+        prompt (str): The input prompt for the LLM.
+        parameters (AIModelParameters): Parameters for the LLM invocation.
+
+    Returns:
+        str: The response from the LLM.
+    """
+    logger.info(f"Parameters: {parameters}")
+    cached = get_cached_response(prompt, parameters)
+    if cached is not None:
+        return cached
+
+    LLM = resources.get_chat_model(parameters)
+
+    with timed(INFERENCE_STAGE_SECONDS, stage="llm"):
+        response = await LLM.ainvoke(prompt)
+    if not response:
+        return "No response from the model."
+
+    store_response(prompt, parameters, response.content)
+    return response.content
+
+
+async def stream_model(prompt: str,
+                       parameters: Optional[AIModelParameters] = AIModelParameters()) -> AsyncIterator[str]:
+    """
+    Stream the LLM completion for the given prompt token by token.
+
+    Closing the generator (e.g. when the client disconnects) cancels the
+    upstream request.
+
+    Args:
+        prompt (str): The input prompt for the LLM.
+        parameters (AIModelParameters): Parameters for the LLM invocation.
+
+    Yields:
+        str: Pieces of the response as they arrive.
+    """
+    logger.info(f"Parameters: {parameters}")
+    cached = get_cached_response(prompt, parameters)
+    if cached is not None:
+        yield cached
+        return
+
+    LLM = resources.get_chat_model(parameters)
+
+    tokens = []
+    started = time.perf_counter()
+    async for chunk in LLM.astream(prompt):
+        if chunk.content:
+            if not tokens:
+                INFERENCE_STAGE_SECONDS.observe(time.perf_counter() - started, stage="llm_first_token")
+            tokens.append(chunk.content)
+            yield chunk.content
+    INFERENCE_STAGE_SECONDS.observe(time.perf_counter() - started, stage="llm")
+    store_response(prompt, parameters, "".join(tokens))
@@ -0,0 +1,686 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import contextvars
+import importlib
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, Optional, Union
+
+# Third-party libraries
+import httpx
+from loguru import logger
+
+# Custom libraries
+from app.be.core.config import settings
+from app.be.schemas.inference_models import AIModelParameters
+from app.be.utils.cache import CachedEmbeddings, EmbeddingCache, ResponseCache
+from app.be.utils.document_index import DocumentIndex, summarize_stored_chunks
+from app.be.utils.embedding import EmbeddingScheduler, HashingEmbeddings
+from app.be.utils.index_versions import IndexVersions
+from app.be.utils.intent import IntentClassifier
+from app.be.utils.lexical import BM25Index
+from app.be.utils.manifest import IngestionManifest
+from app.be.utils.matrix_store import MatrixIndex
+from app.be.utils.metrics import metrics
+
+if TYPE_CHECKING:
+    # Imported where first used: langchain_chroma and langchain_openai dominate import time
+    from langchain_chroma import Chroma
+    from langchain_openai import ChatOpenAI
+
+# Deferred imports the first request would otherwise pay for, loaded by the warm-up
+WARM_UP_MODULES = ["langchain_core.documents", "langchain_core.prompts", "langchain_text_splitters.character"]
+
+class IndexBusy(RuntimeError):
+    """Raised when a collection cannot be changed because index maintenance is running."""
+
+class ResourceManager:
+    """Process-wide owner of the vector store, embedding and chat clients.
+
+    The FastAPI lifespan starts and closes the manager; request handlers only
+    borrow the shared instances, so a request pays for search and generation
+    instead of re-opening Chroma and re-creating OpenAI clients.
+
+    The vector store opened is the active index version (see IndexVersions),
+    queried with the embedding model it was built with.
+    """
+
+    def __init__(self,
+                 vector_store_path: Optional[str] = None,
+                 embedder: Optional[str] = None,
+                 embeddings_model: Optional[str] = None,
+                 shared: Optional["ResourceManager"] = None):
+        """
+        Initialize the ResourceManager.
+
+        Args:
+            vector_store_path (str): Open this store instead of the active index
+                version, e.g. to build a new version next to the live one.
+            embedder (str): The embedder, defaults to the one the store was built with.
+            embeddings_model (str): The embedding model, likewise.
+            shared (ResourceManager): A manager whose HTTP clients and caches are
+                reused instead of opening new ones.
+        """
+        self.VERSIONS = IndexVersions(settings.vector_store_path)
+        if vector_store_path is None:
+            self.INDEX_VERSION = self.VERSIONS.active()
+            self.VECTOR_STORE_PATH = self.VERSIONS.path(self.INDEX_VERSION)
+            metadata = self.VERSIONS.read_metadata(self.INDEX_VERSION)
+        else:
+            self.INDEX_VERSION = None
+            self.VECTOR_STORE_PATH = vector_store_path
+            metadata = {}
+        self.EMBEDDER = embedder or metadata.get("embedder") or settings.embedder
+        self.EMBEDDINGS_MODEL = embeddings_model or metadata.get("embeddings_model") or settings.embeddings_model
+        self.API_KEY = settings.openai_api_key
+        self.CHAT_CLIENT_CACHE_SIZE = settings.chat_client_cache_size
+        self.SHARED = shared
+
+        self.LOCK = threading.RLock()
+        self.WRITE_LOCK = threading.Lock()
+        self.WRITERS_CHANGED = threading.Condition()
+        self.WRITERS = 0
+        self.MAINTENANCE_RUNNING = False
+        self.CLAIMS_CHANGED = threading.Condition()
+        self.CLAIMS = []
+        self.RETIRED = []
+        self.HTTP_CLIENT = None
+        self.ASYNC_HTTP_CLIENT = None
+        self.EMBEDDING_CACHE = None
+        self.RESPONSE_CACHE = None
+        self.EMBEDDINGS = None
+        self.EMBEDDING_SCHEDULER = None
+        self.VECTOR_STORES = {}
+        self.MANIFESTS = {}
+        self.LEXICAL_INDEXES = {}
+        self.DOCUMENT_INDEXES = {}
+        self.LOADING_LOCKS = {}
+        self.INTENT_CLASSIFIER = None
+        self.RETRIEVAL_EXECUTOR = None
+        self.SHARD_EXECUTOR = None
+        self.CHAT_MODELS = OrderedDict()
+        self.VERSION = 0
+        self.READY = threading.Event()
+        self.WARM_UP_ERROR = None
+
+    def get_http_client(self) -> httpx.Client:
+        """Return the shared keep-alive HTTP client used by all OpenAI clients."""
+        if self.SHARED is not None:
+            return self.SHARED.get_http_client()
+        with self.LOCK:
+            if self.HTTP_CLIENT is None:
+                limits = httpx.Limits(
+                    max_connections=settings.http_max_connections,
+                    max_keepalive_connections=settings.http_max_keepalive_connections
+                )
+                self.HTTP_CLIENT = httpx.Client(limits=limits,
+                                                timeout=settings.http_timeout)
+            return self.HTTP_CLIENT
+
+    def get_async_http_client(self) -> httpx.AsyncClient:
+        """Return the shared keep-alive HTTP client used by async OpenAI calls."""
+        if self.SHARED is not None:
+            return self.SHARED.get_async_http_client()
+        with self.LOCK:
+            if self.ASYNC_HTTP_CLIENT is None:
+                limits = httpx.Limits(
+                    max_connections=settings.http_max_connections,
+                    max_keepalive_connections=settings.http_max_keepalive_connections
+                )
+                self.ASYNC_HTTP_CLIENT = httpx.AsyncClient(limits=limits,
+                                                           timeout=settings.http_timeout)
+            return self.ASYNC_HTTP_CLIENT
+
+    def get_embedding_cache(self) -> EmbeddingCache:
+        """Return the shared query-embedding cache."""
+        if self.SHARED is not None:
+            return self.SHARED.get_embedding_cache()
+        with self.LOCK:
+            if self.EMBEDDING_CACHE is None:
+                self.EMBEDDING_CACHE = EmbeddingCache(
+                    max_size=settings.embedding_cache_size,
+                    ttl=settings.embedding_cache_ttl,
+                    persist_path=settings.embedding_cache_path
+                )
+            return self.EMBEDDING_CACHE
+
+    def get_response_cache(self) -> ResponseCache:
+        """Return the shared LLM response cache."""
+        if self.SHARED is not None:
+            return self.SHARED.get_response_cache()
+        with self.LOCK:
+            if self.RESPONSE_CACHE is None:
+                self.RESPONSE_CACHE = ResponseCache(
+                    max_size=settings.response_cache_size,
+                    ttl=settings.response_cache_ttl,
+                    semantic_enabled=settings.semantic_cache_enabled,
+                    semantic_distance=settings.semantic_cache_distance
+                )
+            return self.RESPONSE_CACHE
+
+    def get_embeddings(self) -> CachedEmbeddings:
+        """Return the shared embedding client, fronted by the query cache."""
+        with self.LOCK:
+            if self.EMBEDDINGS is None:
+                logger.info(f"Initializing {self.EMBEDDER} embedding client...")
+                if self.EMBEDDER == "local":
+                    dimensions = settings.local_embedding_dimensions
+                    embeddings = HashingEmbeddings(dimensions=dimensions)
+                    model = f"local-hashing-{dimensions}"
+                elif self.EMBEDDER == "openai":
+                    from langchain_openai import OpenAIEmbeddings
+
+                    embeddings = OpenAIEmbeddings(model=self.EMBEDDINGS_MODEL,
+                                                  openai_api_key=self.API_KEY,
+                                                  openai_api_base=settings.openai_base_url,
+                                                  check_embedding_ctx_length=settings.embedding_check_ctx_length,
+                                                  http_client=self.get_http_client(),
+                                                  http_async_client=self.get_async_http_client())
+                    model = self.EMBEDDINGS_MODEL
+                else:
+                    raise ValueError(f"Unknown embedder: {self.EMBEDDER}. Use 'openai' or 'local'.")
+
+                self.EMBEDDINGS = CachedEmbeddings(embeddings,
+                                                   cache=self.get_embedding_cache(),
+                                                   model=model)
+            return self.EMBEDDINGS
+
+    def get_embedding_scheduler(self) -> EmbeddingScheduler:
+        """Return the shared scheduler that rate-limits ingestion embeddings."""
+        with self.LOCK:
+            if self.EMBEDDING_SCHEDULER is None:
+                self.EMBEDDING_SCHEDULER = EmbeddingScheduler(self.get_embeddings())
+            return self.EMBEDDING_SCHEDULER
+
+    def collection_path(self, collection: str, filename: str) -> str:
+        """
+        Return where a collection keeps one of its side files (manifest, BM25 and document indexes).
+
+        The default collection keeps the original layout at the root of the
+        vector store, so stores created before collections existed still load.
+        """
+        if collection == settings.default_collection:
+            return os.path.join(self.VECTOR_STORE_PATH, filename)
+        return os.path.join(self.VECTOR_STORE_PATH, "collections", collection, filename)
+
+    def get_vector_store(self, collection: Optional[str] = None) -> Union["Chroma", MatrixIndex]:
+        """Return the shared store of a collection, opening (or creating) it on first use.
+
+        VECTOR_BACKEND selects Chroma or the memory-mapped MatrixIndex.
+        """
+        collection = collection or settings.default_collection
+        with self.LOCK:
+            if collection not in self.VECTOR_STORES:
+                logger.info(f"Initializing {settings.vector_backend} vector store collection {collection}...")
+                if settings.vector_backend == "chroma":
+                    from langchain_chroma import Chroma
+
+                    store = Chroma(collection_name=collection,
+                                   persist_directory=self.VECTOR_STORE_PATH,
+                                   embedding_function=self.get_embeddings())
+                elif settings.vector_backend == "matrix":
+                    store = MatrixIndex(self.collection_path(collection, "matrix"),
+                                        dimensions=settings.matrix_dimensions,
+                                        dtype=settings.matrix_dtype,
+                                        coarse_dimensions=settings.matrix_coarse_dimensions,
+                                        rescore_factor=settings.matrix_rescore_factor)
+                else:
+                    raise ValueError(f"Unknown vector backend: {settings.vector_backend}. Use 'chroma' or 'matrix'.")
+                self.VECTOR_STORES[collection] = store
+            return self.VECTOR_STORES[collection]
+
+    def get_collection(self, collection: Optional[str] = None):
+        """Return the low-level collection (query, get, upsert, update, delete, count) of either backend."""
+        store = self.get_vector_store(collection)
+        return store if isinstance(store, MatrixIndex) else store._collection
+
+    def list_collections(self) -> List[str]:
+        """Return the names of the collections in the vector store."""
+        if settings.vector_backend == "matrix":
+            names = {settings.default_collection}
+            named = os.path.join(self.VECTOR_STORE_PATH, "collections")
+            if os.path.isdir(named):
+                names.update(name for name in os.listdir(named)
+                             if os.path.isdir(os.path.join(named, name, "matrix")))
+            return sorted(names)
+        client = self.get_vector_store()._client
+        return sorted(getattr(collection, "name", collection) for collection in client.list_collections())
+
+    def has_collection(self, collection: str) -> bool:
+        """Tell whether a collection exists, without creating it."""
+        with self.LOCK:
+            if collection in self.VECTOR_STORES or collection == settings.default_collection:
+                return True
+        return collection in self.list_collections()
+
+    def get_manifest(self, collection: Optional[str] = None) -> IngestionManifest:
+        """Return the manifest describing what a collection contains."""
+        collection = collection or settings.default_collection
+        with self.LOCK:
+            if collection not in self.MANIFESTS:
+                self.MANIFESTS[collection] = IngestionManifest(self.collection_path(collection, "manifest.sqlite3"))
+            return self.MANIFESTS[collection]
+
+    def open_index(self, registry: str, collection: str, filename: str,
+                   load: Callable[[str, str, object, IngestionManifest], object]):
+        """
+        Return a side index of a collection, loading it on first use.
+
+        Loading may rebuild the index from the whole collection, so it runs
+        under a lock of its own per index rather than under LOCK: requests
+        keep borrowing handles meanwhile, and concurrent first uses wait for
+        a single load. The index is published to the registry the load
+        started from, so a version switch in between never mixes versions.
+
+        Args:
+            registry (str): The attribute holding the indexes, e.g. "LEXICAL_INDEXES".
+            collection (str): The collection.
+            filename (str): The index file, see collection_path.
+            load (Callable): Builds the index as load(path, collection, store, manifest).
+        """
+        with self.LOCK:
+            indexes = getattr(self, registry)
+            if collection in indexes:
+                return indexes[collection]
+            loading = self.LOADING_LOCKS.setdefault((registry, collection), threading.Lock())
+            path = self.collection_path(collection, filename)
+            store = self.get_collection(collection)
+            manifest = self.get_manifest(collection)
+
+        with loading:
+            with self.LOCK:
+                if collection in indexes:
+                    return indexes[collection]
+            index = load(path, collection, store, manifest)
+            with self.LOCK:
+                return indexes.setdefault(collection, index)
+
+    def get_lexical_index(self, collection: Optional[str] = None) -> BM25Index:
+        """Return the BM25 index kept alongside a collection.
+
+        An index missing on disk is rebuilt from the collection, so existing
+        vector stores gain lexical search without re-ingestion.
+        """
+        return self.open_index("LEXICAL_INDEXES", collection or settings.default_collection, "bm25.pkl",
+                               self.load_lexical_index)
+
+    @staticmethod
+    def load_lexical_index(path: str, collection: str, store, manifest: IngestionManifest) -> BM25Index:
+        index = BM25Index(path, k1=settings.bm25_k1, b=settings.bm25_b)
+        if not os.path.exists(path) and store.count() > 0:
+            logger.info(f"Building BM25 index from collection {collection}...")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            offset, page = 0, 1000
+            while True:
+                records = store.get(include=["documents"], limit=page, offset=offset)
+                if not records["ids"]:
+                    break
+                index.add(records["ids"], records["documents"])
+                offset += page
+            index.save()
+        return index
+
+    def get_document_index(self, collection: Optional[str] = None) -> DocumentIndex:
+        """Return the document-level index kept alongside a collection.
+
+        An index missing on disk is rebuilt from the stored chunk embeddings,
+        so existing vector stores gain two-stage retrieval without re-ingestion.
+        """
+        return self.open_index("DOCUMENT_INDEXES", collection or settings.default_collection, "documents.pkl",
+                               self.load_document_index)
+
+    @staticmethod
+    def load_document_index(path: str, collection: str, store, manifest: IngestionManifest) -> DocumentIndex:
+        index = DocumentIndex(path)
+        documents = manifest.list_documents()
+        if not os.path.exists(path) and documents:
+            logger.info(f"Building document index from collection {collection}...")
+            for entry in documents:
+                index.replace(entry["document"],
+                              summarize_stored_chunks(store, manifest.get_chunk_ids(entry["document"]),
+                                                      settings.document_section_chunks))
+            index.save()
+        return index
+
+    def get_intent_classifier(self) -> IntentClassifier:
+        """Return the shared local intent router."""
+        with self.LOCK:
+            if self.INTENT_CLASSIFIER is None:
+                self.INTENT_CLASSIFIER = IntentClassifier(self.get_embeddings(),
+                                                          min_margin=settings.intent_min_margin)
+            return self.INTENT_CLASSIFIER
+
+    def get_retrieval_executor(self) -> ThreadPoolExecutor:
+        """Return the pool that runs speculative retrieval next to intent routing."""
+        with self.LOCK:
+            if self.RETRIEVAL_EXECUTOR is None:
+                self.RETRIEVAL_EXECUTOR = ThreadPoolExecutor(max_workers=settings.retrieval_workers,
+                                                             thread_name_prefix="retrieval")
+            return self.RETRIEVAL_EXECUTOR
+
+    def get_shard_executor(self) -> ThreadPoolExecutor:
+        """Return the pool that queries the collections of a fan-out search in parallel.
+
+        Kept apart from the retrieval pool, whose threads wait on these queries.
+        """
+        with self.LOCK:
+            if self.SHARD_EXECUTOR is None:
+                self.SHARD_EXECUTOR = ThreadPoolExecutor(max_workers=settings.shard_search_workers,
+                                                         thread_name_prefix="shard")
+            return self.SHARD_EXECUTOR
+
+    def get_chat_model(self, parameters: AIModelParameters) -> "ChatOpenAI":
+        """
+        Return a chat client for the given parameter set.
+
+        Clients are kept in a bounded LRU keyed by the parameter values and
+        all of them share the same HTTP connection pool.
+
+        Args:
+            parameters (AIModelParameters): Parameters for the LLM invocation.
+
+        Returns:
+            ChatOpenAI: The chat client configured with the parameters.
+        """
+        key = tuple(sorted(parameters.model_dump().items()))
+        with self.LOCK:
+            if key in self.CHAT_MODELS:
+                self.CHAT_MODELS.move_to_end(key)
+                return self.CHAT_MODELS[key]
+
+            from langchain_openai import ChatOpenAI
+
+            LLM = ChatOpenAI(
+                openai_api_key=self.API_KEY,
+                openai_api_base=settings.openai_base_url,
+                model=settings.llm_model,
+                temperature=parameters.temperature,
+                max_tokens=parameters.max_tokens,
+                top_p=parameters.top_p,
+                frequency_penalty=parameters.frequency_penalty,
+                presence_penalty=parameters.presence_penalty,
+                http_client=self.get_http_client(),
+                http_async_client=self.get_async_http_client()
+            )
+            self.CHAT_MODELS[key] = LLM
+            if len(self.CHAT_MODELS) > self.CHAT_CLIENT_CACHE_SIZE:
+                self.CHAT_MODELS.popitem(last=False)
+            return LLM
+
+    def reload_vector_store(self, collection: Optional[str] = None):
+        """Re-open a collection after it has been changed by ingestion.
+
+        Requests already holding the previous instance finish against it;
+        new requests pick up the fresh collection handle. Cached responses
+        were built from the old contents, so they are dropped.
+        """
+        collection = collection or settings.default_collection
+        with self.LOCK:
+            logger.info(f"Reloading vector store collection {collection}...")
+            # A MatrixIndex is always current and must stay the only writer of its files
+            if not isinstance(self.VECTOR_STORES.get(collection), MatrixIndex):
+                self.VECTOR_STORES.pop(collection, None)
+            self.VERSION += 1
+            self.get_response_cache().clear()
+            self.get_vector_store(collection)
+
+    @contextmanager
+    def writing(self, blocking: bool = True) -> Iterator[None]:
+        """
+        Hold off index maintenance while collections are being changed.
+
+        Writers (ingestion sessions, deletions) share the index with each
+        other; maintenance waits for them to finish and keeps new ones out
+        until it is done, so a build never misses a change and a version
+        switch never happens halfway through a write. Readers are not
+        involved at all.
+
+        Args:
+            blocking (bool): Wait for running maintenance to end, rather than
+                raise IndexBusy.
+        """
+        with self.WRITERS_CHANGED:
+            if self.MAINTENANCE_RUNNING and not blocking:
+                raise IndexBusy("Index maintenance is running, try again when it has finished.")
+            self.WRITERS_CHANGED.wait_for(lambda: not self.MAINTENANCE_RUNNING)
+            self.WRITERS += 1
+        try:
+            yield
+        finally:
+            with self.WRITERS_CHANGED:
+                self.WRITERS -= 1
+                self.WRITERS_CHANGED.notify_all()
+
+    @contextmanager
+    def claiming(self, collection: str, documents: Optional[Iterable[str]] = None) -> Iterator[None]:
+        """
+        Hold documents of a collection while they are changed, waiting for other holders.
+
+        Ingestion diffs a document against the manifest when it is chunked
+        and records the result once its chunks are stored; two writers of
+        the same document in between would both diff against the same old
+        version and leave the chunks of one of them orphaned. Claims are
+        taken all at once, so writers never deadlock on each other.
+
+        Args:
+            collection (str): The collection.
+            documents (Iterable): The document names, or None for the whole
+                collection (a full scan, which also deletes documents).
+        """
+        claim = (collection, None if documents is None else frozenset(documents))
+
+        def conflicts(other: tuple) -> bool:
+            return other[0] == claim[0] and (other[1] is None or claim[1] is None or bool(other[1] & claim[1]))
+
+        with self.CLAIMS_CHANGED:
+            self.CLAIMS_CHANGED.wait_for(lambda: not any(conflicts(other) for other in self.CLAIMS))
+            self.CLAIMS.append(claim)
+        try:
+            yield
+        finally:
+            with self.CLAIMS_CHANGED:
+                self.CLAIMS.remove(claim)
+                self.CLAIMS_CHANGED.notify_all()
+
+    @contextmanager
+    def maintaining(self) -> Iterator[None]:
+        """Run index maintenance alone: wait for running writers and block new ones."""
+        with self.WRITERS_CHANGED:
+            self.WRITERS_CHANGED.wait_for(lambda: not self.MAINTENANCE_RUNNING)
+            self.MAINTENANCE_RUNNING = True
+            self.WRITERS_CHANGED.wait_for(lambda: self.WRITERS == 0)
+        try:
+            yield
+        finally:
+            with self.WRITERS_CHANGED:
+                self.MAINTENANCE_RUNNING = False
+                self.WRITERS_CHANGED.notify_all()
+
+    def open_collections(self) -> List[str]:
+        """Open every collection with the indexes the configured retrieval reads; returns their names."""
+        collections = self.list_collections()
+        for collection in collections:
+            self.get_vector_store(collection)
+            self.get_manifest(collection)
+            if settings.retrieval_mode == "hybrid":
+                self.get_lexical_index(collection)
+            if settings.hierarchical_retrieval:
+                self.get_document_index(collection)
+        return collections
+
+    def activate_version(self, version: str, prepared: Optional["ResourceManager"] = None):
+        """
+        Switch readers to another index version.
+
+        The version is opened (or taken over, already open, from the manager
+        that built it) before the switch, so the switch itself only swaps
+        handles under the lock and the first queries afterwards do not pay
+        for loading it. Requests already running finish against the handles
+        they borrowed; the old handles are closed at the next switch. Must
+        run inside maintaining().
+
+        Args:
+            version (str): The index version to activate.
+            prepared (ResourceManager): A manager with the version already open.
+        """
+        metadata = self.VERSIONS.read_metadata(version)
+        if prepared is None:
+            prepared = ResourceManager(vector_store_path=self.VERSIONS.path(version),
+                                       embedder=metadata.get("embedder"),
+                                       embeddings_model=metadata.get("embeddings_model"),
+                                       shared=self)
+        prepared.open_collections()
+
+        with self.LOCK:
+            self.VERSIONS.activate(version)
+            self.close_retired()
+            self.RETIRED = list(self.VECTOR_STORES.values()) + list(self.MANIFESTS.values())
+            self.VECTOR_STORES = prepared.VECTOR_STORES
+            self.MANIFESTS = prepared.MANIFESTS
+            self.LEXICAL_INDEXES = prepared.LEXICAL_INDEXES
+            self.DOCUMENT_INDEXES = prepared.DOCUMENT_INDEXES
+            self.INDEX_VERSION = version
+            self.VECTOR_STORE_PATH = prepared.VECTOR_STORE_PATH
+            if (prepared.EMBEDDER, prepared.EMBEDDINGS_MODEL) != (self.EMBEDDER, self.EMBEDDINGS_MODEL):
+                logger.info(f"Index version {version} is queried with {prepared.EMBEDDER} "
+                            f"embeddings {prepared.EMBEDDINGS_MODEL}.")
+                self.EMBEDDER = prepared.EMBEDDER
+                self.EMBEDDINGS_MODEL = prepared.EMBEDDINGS_MODEL
+                self.EMBEDDINGS = prepared.EMBEDDINGS
+                self.EMBEDDING_SCHEDULER = None
+                self.INTENT_CLASSIFIER = None
+            self.VERSION += 1
+            self.get_response_cache().clear()
+
+    def close_retired(self):
+        """Close the stores and manifests of the version replaced by the last switch."""
+        for retired in self.RETIRED:
+            if isinstance(retired, IngestionManifest):
+                retired.close()
+        self.close_vector_stores([retired for retired in self.RETIRED if not isinstance(retired, IngestionManifest)])
+        self.RETIRED = []
+
+    @staticmethod
+    def close_vector_stores(stores: Iterable):
+        """
+        Close vector stores, so the files of their version can be removed.
+
+        A MatrixIndex closes its records and mappings. Chroma keeps one
+        system (with its SQLite connections and HNSW segments) per persist
+        directory in a process-wide cache; it is stopped and dropped from
+        the cache, so a store opened there later starts a fresh one.
+
+        Args:
+            stores (Iterable): Stores of either backend.
+        """
+        systems = {}
+        for store in stores:
+            if isinstance(store, MatrixIndex):
+                store.close()
+            else:
+                system = store._client._system
+                systems[id(system)] = system
+        if not systems:
+            return
+
+        from chromadb.api.shared_system_client import SharedSystemClient
+
+        for system in systems.values():
+            SharedSystemClient._identifier_to_system.pop(system.settings.persist_directory, None)
+            try:
+                system.stop()
+            except Exception as e:
+                logger.error(f"Failed to close the Chroma store at {system.settings.persist_directory}: {e}")
+
+    def warm_up(self):
+        """Open the vector store and default clients ahead of the first request."""
+        logger.info("Warming up resources...")
+        started = time.perf_counter()
+        collection = self.get_collection()
+        self.get_embeddings()
+        self.get_chat_model(AIModelParameters())
+        for module in WARM_UP_MODULES:
+            importlib.import_module(module)
+        count = collection.count()
+        logger.info(f"Resources ready in {time.perf_counter() - started:.2f} seconds, vector store holds {count} chunks.")
+
+    def start_warm_up(self) -> threading.Thread:
+        """
+        Warm up in a background thread and mark the manager ready when done.
+
+        The server accepts connections (and answers liveness probes) right
+        away; readiness waits for the warm-up, so a new worker only gets
+        traffic once the first request will not pay for it. Requests that
+        arrive earlier still work, opening what they need on demand.
+
+        Returns:
+            threading.Thread: The warm-up thread.
+        """
+        def run():
+            try:
+                self.warm_up()
+                self.READY.set()
+            except Exception as e:
+                logger.error(f"Warm-up failed: {e}")
+                self.WARM_UP_ERROR = str(e)
+
+        self.READY.clear()
+        self.WARM_UP_ERROR = None
+        thread = threading.Thread(target=contextvars.copy_context().run, args=(run,),
+                                  name="warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def collect_metrics(self) -> list:
+        """Render the cache counters as Prometheus samples at scrape time."""
+        lines = []
+        caches = [("embedding", self.EMBEDDING_CACHE), ("response", self.RESPONSE_CACHE)]
+        for name, cache in caches:
+            if cache is None:
+                continue
+            for key, value in cache.stats().items():
+                lines.append(f'rag_cache_{key}{{cache="{name}"}} {value}')
+        for name in list(self.VECTOR_STORES):
+            lines.append(f'rag_vector_store_chunks{{collection="{name}"}} {self.get_collection(name).count()}')
+        lines.append(f"rag_vector_store_version {self.VERSION}")
+        lines.append(f'rag_index_version_info{{version="{self.INDEX_VERSION}"}} 1')
+        return lines
+
+    async def aclose(self):
+        """Release the shared clients, including the async connection pool."""
+        with self.LOCK:
+            client, self.ASYNC_HTTP_CLIENT = self.ASYNC_HTTP_CLIENT, None
+        if client is not None:
+            await client.aclose()
+        self.close()
+
+    def close(self):
+        """Release the shared clients."""
+        with self.LOCK:
+            self.CHAT_MODELS.clear()
+            self.close_vector_stores(self.VECTOR_STORES.values())
+            self.VECTOR_STORES.clear()
+            self.close_retired()
+            self.LEXICAL_INDEXES.clear()
+            self.DOCUMENT_INDEXES.clear()
+            for manifest in self.MANIFESTS.values():
+                manifest.close()
+            self.MANIFESTS.clear()
+            self.EMBEDDINGS = None
+            self.EMBEDDING_SCHEDULER = None
+            self.INTENT_CLASSIFIER = None
+            if self.RETRIEVAL_EXECUTOR is not None:
+                self.RETRIEVAL_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+                self.RETRIEVAL_EXECUTOR = None
+            if self.SHARD_EXECUTOR is not None:
+                self.SHARD_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+                self.SHARD_EXECUTOR = None
+            if self.HTTP_CLIENT is not None and self.SHARED is None:
+                self.HTTP_CLIENT.close()
+                self.HTTP_CLIENT = None
+        logger.info("Resources released.")
+
+resources = ResourceManager()
+metrics.register_collector(resources.collect_metrics)
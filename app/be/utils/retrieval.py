@@ -0,0 +1,78 @@
+from typing import List
+
+# Third-party libraries
+import numpy as np
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length, leaving all-zero rows untouched."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+def cosine_similarities(query: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+    """
+    Cosine similarity of a query against every row of a matrix.
+
+    Vectors stored with fewer (Matryoshka-truncated) components than the
+    query are compared on the query's matching leading components.
+
+    Args:
+        query (np.ndarray): The query embedding.
+        vectors (np.ndarray): Candidate embeddings, one per row.
+
+    Returns:
+        np.ndarray: Similarities in [-1, 1], higher is more similar.
+    """
+    if len(vectors) == 0:
+        return np.zeros(0, dtype=np.float32)
+    query = np.asarray(query, dtype=np.float32)[..., :np.shape(vectors)[-1]]
+    return normalize_rows(vectors) @ normalize_rows(query)
+
+def maximal_marginal_relevance(relevance: np.ndarray,
+                               vectors: np.ndarray,
+                               k: int,
+                               lambda_mult: float = 0.7,
+                               duplicate_similarity: float = 0.95) -> List[int]:
+    """
+    Select candidates that are relevant but not redundant with each other.
+
+    The pairwise similarity matrix is computed once and the running maximum
+    similarity to the selected set is updated with a vectorized ``maximum``
+    per step. Candidates at least ``duplicate_similarity`` close to an
+    already selected one are dropped outright, even if fewer than k remain.
+
+    Args:
+        relevance (np.ndarray): Relevance of each candidate to the query.
+        vectors (np.ndarray): Candidate embeddings, one per row.
+        k (int): The number of candidates to select.
+        lambda_mult (float): 1.0 ranks purely by relevance, 0.0 purely by diversity.
+        duplicate_similarity (float): Similarity above which a candidate is a near-duplicate.
+
+    Returns:
+        list: Indices of the selected candidates, in selection order.
+    """
+    count = len(relevance)
+    if count == 0 or k <= 0:
+        return []
+
+    unit = normalize_rows(vectors)
+    pairwise = unit @ unit.T
+    relevance = np.asarray(relevance, dtype=np.float32)
+
+    selected = [int(np.argmax(relevance))]
+    available = np.ones(count, dtype=bool)
+    available[selected[0]] = False
+    max_similarity = pairwise[selected[0]].copy()
+
+    while len(selected) < min(k, count):
+        available &= max_similarity < duplicate_similarity
+        if not available.any():
+            break
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_similarity, pairwise[best], out=max_similarity)
+
+    return selected
@@ -0,0 +1,198 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import threading
+import time
+from typing import Dict, List, Optional
+import uuid
+
+# Third-party libraries
+from loguru import logger
+
+# Custom libraries
+from app.be.core.config import settings
+from app.be.schemas.inference_models import AIModelParameters
+from app.be.utils.tokens import count_tokens, truncate_tokens
+
+SUMMARY_PROMPT = (
+    "Update the running summary of a conversation between a user and an AI assistant with the new turns below. "
+    "Keep names, numbers, document references and open questions; drop greetings and filler. "
+    "Respond with the updated summary only, in at most {max_words} words.\n\n"
+    "Current summary:\n{summary}\n\n"
+    "New turns:\n{turns}"
+)
+
+def render_turns(turns: List[Dict]) -> str:
+    lines = []
+    for turn in turns:
+        lines.append(f"User: {turn['user']}")
+        if turn.get("assistant"):
+            lines.append(f"Assistant: {turn['assistant']}")
+    return "\n".join(lines)
+
+class ConversationSession:
+    """Turns of one conversation plus a summary of the turns that no longer fit verbatim."""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.turns: List[Dict] = []
+        self.summary = ""
+        self.summarized = 0  # turns[:summarized] are folded into the summary
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.lock = threading.Lock()
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            return {"session_id": self.session_id,
+                    "turns": list(self.turns),
+                    "summary": self.summary,
+                    "summarized_turns": self.summarized,
+                    "created_at": self.created_at,
+                    "updated_at": self.updated_at}
+
+class SessionStore:
+    """Bounded in-memory store of conversation sessions with TTL eviction.
+
+    Clients send a session ID instead of the whole transcript. The history
+    put into prompts keeps the most recent turns verbatim within a token
+    budget; older turns are folded into a running summary in the
+    background, one batch of new turns at a time, so each turn costs at most
+    one small summarization call.
+    """
+
+    def __init__(self,
+                 max_sessions: int = 10000,
+                 ttl: float = 86400.0,
+                 recent_tokens: int = 600,
+                 summary_tokens: int = 250):
+        """
+        Initialize the SessionStore.
+
+        Args:
+            max_sessions (int): Maximum number of sessions kept.
+            ttl (float): Seconds of inactivity before a session expires, 0 disables expiry.
+            recent_tokens (int): Token budget of the verbatim recent turns.
+            summary_tokens (int): Token budget of the summary of older turns.
+        """
+        self.MAX_SESSIONS = max_sessions
+        self.TTL = ttl
+        self.RECENT_TOKENS = recent_tokens
+        self.SUMMARY_TOKENS = summary_tokens
+
+        self.LOCK = threading.Lock()
+        self.SESSIONS = OrderedDict()
+        self.EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sessions")
+
+    def is_expired(self, session: ConversationSession) -> bool:
+        return self.TTL > 0 and time.time() - session.updated_at > self.TTL
+
+    def get(self, session_id: str) -> Optional[ConversationSession]:
+        """Return a live session, or None if it is unknown or expired."""
+        with self.LOCK:
+            session = self.SESSIONS.get(session_id)
+            if session is None:
+                return None
+            if self.is_expired(session):
+                del self.SESSIONS[session_id]
+                return None
+            self.SESSIONS.move_to_end(session_id)
+            return session
+
+    def get_or_create(self, session_id: Optional[str] = None) -> ConversationSession:
+        """Return the session with the given ID, creating it (with a fresh ID if none) when missing."""
+        session = self.get(session_id) if session_id else None
+        if session is not None:
+            return session
+        session = ConversationSession(session_id or uuid.uuid4().hex)
+        with self.LOCK:
+            self.SESSIONS[session.session_id] = session
+            while len(self.SESSIONS) > self.MAX_SESSIONS:
+                self.SESSIONS.popitem(last=False)
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        with self.LOCK:
+            return self.SESSIONS.pop(session_id, None) is not None
+
+    def recent_start(self, session: ConversationSession) -> int:
+        """Index of the oldest turn that still fits the verbatim budget."""
+        used, start = 0, len(session.turns)
+        for index in range(len(session.turns) - 1, -1, -1):
+            used += count_tokens(render_turns([session.turns[index]]), settings.llm_model)
+            if used > self.RECENT_TOKENS and start < len(session.turns):
+                break
+            start = index
+        return start
+
+    def build_history(self, session: ConversationSession) -> str:
+        """
+        Render the history for a prompt: the summary, then the recent turns verbatim.
+
+        The newest turn is always included, cut to the verbatim budget if needed.
+
+        Args:
+            session (ConversationSession): The conversation.
+
+        Returns:
+            str: The history text.
+        """
+        with session.lock:
+            # Turns that left the window but are still being summarized are left out until it catches up
+            start = max(self.recent_start(session), session.summarized)
+            recent = render_turns(session.turns[start:])
+            summary = truncate_tokens(session.summary, self.SUMMARY_TOKENS, settings.llm_model)
+        recent = truncate_tokens(recent, self.RECENT_TOKENS, settings.llm_model, keep="end")
+        if summary:
+            return f"Summary of the earlier conversation: {summary}\n{recent}"
+        return recent
+
+    def append(self, session: ConversationSession, user: str, assistant: str):
+        """Record a finished turn and fold turns that left the verbatim window into the summary."""
+        with session.lock:
+            session.turns.append({"user": user, "assistant": assistant})
+            session.updated_at = time.time()
+            pending = self.recent_start(session) > session.summarized
+        if pending:
+            self.EXECUTOR.submit(contextvars.copy_context().run, self.compact, session)
+
+    def compact(self, session: ConversationSession):
+        """Summarize the turns between the last summary and the verbatim window."""
+        with session.lock:
+            end = self.recent_start(session)
+            if end <= session.summarized:
+                return
+            turns = session.turns[session.summarized:end]
+            previous = session.summary
+
+        try:
+            # Imported here to keep the session store free of model clients at import time
+            from app.be.utils.model import invoke_model
+            summary = invoke_model(
+                prompt=SUMMARY_PROMPT.format(max_words=int(self.SUMMARY_TOKENS * 0.75),
+                                             summary=previous or "(none)",
+                                             turns=render_turns(turns)),
+                parameters=AIModelParameters(temperature=0.0, max_tokens=self.SUMMARY_TOKENS)
+            )
+        except Exception as e:
+            # Offline or failing LLM: keep the gist by clipping each turn
+            logger.warning(f"Summarizing session {session.session_id} failed, clipping turns instead: {e}")
+            clipped = render_turns([{"user": truncate_tokens(turn["user"], 40, settings.llm_model),
+                                     "assistant": truncate_tokens(turn.get("assistant") or "", 40, settings.llm_model)}
+                                    for turn in turns])
+            summary = f"{previous}\n{clipped}".strip()
+
+        with session.lock:
+            # Another compaction may have finished first; only move forward
+            if end > session.summarized:
+                session.summary = truncate_tokens(summary, self.SUMMARY_TOKENS, settings.llm_model, keep="end")
+                session.summarized = end
+        logger.info(f"Session {session.session_id}: {end} turns folded into the summary.")
+
+    def shutdown(self):
+        self.EXECUTOR.shutdown(wait=False, cancel_futures=True)
+
+sessions = SessionStore(max_sessions=settings.session_max_count,
+                        ttl=settings.session_ttl,
+                        recent_tokens=settings.history_recent_tokens,
+                        summary_tokens=settings.history_summary_tokens)
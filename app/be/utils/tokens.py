@@ -0,0 +1,78 @@
+from functools import lru_cache
+from typing import Optional
+
+# Third-party libraries
+from loguru import logger
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str):
+    """
+    Return the tiktoken encoding for a model, or None when it is unavailable.
+
+    tiktoken downloads its vocabularies on first use, so offline workers fall
+    back to a character-based estimate instead of failing.
+
+    Args:
+        model (str): The OpenAI model name.
+    """
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken encoding for {model} unavailable, estimating tokens: {e}")
+        return None
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Count the tokens of a text for a model.
+
+    Args:
+        text (str): The text to measure.
+        model (str): The OpenAI model name, defaults to the embeddings model.
+
+    Returns:
+        int: The number of tokens (estimated as 4 characters per token when
+            no encoding is available).
+    """
+    if model is None:
+        from app.be.core.config import settings
+        model = settings.embeddings_model
+
+    encoding = get_encoding(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_tokens(text: str, max_tokens: int, model: Optional[str] = None, keep: str = "start") -> str:
+    """
+    Cut a text down to at most max_tokens tokens.
+
+    Args:
+        text (str): The text to shorten.
+        max_tokens (int): The token budget.
+        model (str): The OpenAI model name, defaults to the embeddings model.
+        keep (str): "start" keeps the beginning, "end" keeps the most recent part.
+
+    Returns:
+        str: The text, unchanged when it already fits.
+    """
+    if max_tokens <= 0:
+        return ""
+    if model is None:
+        from app.be.core.config import settings
+        model = settings.embeddings_model
+
+    encoding = get_encoding(model)
+    if encoding is None:
+        limit = max_tokens * 4
+        if len(text) <= limit:
+            return text
+        return text[:limit] if keep == "start" else text[-limit:]
+
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens] if keep == "start" else tokens[-max_tokens:])
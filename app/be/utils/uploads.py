@@ -0,0 +1,42 @@
+import hashlib
+from pathlib import Path
+import time
+from typing import BinaryIO, Tuple
+
+# Custom libraries
+from app.be.utils.metrics import INGESTION_ITEMS, INGESTION_STAGE_SECONDS
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds the configured size limit."""
+
+def spool_upload(source: BinaryIO, destination: Path, max_bytes: int, block_size: int = 1 << 20) -> Tuple[str, int]:
+    """
+    Copy an upload to disk, hashing it and enforcing the size limit on the fly.
+
+    The upload is read once: the content hash used for incremental indexing
+    comes out of the same pass that writes the file, so ingestion never has
+    to read it back just to decide whether it changed.
+
+    Args:
+        source (BinaryIO): The upload's file object.
+        destination (Path): Where to write the file.
+        max_bytes (int): The maximum accepted size.
+        block_size (int): Bytes read per step.
+
+    Returns:
+        tuple: The SHA-256 of the contents and the size in bytes.
+    """
+    started = time.time()
+    digest = hashlib.sha256()
+    size = 0
+    with open(destination, "wb") as f:
+        for block in iter(lambda: source.read(block_size), b""):
+            size += len(block)
+            if size > max_bytes:
+                raise UploadTooLarge(f"{destination.name} exceeds the upload limit of {max_bytes} bytes.")
+            digest.update(block)
+            f.write(block)
+
+    INGESTION_STAGE_SECONDS.observe(time.time() - started, stage="upload")
+    INGESTION_ITEMS.inc(1, stage="upload")
+    return digest.hexdigest(), size
@@ -0,0 +1,28 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from core.config import settings
+
+_session = None
+_lock = threading.Lock()
+
+def get_session() -> requests.Session:
+    """
+    Return the keep-alive HTTP session shared by all backend calls.
+
+    Streamlit reruns the script on every interaction; reusing one pooled
+    session avoids a new TCP connection per request.
+
+    Returns:
+        requests.Session: The shared session.
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            adapter = HTTPAdapter(pool_connections=settings.http_pool_connections,
+                                  pool_maxsize=settings.http_pool_maxsize)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
@@ -1,5 +1,8 @@
-import requests
+import json
+from typing import Iterator, List, Optional
 from core.config import settings
+from api_requests.client import get_session
+from api_requests.tracing import request_headers
 
 def make_inference_request(payload: dict, invoke_type: str = "indirect") -> dict:
     """
@@ -18,7 +21,8 @@ def make_inference_request(payload: dict, invoke_type: str = "indirect") -> dict
     else:
         raise ValueError("Invalid invoke_type. Use 'indirect' or 'direct'.")
 
-    response = requests.post(endpoint, json=payload)
+    response = get_session().post(endpoint, json=payload, headers=request_headers(endpoint),
+                                  timeout=settings.request_timeout)
     
     if response.status_code == 200:
         response_json = response.json()
@@ -26,3 +30,85 @@ def make_inference_request(payload: dict, invoke_type: str = "indirect") -> dict
         return response
     else:
         raise Exception(f"Error: {response.status_code} - {response.text}")
+
+
+def stream_inference_request(payload: dict, invoke_type: str = "indirect") -> Iterator[str]:
+    """
+    Make a request to the streaming inference endpoint.
+    Args:
+        payload (dict): The input data for inference.
+        invoke_type (str): The type of invocation, default is "indirect". "chat"
+            lets the backend route the message itself.
+
+    Yields:
+        str: Pieces of the response as the backend produces them.
+    """
+    if invoke_type == "indirect":
+        endpoint = settings.inference_stream_endpoint
+    elif invoke_type == "direct":
+        endpoint = settings.direct_inference_stream_endpoint
+    elif invoke_type == "chat":
+        endpoint = settings.chat_endpoint
+    else:
+        raise ValueError("Invalid invoke_type. Use 'indirect', 'direct' or 'chat'.")
+
+    with get_session().post(endpoint, json=payload, stream=True,
+                            headers=request_headers(endpoint),
+                            timeout=settings.request_timeout) as response:
+        if response.status_code != 200:
+            raise Exception(f"Error: {response.status_code} - {response.text}")
+
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                continue
+            event = json.loads(line)
+            if event["type"] == "token":
+                yield event["content"]
+            elif event["type"] == "error":
+                yield event["message"]
+
+
+def make_batch_inference_request(payloads: List[dict], concurrency: Optional[int] = None) -> List[dict]:
+    """
+    Answer many questions with a single request to the batch endpoint.
+    Args:
+        payloads (List[dict]): Inference payloads, as for make_inference_request.
+        concurrency (int): Requested number of LLM calls in flight (capped by the backend).
+
+    Returns:
+        List[dict]: {"index", "response", "error"} per payload, in order.
+    """
+    endpoint = settings.batch_inference_endpoint
+    response = get_session().post(endpoint,
+                                  json={"items": payloads, "concurrency": concurrency},
+                                  headers=request_headers(endpoint),
+                                  timeout=settings.batch_timeout)
+
+    if response.status_code == 200:
+        return response.json()["results"]
+    else:
+        raise Exception(f"Error: {response.status_code} - {response.text}")
+
+
+def stream_batch_inference_request(payloads: List[dict], concurrency: Optional[int] = None) -> Iterator[dict]:
+    """
+    Answer many questions, yielding each result as soon as the backend finishes it.
+    Args:
+        payloads (List[dict]): Inference payloads, as for make_inference_request.
+        concurrency (int): Requested number of LLM calls in flight (capped by the backend).
+
+    Yields:
+        dict: {"index", "response", "error"} per payload, in completion order.
+    """
+    endpoint = settings.batch_inference_stream_endpoint
+    with get_session().post(endpoint,
+                            json={"items": payloads, "concurrency": concurrency},
+                            stream=True,
+                            headers=request_headers(endpoint),
+                            timeout=settings.batch_timeout) as response:
+        if response.status_code != 200:
+            raise Exception(f"Error: {response.status_code} - {response.text}")
+
+        for line in response.iter_lines(decode_unicode=True):
+            if line:
+                yield json.loads(line)
@@ -1,6 +1,27 @@
-import requests
 from core.config import settings
+from api_requests.client import get_session
+from api_requests.tracing import request_headers
 
 def ingest_files(files):
-    response = requests.post(settings.ingestion_endpoint, files=files)
-    return response
\ No newline at end of file
+    response = get_session().post(settings.ingestion_endpoint, files=files,
+                                  headers=request_headers(settings.ingestion_endpoint),
+                                  timeout=settings.request_timeout)
+    return response
+
+def get_ingestion_job(job_id: str) -> dict:
+    """
+    Fetch the status and per-file progress of an ingestion job.
+    Args:
+        job_id (str): The ID returned by the ingestion endpoint.
+
+    Returns:
+        dict: The job status.
+    """
+    endpoint = f"{settings.ingestion_jobs_endpoint}/{job_id}"
+    response = get_session().get(endpoint, headers=request_headers(endpoint),
+                                 timeout=settings.request_timeout)
+
+    if response.status_code == 200:
+        return response.json()
+    else:
+        raise Exception(f"Error: {response.status_code} - {response.text}")
@@ -0,0 +1,16 @@
+import uuid
+from loguru import logger
+from core.config import settings
+
+def request_headers(endpoint: str) -> dict:
+    """
+    Build headers carrying a fresh request ID, so backend logs can be matched to this call.
+    Args:
+        endpoint (str): The endpoint being called, for the log line.
+
+    Returns:
+        dict: Headers for the request.
+    """
+    request_id = uuid.uuid4().hex
+    logger.debug(f"Request {request_id} to {endpoint}")
+    return {settings.request_id_header: request_id}
@@ -14,7 +14,21 @@ class Settings(BaseSettings):
     base_url: str = "http://localhost:8000"
     inference_endpoint: str = f"{base_url}/api/inference"
     direct_inference_endpoint: str = f"{base_url}/api/direct-inference"
+    chat_endpoint: str = f"{base_url}/api/chat"
+    batch_inference_endpoint: str = f"{base_url}/api/inference/batch"
+    batch_inference_stream_endpoint: str = f"{base_url}/api/inference/batch/stream"
+    batch_timeout: float = 3600.0
+    inference_stream_endpoint: str = f"{base_url}/api/inference/stream"
+    direct_inference_stream_endpoint: str = f"{base_url}/api/direct-inference/stream"
     ingestion_endpoint: str = f"{base_url}/api/ingestion"
+    ingestion_jobs_endpoint: str = f"{base_url}/api/ingestion/jobs"
+    ingestion_poll_interval: float = 1.0
+    request_id_header: str = "X-Request-ID"
+
+    # HTTP client settings
+    http_pool_connections: int = 4
+    http_pool_maxsize: int = 10
+    request_timeout: tuple = (5.0, 300.0)  # (connect, read) seconds
 
     # class Config:
     #     env_file = ".env"
@@ -1,10 +1,12 @@
 import streamlit as st
 from loguru import logger
+import time
+import uuid
 
 # Custom libraries
 from core.config import settings
-from api_requests.inference import make_inference_request
-from api_requests.ingestion import ingest_files
+from api_requests.inference import stream_inference_request
+from api_requests.ingestion import ingest_files, get_ingestion_job
 
 
 class App:
@@ -30,6 +32,10 @@ class App:
                 "assistant": "Hello 👋! I'm your AI Assistant. I can answer your questions based on your uploaded documents. You can also attach files like PDF, DOCX, or TXT to help me assist you better."
             }]
 
+        # History lives on the backend; requests only carry this ID
+        if "session_id" not in st.session_state:
+            st.session_state.session_id = uuid.uuid4().hex
+
         if "clicked" not in st.session_state:
             st.session_state.clicked = False
 
@@ -51,11 +57,8 @@ class App:
             frequency_penalty (float): Frequency penalty for token generation.
             presence_penalty (float): Presence penalty for token generation.
         """
-        
-        N = 10  # Number of past turns to keep
-        recent_conversation = st.session_state.conversation[-N:]
-
         payload = {
+            "session_id": st.session_state.session_id,
             "ai_model_parameters": {
                 "temperature": temperature,
                 "max_tokens": max_tokens,
@@ -65,61 +68,43 @@ class App:
             }
         }
 
-        # Build chat history text
-        history_text = ""
-        for turn in recent_conversation:
-            if turn["user"]:
-                history_text += f"User: {turn['user']}\n"
-            if turn["assistant"]:
-                history_text += f"Assistant: {turn['assistant']}\n"
-                
-        # Use lightweight LLM call to detect user intent
-        intent_prompt = (
-            f"Classify the following user message as either 'conversation' or 'document'. "
-            f"Only respond with 'conversation' or 'document', nothing else.\n\n"
-            f"User message: {user_input}"
-        )
-
-        logger.info(f"Detecting user intent for the message: {user_input}")
-
-        payload["query"] = intent_prompt
-        intent = make_inference_request(payload, invoke_type="direct")
-        logger.info(f"Detected intent: {intent}")
-
-        # Route based on detected intent
-        if intent == "conversation":
-            chat_prompt = (
-                f"You are a friendly, helpful AI assistant having an ongoing conversation. "
-                f"Here is the conversation so far:\n\n"
-                f"{history_text}\n"
-                f"Now, respond naturally to the user's latest message:\n\n"
-                f"{user_input}"
-            )
-
-            payload["query"] = chat_prompt
-            assistant_response = make_inference_request(payload, invoke_type="direct")
-
-        elif intent == "document":
-            logger.info(f"Generating response for document intent.")
-            payload["query"] = user_input
-            payload["history"] = history_text
-            assistant_response = make_inference_request(payload, invoke_type="indirect")
+        # Render the user message right away, then stream the answer into place.
+        # The backend routes the message (documents or conversation) itself.
+        self.messages.chat_message("user").write(user_input)
+        assistant_message = self.messages.chat_message("assistant")
 
-        else:
-            assistant_response = (
-                "I'm sorry, I couldn't determine the type of your message. "
-                "Please rephrase or ask your document-related question again."
-            )
+        payload["query"] = user_input
+        assistant_response = assistant_message.write_stream(
+            stream_inference_request(payload, invoke_type="chat")
+        )
 
-        logger.info(f"Generated response for conversation intent: {assistant_response}")
+        logger.info(f"Generated response: {assistant_response}")
         
-        # Update conversation and render latest message pair
+        # Update conversation
         st.session_state.conversation.append({
             "user": user_input,
             "assistant": assistant_response,
         })
-        self.messages.chat_message("user").write(user_input)
-        self.messages.chat_message("assistant").write(assistant_response)
+
+    def wait_for_ingestion(self, job_id: str) -> dict:
+        """
+        Poll an ingestion job until it finishes, showing per-file progress.
+
+        Args:
+            job_id (str): The ID returned by the ingestion endpoint.
+
+        Returns:
+            dict: The final job status.
+        """
+        status = st.empty()
+        while True:
+            job = get_ingestion_job(job_id)
+            status.caption(" · ".join(f"{file['name']}: {file['stage']}" for file in job["files"]))
+
+            if job["status"] in ("completed", "failed"):
+                status.empty()
+                return job
+            time.sleep(settings.ingestion_poll_interval)
 
     def toggle_clicked(self):   
         """Toggle the state of the file uploader."""
@@ -191,8 +176,18 @@ class App:
                     response = ingest_files(files)
 
                     if response.status_code == 200:
-                        logger.info(f"Files successfully ingested!")
-                        st.success("Files successfully ingested!")
+                        job = self.wait_for_ingestion(response.json()["job_id"])
+
+                        if job["status"] == "completed":
+                            logger.info(f"Files successfully ingested!")
+                            st.success("Files successfully ingested!")
+                        else:
+                            logger.error(f"Failed to ingest files: {job['error']}")
+                            st.error(f"Failed to ingest files: {job['error']}")
+
+                        for file in job["files"]:
+                            if file["error"]:
+                                st.error(f"{file['name']}: {file['error']}")
 
                     else:
                         logger.error(f"Failed to ingest files: {response.status_code}")
@@ -0,0 +1,118 @@
+"""Chunking strategy comparison.
+
+Parses a corpus once and chunks it with each strategy, reporting the
+chunk count, the total tokens that would be sent for embedding (the
+embedding cost), how much of that is overlap, the chunk size
+distribution and the chunking time. Nothing is embedded.
+
+Usage (from the repository root):
+    python -m benchmark.chunking --corpus medium
+    python -m benchmark.chunking --path app/be/data/raw --chunk-tokens 250 400 600
+"""
+import argparse
+import json
+import os
+from pathlib import Path
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+# Third-party libraries
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+# Custom libraries
+from benchmark.corpus import CORPUS_SIZES, generate_corpus
+from benchmark.run import RESULTS_PATH, git_commit
+
+def measure(chunk: Callable[[list], list], files: Dict[str, list], model: str) -> Dict:
+    """Chunk every file's pages and describe the resulting chunks."""
+    from app.be.utils.tokens import count_tokens
+
+    started = time.perf_counter()
+    chunks = [piece for pages in files.values() for piece in chunk(pages)]
+    seconds = time.perf_counter() - started
+
+    tokens = np.asarray([count_tokens(piece.page_content, model) for piece in chunks])
+    source_tokens = sum(count_tokens(page.page_content, model) for pages in files.values() for page in pages)
+    if not len(tokens):
+        return {"chunks": 0, "seconds": round(seconds, 3)}
+    return {"chunks": len(chunks),
+            "embedded_tokens": int(tokens.sum()),
+            "overlap_ratio": round(float(tokens.sum()) / max(source_tokens, 1) - 1, 4),
+            "tokens_per_chunk": {"mean": round(float(tokens.mean()), 1),
+                                 "p50": int(np.percentile(tokens, 50)),
+                                 "p95": int(np.percentile(tokens, 95)),
+                                 "min": int(tokens.min()), "max": int(tokens.max())},
+            "seconds": round(seconds, 3)}
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare chunking strategies on a corpus.")
+    parser.add_argument("--corpus", choices=sorted(CORPUS_SIZES), default="medium")
+    parser.add_argument("--path", help="Chunk the PDF/DOCX/TXT files of this folder instead of a synthetic corpus.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-tokens", type=int, nargs="*", default=[],
+                        help="Extra structured variants with one target size for every file type.")
+    parser.add_argument("--output", help="Result file (default: benchmark/results/chunking-<timestamp>.json).")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+    from app.be.core.config import settings
+    from app.be.utils.chunking import StructuredChunker
+    from app.be.utils.ingestion import LOADER_MAPPING, FileIngestor, load_file
+
+    if args.path:
+        paths = sorted(str(path) for path in Path(args.path).rglob("*") if path.suffix.lower() in LOADER_MAPPING)
+    else:
+        paths = generate_corpus(tempfile.mkdtemp(prefix="rag-chunking-"), seed=args.seed, queries=1,
+                                **CORPUS_SIZES[args.corpus])["files"]
+    print(f"Parsing {len(paths)} files...")
+    files = {path: load_file(path) for path in paths}
+
+    def ingestor_strategy(strategy: str) -> Callable[[list], list]:
+        ingestor = FileIngestor()
+        ingestor.CHUNK_STRATEGY = strategy
+        return ingestor.transform_docs_to_chunks
+
+    strategies = {
+        f"character-{settings.chunk_size}/{settings.chunk_overlap}": ingestor_strategy("character"),
+        "structured": ingestor_strategy("structured"),
+    }
+    for chunk_tokens in args.chunk_tokens:
+        chunker = StructuredChunker(chunk_tokens=chunk_tokens, overlap_tokens=settings.chunk_overlap_tokens,
+                                    min_tokens=settings.chunk_min_tokens, model=settings.embeddings_model)
+        strategies[f"structured-{chunk_tokens}"] = chunker.split_documents
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "config": {"corpus": None if args.path else args.corpus, "path": args.path, "files": len(paths),
+                   "pages": sum(len(pages) for pages in files.values()),
+                   "chunk_tokens": settings.chunk_tokens, "chunk_tokens_by_type": settings.chunk_tokens_by_type,
+                   "chunk_overlap_tokens": settings.chunk_overlap_tokens, "model": settings.embeddings_model},
+        "strategies": {},
+    }
+    for name, chunk in strategies.items():
+        print(f"Chunking with {name}...")
+        results["strategies"][name] = measure(chunk, files, settings.embeddings_model)
+
+    output = Path(args.output) if args.output else RESULTS_PATH / f"chunking-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    print(f"{'strategy':22} {'chunks':>8} {'embedded tokens':>16} {'overlap':>8} {'mean':>7} {'p95':>6}")
+    for name, result in results["strategies"].items():
+        if not result["chunks"]:
+            continue
+        print(f"{name:22} {result['chunks']:>8} {result['embedded_tokens']:>16} {result['overlap_ratio']:>8.1%} "
+              f"{result['tokens_per_chunk']['mean']:>7} {result['tokens_per_chunk']['p95']:>6}")
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Upstream calls and latency of bursts of identical inference requests.
+
+Starts the fake OpenAI-compatible server and the backend like
+``benchmark.run``, ingests a synthetic corpus, then sends bursts of
+identical requests (as when a popular question is asked by many users at
+once) with request coalescing off and on. Each burst uses a fresh query,
+and the response cache is off, so every saving comes from coalescing.
+Reports the embedding and chat completion calls that reached the fake API
+and the latency seen by the clients.
+
+Usage (from the repository root):
+    python -m benchmark.coalescing --bursts 10 --burst-size 20
+    python -m benchmark.coalescing --endpoint /api/inference/stream
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+from pathlib import Path
+import sys
+import tempfile
+import time
+from typing import Dict
+
+# Third-party libraries
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+# Custom libraries
+from benchmark.corpus import CORPUS_SIZES, generate_corpus
+from benchmark.run import RESULTS_PATH, ServerThread, benchmark_ingestion, free_port, git_commit, summarize
+
+def run_bursts(client: httpx.Client, fake_app, endpoint: str, queries: list, bursts: int, burst_size: int,
+               label: str) -> Dict:
+    """Send each query burst_size times at once and count what reached the fake API."""
+    before = dict(fake_app.state.requests)
+    latencies, errors = [], 0
+
+    def call(query: str):
+        started = time.perf_counter()
+        response = client.post(endpoint, json={"query": query})
+        return response.status_code, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=burst_size) as executor:
+        for burst in range(bursts):
+            # Tagged so no burst repeats an earlier query and hits the embedding cache
+            query = f"{queries[burst % len(queries)]} ({label} {burst})"
+            for status, seconds in executor.map(call, [query] * burst_size):
+                latencies.append(seconds)
+                errors += status != 200
+
+    requests = bursts * burst_size
+    after = fake_app.state.requests
+    return {**summarize(latencies), "errors": errors,
+            "chat_calls": after["chat"] - before["chat"],
+            "embedding_calls": after["embeddings"] - before["embeddings"],
+            "chat_calls_per_request": round((after["chat"] - before["chat"]) / requests, 4)}
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Bursts of identical requests with and without coalescing.")
+    parser.add_argument("--corpus", choices=sorted(CORPUS_SIZES), default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--endpoint", default="/api/inference",
+                        choices=["/api/inference", "/api/inference/stream", "/api/direct-inference"])
+    parser.add_argument("--bursts", type=int, default=10)
+    parser.add_argument("--burst-size", type=int, default=20, help="Identical requests sent at once.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake API seconds to first byte.")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="Fake completion tokens per second.")
+    parser.add_argument("--output", help="Result file (default: benchmark/results/coalescing-<timestamp>.json).")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    workspace = tempfile.mkdtemp(prefix="rag-coalescing-")
+    fake_port, app_port = free_port(), free_port()
+
+    os.chdir(ROOT)
+    os.environ.update({
+        "OPENAI_API_KEY": "sk-benchmark",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+        "EMBEDDER": "openai",
+        "EMBEDDING_CHECK_CTX_LENGTH": "false",
+        "VECTOR_STORE_PATH": os.path.join(workspace, "vector_store"),
+        "SRC_DATA_PATH": os.path.join(workspace, "raw"),
+        "RESPONSE_CACHE_ENABLED": "false",
+    })
+
+    from benchmark.fake_openai import create_app
+    from app.be.main import app
+    from app.be.utils.coalescing import coalescer
+
+    corpus = generate_corpus(os.path.join(workspace, "corpus"), seed=args.seed, queries=args.bursts,
+                             **CORPUS_SIZES[args.corpus])
+    fake_app = create_app(latency=args.latency, token_rate=args.token_rate)
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+    }
+
+    with ServerThread(fake_app, fake_port), ServerThread(app, app_port):
+        limits = httpx.Limits(max_connections=args.burst_size, max_keepalive_connections=args.burst_size)
+        with httpx.Client(base_url=f"http://127.0.0.1:{app_port}", timeout=300, limits=limits) as client:
+            print(f"Ingesting {len(corpus['files'])} files...")
+            results["ingestion"] = benchmark_ingestion(client, corpus["files"])
+            for mode, enabled in (("off", False), ("on", True)):
+                coalescer.ENABLED = enabled
+                print(f"Sending {args.bursts} bursts of {args.burst_size} to {args.endpoint} with coalescing {mode}...")
+                results[mode] = run_bursts(client, fake_app, args.endpoint, corpus["queries"], args.bursts,
+                                           args.burst_size, label=mode)
+            results["coalescing"] = client.get("/api/cache/stats").json()["coalescing"]
+
+    output = Path(args.output) if args.output else RESULTS_PATH / f"coalescing-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    print(f"{'coalescing':10} {'requests':>9} {'chat':>6} {'embed':>6} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for mode in ("off", "on"):
+        result = results[mode]
+        print(f"{mode:10} {result['count']:>9} {result['chat_calls']:>6} {result['embedding_calls']:>6} "
+              f"{result['p50_ms']:>8} {result['p95_ms']:>8} {result['errors']:>7}")
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+from pathlib import Path
+import random
+from typing import Dict, List
+import zipfile
+from xml.sax.saxutils import escape
+
+CORPUS_SIZES = {
+    "small": {"documents": 6, "paragraphs": 20},
+    "medium": {"documents": 30, "paragraphs": 40},
+    "large": {"documents": 120, "paragraphs": 60},
+}
+
+SUBJECTS = ["The pump", "The controller", "Our warehouse", "The billing service", "The sensor array",
+            "The support team", "The quarterly report", "The compressor", "The onboarding flow", "The gateway"]
+VERBS = ["reduces", "monitors", "requires", "reports", "schedules", "replaces", "stores", "validates"]
+OBJECTS = ["coolant pressure", "invoice totals", "firmware updates", "shipping delays", "error codes",
+           "customer tickets", "revenue growth", "battery health", "access tokens", "spare parts"]
+QUALIFIERS = ["every morning", "within two hours", "after each release", "during peak load",
+              "once per quarter", "before shipment", "when the alarm triggers", "for regulated sites"]
+
+def make_sentence(rng: random.Random, document_number: int) -> str:
+    """Build a plausible sentence, sometimes mentioning a document-specific identifier."""
+    sentence = f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)} {rng.choice(QUALIFIERS)}."
+    if rng.random() < 0.2:
+        sentence += f" Part number PN-{document_number:04d}-{rng.randint(0, 99):02d} is affected."
+    return sentence
+
+def make_paragraphs(rng: random.Random, document_number: int, count: int) -> List[str]:
+    return [" ".join(make_sentence(rng, document_number) for _ in range(rng.randint(3, 7)))
+            for _ in range(count)]
+
+def write_txt(path: Path, paragraphs: List[str]):
+    path.write_text("\n\n".join(paragraphs), encoding="utf-8")
+
+def write_docx(path: Path, paragraphs: List[str]):
+    """Write a minimal DOCX package with one run per paragraph."""
+    body = "".join(f"<w:p><w:r><w:t>{escape(paragraph)}</w:t></w:r></w:p>" for paragraph in paragraphs)
+    document = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                f"<w:body>{body}</w:body></w:document>")
+    content_types = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                     '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                     '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                     '<Default Extension="xml" ContentType="application/xml"/>'
+                     '<Override PartName="/word/document.xml" '
+                     'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+                     '</Types>')
+    relationships = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                     '<Relationship Id="rId1" '
+                     'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+                     'Target="word/document.xml"/></Relationships>')
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", content_types)
+        archive.writestr("_rels/.rels", relationships)
+        archive.writestr("word/document.xml", document)
+
+def wrap(text: str, width: int = 90) -> List[str]:
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + len(word) + 1 > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+def write_pdf(path: Path, paragraphs: List[str], lines_per_page: int = 60):
+    """Write a minimal text PDF (Helvetica, one content stream per page)."""
+    lines = []
+    for paragraph in paragraphs:
+        lines.extend(wrap(paragraph))
+        lines.append("")
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    def literal(text: str) -> str:
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    # Objects 1-3 are the catalog, page tree and font; each page adds a page and a content object
+    page_numbers = [4 + 2 * i for i in range(len(pages))]
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{n} 0 R' for n in page_numbers)}] /Count {len(pages)} >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for number, page in zip(page_numbers, pages):
+        stream = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({literal(line)}) Tj T*" for line in page) + " ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {number + 1} 0 R >>")
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    output += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    path.write_bytes(bytes(output))
+
+WRITERS = {".txt": write_txt, ".docx": write_docx, ".pdf": write_pdf}
+
+def generate_corpus(directory: str,
+                    documents: int,
+                    paragraphs: int,
+                    seed: int = 0,
+                    queries: int = 50) -> Dict:
+    """
+    Generate a synthetic corpus of TXT, DOCX and PDF files.
+
+    File types are rotated so every loader is exercised. Queries are drawn
+    from sentences that appear in the corpus, so every query has an answer.
+
+    Args:
+        directory (str): Where the files are written.
+        documents (int): The number of files.
+        paragraphs (int): Paragraphs per file.
+        seed (int): Seed of the random generator, for reproducible corpora.
+        queries (int): The number of benchmark queries to draw.
+
+    Returns:
+        dict: The file paths, the queries and the total size in bytes.
+    """
+    rng = random.Random(seed)
+    root = Path(directory)
+    root.mkdir(parents=True, exist_ok=True)
+
+    files, sentences = [], []
+    extensions = list(WRITERS)
+    for number in range(documents):
+        extension = extensions[number % len(extensions)]
+        document_paragraphs = make_paragraphs(rng, number, paragraphs)
+        path = root / f"document_{number:04d}{extension}"
+        WRITERS[extension](path, document_paragraphs)
+        files.append(str(path))
+        sentences.extend(rng.sample(document_paragraphs, min(2, len(document_paragraphs))))
+
+    picked = [rng.choice(sentences).split(".")[0] for _ in range(queries)]
+    return {
+        "files": files,
+        "queries": [f"What do we know about this: {sentence}?" for sentence in picked],
+        "bytes": sum(Path(path).stat().st_size for path in files)
+    }
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import time
+import uuid
+from typing import List
+
+# Third-party libraries
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+# Custom libraries
+from app.be.utils.embedding import HashingEmbeddings
+
+def create_app(latency: float = 0.05,
+               token_rate: float = 100.0,
+               completion_tokens: int = 60,
+               dimensions: int = 256) -> FastAPI:
+    """
+    Build a local stand-in for the OpenAI embeddings and chat completions APIs.
+
+    Embeddings are deterministic (feature hashing), so retrieval behaves the
+    same on every run. Every request waits ``latency`` seconds before the
+    first byte; chat completions then produce ``completion_tokens`` tokens at
+    ``token_rate`` tokens per second, streamed or all at once.
+
+    Args:
+        latency (float): Seconds before the first byte of every response.
+        token_rate (float): Completion tokens generated per second.
+        completion_tokens (int): Length of every chat completion.
+        dimensions (int): Size of the embedding vectors.
+
+    Returns:
+        FastAPI: The fake server application.
+    """
+    app = FastAPI(title="Fake OpenAI API")
+    embeddings = HashingEmbeddings(dimensions=dimensions)
+    app.state.requests = {"embeddings": 0, "embedded_inputs": 0, "chat": 0}
+
+    def completion_words() -> List[str]:
+        return [f"word{i % 50}" for i in range(completion_tokens)]
+
+    @app.post("/v1/embeddings")
+    async def create_embeddings(request: Request):
+        body = await request.json()
+        inputs = body["input"]
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        texts = [text if isinstance(text, str) else " ".join(map(str, text)) for text in inputs]
+        app.state.requests["embeddings"] += 1
+        app.state.requests["embedded_inputs"] += len(texts)
+
+        await asyncio.sleep(latency)
+        vectors = embeddings.embed_documents(texts)
+        tokens = sum(len(text.split()) for text in texts)
+        return {
+            "object": "list",
+            "model": body["model"],
+            "data": [{"object": "embedding", "index": i, "embedding": vector} for i, vector in enumerate(vectors)],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+        }
+
+    @app.post("/v1/chat/completions")
+    async def create_chat_completion(request: Request):
+        body = await request.json()
+        app.state.requests["chat"] += 1
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        prompt_tokens = sum(len(str(message.get("content", "")).split()) for message in body["messages"])
+        words = completion_words()
+
+        # The query router expects a single classification label
+        if "Classify" in str(body["messages"][-1].get("content", "")):
+            words = ["document"]
+
+        await asyncio.sleep(latency)
+
+        if body.get("stream"):
+            async def stream():
+                for word in words:
+                    await asyncio.sleep(1 / token_rate)
+                    chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                             "model": body["model"],
+                             "choices": [{"index": 0, "delta": {"content": f"{word} "}, "finish_reason": None}]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                         "model": body["model"],
+                         "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(stream(), media_type="text/event-stream")
+
+        await asyncio.sleep(len(words) / token_rate)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": body["model"],
+            "choices": [{"index": 0,
+                         "message": {"role": "assistant", "content": " ".join(words)},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens,
+                      "completion_tokens": len(words),
+                      "total_tokens": prompt_tokens + len(words)}
+        }
+
+    @app.get("/stats")
+    def stats():
+        return app.state.requests
+
+    return app
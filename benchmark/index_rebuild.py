@@ -0,0 +1,135 @@
+"""Query latency and availability while the index is rebuilt.
+
+Ingests a synthetic corpus with the local embedder, then keeps searching
+(one ModelInference per query, as a request would) while the index is
+rebuilt in three ways:
+
+- in-place: every document is deleted and re-ingested into the live
+  collection, the way a reindex worked before index versions;
+- compact / rebuild: a maintenance job builds a new version next to the
+  live one, validates it and switches readers to it.
+
+For each it reports search latency, the share of searches that came back
+empty (the index was missing documents) and how long the rebuild took,
+against an idle baseline. Nothing calls OpenAI.
+
+Usage (from the repository root):
+    python -m benchmark.index_rebuild --corpus medium
+"""
+import argparse
+import json
+import os
+from pathlib import Path
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+# Custom libraries
+from benchmark.corpus import CORPUS_SIZES, generate_corpus
+from benchmark.run import RESULTS_PATH, git_commit, summarize
+
+def search_while(queries: List[str], k: int, busy: Callable[[], bool], minimum: int = 0) -> Dict:
+    """Search round-robin until busy() turns False (and at least `minimum` times)."""
+    from app.be.utils.inference import ModelInference
+
+    latencies, empty, count = [], 0, 0
+    while busy() or count < minimum:
+        query = queries[count % len(queries)]
+        started = time.perf_counter()
+        documents = ModelInference().perform_similarity_search(query, k=k)
+        latencies.append(time.perf_counter() - started)
+        empty += not documents
+        count += 1
+    return {**summarize(latencies), "empty_ratio": round(empty / max(count, 1), 4)}
+
+def run_in_place() -> threading.Thread:
+    """Delete and re-ingest every document of the live collection in a background thread."""
+    from app.be.utils.ingestion import FileIngestor
+    from app.be.utils.resources import resources
+
+    def reindex():
+        with resources.writing():
+            ingestor = FileIngestor()
+            for entry in resources.get_manifest().list_documents():
+                ingestor.delete_document(entry["document"])
+            resources.reload_vector_store()
+            FileIngestor().start_ingestion_session()
+
+    thread = threading.Thread(target=reindex, name="in-place-reindex")
+    thread.start()
+    return thread
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Query latency while the index is rebuilt.")
+    parser.add_argument("--corpus", choices=sorted(CORPUS_SIZES), default="medium")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--idle-searches", type=int, default=200)
+    parser.add_argument("--output", help="Result file (default: benchmark/results/index-rebuild-<timestamp>.json).")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    workspace = tempfile.mkdtemp(prefix="rag-index-rebuild-")
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    os.environ.update({"EMBEDDER": "local",
+                       "VECTOR_STORE_PATH": os.path.join(workspace, "vector_store"),
+                       "SRC_DATA_PATH": os.path.join(workspace, "raw")})
+
+    from app.be.core.config import settings
+    from app.be.schemas.maintenance_models import MaintenanceRequest
+    from app.be.utils.ingestion import FileIngestor
+    from app.be.utils.maintenance import maintenance
+    from app.be.utils.resources import resources
+
+    corpus = generate_corpus(settings.src_data_path, seed=args.seed, queries=args.queries,
+                             **CORPUS_SIZES[args.corpus])
+    print(f"Ingesting {len(corpus['files'])} files...")
+    with resources.writing():
+        FileIngestor().start_ingestion_session()
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "chunks": resources.get_collection().count(),
+        "idle": search_while(corpus["queries"], args.k, lambda: False, minimum=args.idle_searches),
+    }
+
+    print("Reindexing in place...")
+    started = time.perf_counter()
+    thread = run_in_place()
+    results["in-place"] = search_while(corpus["queries"], args.k, thread.is_alive)
+    results["in-place"]["rebuild_seconds"] = round(time.perf_counter() - started, 3)
+
+    for kind in ("compact", "rebuild"):
+        print(f"Running a {kind} job...")
+        job = maintenance.submit(MaintenanceRequest(kind=kind))
+        results[kind] = search_while(
+            corpus["queries"], args.k,
+            lambda: maintenance.get(job.job_id).status not in ("completed", "failed")
+        )
+        job = maintenance.get(job.job_id)
+        results[kind].update({"status": job.status, "error": job.error,
+                              "rebuild_seconds": round(job.finished_at - job.started_at, 3)})
+
+    maintenance.shutdown()
+    output = Path(args.output) if args.output else RESULTS_PATH / f"index-rebuild-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    print(f"{'phase':10} {'searches':>9} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'empty':>7} {'rebuild s':>10}")
+    for phase in ("idle", "in-place", "compact", "rebuild"):
+        result = results[phase]
+        print(f"{phase:10} {result['count']:>9} {result['p50_ms']:>8} {result['p95_ms']:>8} {result['max_ms']:>8} "
+              f"{result['empty_ratio']:>7.1%} {result.get('rebuild_seconds', ''):>10}")
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
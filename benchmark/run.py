@@ -0,0 +1,248 @@
+"""Offline end-to-end benchmark of ingestion, retrieval and inference.
+
+Starts a fake OpenAI-compatible server and the FastAPI app on local ports,
+ingests a synthetic corpus through ``/api/ingestion``, times retrieval
+in-process and drives ``/api/inference`` with concurrent clients. Results
+are written as JSON and can be compared against a previous run.
+
+Usage (from the repository root):
+    python -m benchmark.run --corpus small --concurrency 8 --requests 200
+    python -m benchmark.run --baseline benchmark/results/previous.json
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+from pathlib import Path
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+# Third-party libraries
+import httpx
+import numpy as np
+import uvicorn
+
+# Custom libraries
+from benchmark.corpus import CORPUS_SIZES, generate_corpus
+
+ROOT = Path(__file__).resolve().parents[1]
+RESULTS_PATH = ROOT / "benchmark" / "results"
+
+# Metrics compared against a baseline: (section, key, True when higher is better)
+COMPARED_METRICS = [
+    ("ingestion", "chunks_per_second", True),
+    ("ingestion", "seconds", False),
+    ("retrieval", "p50_ms", False),
+    ("retrieval", "p95_ms", False),
+    ("inference", "p50_ms", False),
+    ("inference", "p95_ms", False),
+    ("inference", "p99_ms", False),
+    ("inference", "requests_per_second", True),
+]
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def summarize(latencies: List[float]) -> Dict:
+    """Return count, mean and p50/p95/p99 of latencies given in seconds, in milliseconds."""
+    if not latencies:
+        return {"count": 0}
+    values = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"count": len(values), "mean_ms": round(float(values.mean()), 2),
+            "p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2), "max_ms": round(float(values.max()), 2)}
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+class ServerThread:
+    """Run a uvicorn server in a daemon thread for the duration of a with block."""
+
+    def __init__(self, app, port: int):
+        self.SERVER = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self.THREAD = threading.Thread(target=self.SERVER.run, daemon=True)
+
+    def __enter__(self):
+        self.THREAD.start()
+        while not self.SERVER.started:
+            if not self.THREAD.is_alive():
+                raise RuntimeError("Server failed to start.")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.SERVER.should_exit = True
+        self.THREAD.join(timeout=30)
+
+def benchmark_ingestion(client: httpx.Client, files: List[str]) -> Dict:
+    """Upload the corpus and wait for the ingestion job to finish."""
+    handles = [open(path, "rb") for path in files]
+    try:
+        started = time.perf_counter()
+        response = client.post("/api/ingestion",
+                               files=[("files", (Path(path).name, handle)) for path, handle in zip(files, handles)])
+        response.raise_for_status()
+    finally:
+        for handle in handles:
+            handle.close()
+
+    job_id = response.json()["job_id"]
+    while True:
+        job = client.get(f"/api/ingestion/jobs/{job_id}").json()
+        if job["status"] in ("completed", "failed"):
+            break
+        time.sleep(0.1)
+    seconds = time.perf_counter() - started
+
+    return {"status": job["status"], "seconds": round(seconds, 3), "documents": job["documents"],
+            "chunks": job["chunks"], "chunks_per_second": round(job["chunks"] / seconds, 2) if seconds else None,
+            "stages": job["stages"], "errors": [f["error"] for f in job["files"] if f["error"]]}
+
+def benchmark_retrieval(queries: List[str], k: int) -> Dict:
+    """Time query embedding and vector search separately, in-process."""
+    from app.be.utils.inference import ModelInference
+
+    inference = ModelInference()
+    embedding_latencies, search_latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        embedding = inference.embed_query(query)
+        embedded = time.perf_counter()
+        inference.perform_similarity_search(query, k=k, query_embedding=embedding)
+        search_latencies.append(time.perf_counter() - embedded)
+        embedding_latencies.append(embedded - started)
+    return {**summarize(search_latencies), "query_embedding": summarize(embedding_latencies)}
+
+def benchmark_inference(client: httpx.Client, queries: List[str], requests: int, concurrency: int) -> Dict:
+    """Drive /api/inference with concurrent clients and report latency percentiles."""
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def call(number: int):
+        nonlocal errors
+        payload = {"query": queries[number % len(queries)]}
+        started = time.perf_counter()
+        try:
+            client.post("/api/inference", json=payload).raise_for_status()
+            with lock:
+                latencies.append(time.perf_counter() - started)
+        except httpx.HTTPError:
+            with lock:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(call, range(requests)))
+    seconds = time.perf_counter() - started
+
+    return {**summarize(latencies), "errors": errors, "concurrency": concurrency,
+            "seconds": round(seconds, 3), "requests_per_second": round(len(latencies) / seconds, 2)}
+
+def compare(results: Dict, baseline: Dict) -> List[Dict]:
+    """List the relative change of each key metric against a baseline run."""
+    changes = []
+    for section, key, higher_is_better in COMPARED_METRICS:
+        current, previous = results.get(section, {}).get(key), baseline.get(section, {}).get(key)
+        if not current or not previous:
+            continue
+        change = (current - previous) / previous
+        changes.append({"metric": f"{section}.{key}", "baseline": previous, "current": current,
+                        "change": round(change, 4), "improved": change > 0 if higher_is_better else change < 0})
+    return changes
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline benchmark of the RAG assistant.")
+    parser.add_argument("--corpus", choices=["small", "medium", "large"], default="small")
+    parser.add_argument("--documents", type=int, help="Override the number of documents of the corpus size.")
+    parser.add_argument("--paragraphs", type=int, help="Override the paragraphs per document.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=5, help="Chunks retrieved per query.")
+    parser.add_argument("--requests", type=int, default=100, help="Total /api/inference requests.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake API seconds to first byte.")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="Fake completion tokens per second.")
+    parser.add_argument("--completion-tokens", type=int, default=60)
+    parser.add_argument("--dimensions", type=int, default=256, help="Fake embedding size.")
+    parser.add_argument("--response-cache", action="store_true", help="Keep the LLM response cache on.")
+    parser.add_argument("--output", help="Result file (default: benchmark/results/<timestamp>.json).")
+    parser.add_argument("--baseline", help="Previous result file to compare against.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    size = dict(CORPUS_SIZES[args.corpus])
+    size["documents"] = args.documents or size["documents"]
+    size["paragraphs"] = args.paragraphs or size["paragraphs"]
+
+    workspace = tempfile.mkdtemp(prefix="rag-benchmark-")
+    fake_port, app_port = free_port(), free_port()
+
+    # Settings are read at import time, so the environment is prepared first
+    os.chdir(ROOT)
+    os.environ.update({
+        "OPENAI_API_KEY": "sk-benchmark",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+        "EMBEDDER": "openai",
+        "EMBEDDING_CHECK_CTX_LENGTH": "false",
+        "VECTOR_STORE_PATH": os.path.join(workspace, "vector_store"),
+        "SRC_DATA_PATH": os.path.join(workspace, "raw"),
+        "RESPONSE_CACHE_ENABLED": str(args.response_cache).lower(),
+    })
+
+    from benchmark.fake_openai import create_app
+    from app.be.main import app
+
+    corpus = generate_corpus(os.path.join(workspace, "corpus"), seed=args.seed, queries=args.queries, **size)
+    fake_app = create_app(latency=args.latency, token_rate=args.token_rate,
+                          completion_tokens=args.completion_tokens, dimensions=args.dimensions)
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "corpus": {**size, "files": len(corpus["files"]), "bytes": corpus["bytes"]},
+    }
+
+    with ServerThread(fake_app, fake_port), ServerThread(app, app_port):
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        with httpx.Client(base_url=f"http://127.0.0.1:{app_port}", timeout=300, limits=limits) as client:
+            print(f"Ingesting {len(corpus['files'])} files ({corpus['bytes']} bytes)...")
+            results["ingestion"] = benchmark_ingestion(client, corpus["files"])
+            print(f"Timing retrieval over {len(corpus['queries'])} queries...")
+            results["retrieval"] = benchmark_retrieval(corpus["queries"], k=args.k)
+            print(f"Sending {args.requests} inference requests with concurrency {args.concurrency}...")
+            results["inference"] = benchmark_inference(client, corpus["queries"], args.requests, args.concurrency)
+            results["cache"] = client.get("/api/cache/stats").json()
+        results["fake_api"] = dict(fake_app.state.requests)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            results["comparison"] = compare(results, json.load(f))
+
+    output = Path(args.output) if args.output else RESULTS_PATH / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    print(json.dumps({key: results[key] for key in ("ingestion", "retrieval", "inference")}, indent=2))
+    for change in results.get("comparison", []):
+        print(f"{change['metric']:32} {change['baseline']:>10} -> {change['current']:>10} "
+              f"({change['change']:+.1%}, {'better' if change['improved'] else 'worse'})")
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
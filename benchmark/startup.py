@@ -0,0 +1,121 @@
+"""Cold-start benchmark of the backend.
+
+Measures, in fresh interpreter processes started outside the repository
+(so nothing depends on the working directory):
+
+- import: time to import ``app.be.main``;
+- live / ready: time from spawning ``uvicorn app.be.main:app`` until
+  ``/health/live`` and ``/health/ready`` answer 200, i.e. until a new worker
+  accepts connections and until it is warm enough to take traffic.
+
+No OpenAI calls are made; the warm-up only opens the vector store and
+creates the clients.
+
+Usage (from the repository root):
+    python -m benchmark.startup --runs 5
+"""
+import argparse
+import json
+import os
+from pathlib import Path
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Optional
+
+# Third-party libraries
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+# Custom libraries
+from benchmark.run import RESULTS_PATH, free_port, git_commit, summarize
+
+IMPORT_SCRIPT = "import time; started = time.perf_counter(); import app.be.main; print(time.perf_counter() - started)"
+
+def backend_env(workspace: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")])),
+        "OPENAI_API_KEY": env.get("OPENAI_API_KEY", "sk-benchmark"),
+        "VECTOR_STORE_PATH": os.path.join(workspace, "vector_store"),
+        "SRC_DATA_PATH": os.path.join(workspace, "raw"),
+    })
+    return env
+
+def time_import(workspace: str) -> float:
+    result = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], cwd=workspace, env=backend_env(workspace),
+                            capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+def wait_for(client: httpx.Client, path: str, process: subprocess.Popen, timeout: float) -> Optional[float]:
+    """Poll an endpoint until it answers 200; returns the time it did, or None."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Backend exited with code {process.returncode}.")
+        try:
+            if client.get(path).status_code == 200:
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    return None
+
+def time_server(workspace: str, timeout: float) -> Dict:
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.be.main:app", "--host", "127.0.0.1",
+                                "--port", str(port), "--log-level", "warning"],
+                               cwd=workspace, env=backend_env(workspace),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1.0) as client:
+            live = wait_for(client, "/health/live", process, timeout)
+            ready = wait_for(client, "/health/ready", process, timeout)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return {"live": live - started if live else None, "ready": ready - started if ready else None}
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Cold-start benchmark of the backend.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds to wait for each probe.")
+    parser.add_argument("--output", help="Result file (default: benchmark/results/startup-<timestamp>.json).")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    workspace = tempfile.mkdtemp(prefix="rag-startup-")
+
+    imports, live, ready = [], [], []
+    for run in range(args.runs):
+        print(f"Run {run + 1}/{args.runs}...")
+        imports.append(time_import(workspace))
+        timings = time_server(workspace, args.timeout)
+        if timings["live"] is not None:
+            live.append(timings["live"])
+        if timings["ready"] is not None:
+            ready.append(timings["ready"])
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "import": summarize(imports),
+        "live": summarize(live),
+        "ready": summarize(ready),
+    }
+
+    output = Path(args.output) if args.output else RESULTS_PATH / f"startup-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    print(json.dumps({key: results[key] for key in ("import", "live", "ready")}, indent=2))
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Recall-vs-latency report of the vector store backends.
+
+Indexes the same synthetic embeddings into Chroma and into MatrixIndex with
+several precision and truncation settings, then measures recall@k against
+exact float32 search, query latency, time to open the index (first query
+included) and the size of the vectors on disk.
+
+The embeddings are clustered and their variance decays along the
+dimensions, so leading components carry most of the signal, like the
+Matryoshka-trained text-embedding-3 models. Results are indicative only;
+re-run on real embeddings before choosing a truncation.
+
+Usage (from the repository root):
+    python -m benchmark.vector_backends --vectors 20000 --dimensions 3072
+"""
+import argparse
+import json
+import os
+from pathlib import Path
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+# Third-party libraries
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+# Custom libraries
+from benchmark.run import RESULTS_PATH, git_commit, summarize
+
+# (name, dtype, stored dimensions or None, coarse dimensions, rescore factor)
+MATRIX_CONFIGS = [
+    ("matrix-float32", "float32", None, 0, 1),
+    ("matrix-float16", "float16", None, 0, 1),
+    ("matrix-float16-coarse256", "float16", None, 256, 4),
+    ("matrix-int8", "int8", None, 0, 1),
+    ("matrix-int8-coarse256", "int8", None, 256, 4),
+    ("matrix-float16-d1024", "float16", 1024, 256, 4),
+    ("matrix-int8-d512", "int8", 512, 128, 4),
+]
+
+def synthetic_embeddings(count: int, queries: int, dimensions: int, clusters: int, seed: int) -> tuple:
+    """Return unit-normalized corpus and query embeddings with a decaying spectrum."""
+    rng = np.random.default_rng(seed)
+    spectrum = (1.0 / np.sqrt(1.0 + np.arange(dimensions) / 64.0)).astype(np.float32)
+    centers = rng.normal(size=(clusters, dimensions)).astype(np.float32) * spectrum
+    corpus = centers[rng.integers(0, clusters, size=count)]
+    corpus += 0.6 * rng.normal(size=(count, dimensions)).astype(np.float32) * spectrum
+    corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+
+    picks = rng.integers(0, count, size=queries)
+    query_vectors = corpus[picks] + 0.05 * rng.normal(size=(queries, dimensions)).astype(np.float32)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    return corpus, query_vectors
+
+def directory_bytes(path: Path, pattern: str = "*") -> int:
+    return sum(file.stat().st_size for file in path.rglob(pattern) if file.is_file())
+
+def recall(found: List[List[str]], truth: np.ndarray) -> float:
+    hits = sum(len(set(ids) & {f"c{i}" for i in row}) for ids, row in zip(found, truth))
+    return hits / truth.size
+
+def measure(open_index, queries: np.ndarray, k: int, truth: np.ndarray) -> Dict:
+    """Open an index, query it one query at a time and score the results."""
+    started = time.perf_counter()
+    collection = open_index()
+    found = [collection.query(query_embeddings=[queries[0].tolist()], n_results=k, include=["distances"])["ids"][0]]
+    open_seconds = time.perf_counter() - started
+
+    latencies = []
+    for query in queries[1:]:
+        started = time.perf_counter()
+        found.append(collection.query(query_embeddings=[query.tolist()], n_results=k, include=["distances"])["ids"][0])
+        latencies.append(time.perf_counter() - started)
+    return {"recall": round(recall(found, truth), 4),
+            "open_and_first_query_ms": round(open_seconds * 1000, 2),
+            "latency": summarize(latencies)}
+
+def benchmark_chroma(workspace: Path, corpus: np.ndarray, queries: np.ndarray, k: int, truth: np.ndarray) -> Dict:
+    import chromadb
+
+    path = workspace / "chroma"
+    client = chromadb.PersistentClient(path=str(path))
+    collection = client.create_collection("benchmark", metadata={"hnsw:space": "cosine"})
+    started = time.perf_counter()
+    for start in range(0, len(corpus), 1000):
+        end = min(start + 1000, len(corpus))
+        collection.add(ids=[f"c{i}" for i in range(start, end)], embeddings=corpus[start:end],
+                       documents=[""] * (end - start))
+    index_seconds = time.perf_counter() - started
+    del collection, client
+    chromadb.api.client.SharedSystemClient.clear_system_cache()
+
+    def open_index():
+        return chromadb.PersistentClient(path=str(path)).get_collection("benchmark")
+
+    return {"index_seconds": round(index_seconds, 2), "disk_bytes": directory_bytes(path),
+            **measure(open_index, queries, k, truth)}
+
+def benchmark_matrix(workspace: Path, name: str, dtype: str, dimensions, coarse: int, rescore: int,
+                     corpus: np.ndarray, queries: np.ndarray, k: int, truth: np.ndarray) -> Dict:
+    from app.be.utils.matrix_store import MatrixIndex
+
+    path = workspace / name
+    options = dict(dimensions=dimensions, dtype=dtype, coarse_dimensions=coarse, rescore_factor=rescore)
+    index = MatrixIndex(str(path), **options)
+    started = time.perf_counter()
+    for start in range(0, len(corpus), 1000):
+        end = min(start + 1000, len(corpus))
+        index.upsert([f"c{i}" for i in range(start, end)], corpus[start:end], [""] * (end - start), [{}] * (end - start))
+    index_seconds = time.perf_counter() - started
+    index.close()
+
+    return {"index_seconds": round(index_seconds, 2), "disk_bytes": directory_bytes(path, "*.npy"),
+            **measure(lambda: MatrixIndex(str(path), **options), queries, k, truth)}
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Recall-vs-latency report of the vector store backends.")
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dimensions", type=int, default=3072)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20, help="Results per query (the retrieval fetch_k).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-chroma", action="store_true")
+    parser.add_argument("--output", help="Result file (default: benchmark/results/vector-backends-<timestamp>.json).")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    os.chdir(ROOT)
+
+    corpus, queries = synthetic_embeddings(args.vectors, args.queries, args.dimensions, args.clusters, args.seed)
+    truth = np.argsort(-(queries @ corpus.T), axis=1)[:, :args.k]
+    workspace = Path(tempfile.mkdtemp(prefix="rag-vector-backends-"))
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "backends": {},
+    }
+    try:
+        if not args.skip_chroma:
+            print("Benchmarking chroma...")
+            results["backends"]["chroma-hnsw"] = benchmark_chroma(workspace, corpus, queries, args.k, truth)
+        for name, dtype, dimensions, coarse, rescore in MATRIX_CONFIGS:
+            if dimensions and dimensions >= args.dimensions:
+                continue
+            print(f"Benchmarking {name}...")
+            results["backends"][name] = benchmark_matrix(workspace, name, dtype, dimensions, coarse, rescore,
+                                                         corpus, queries, args.k, truth)
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    output = Path(args.output) if args.output else RESULTS_PATH / f"vector-backends-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    print(f"{'backend':28} {'recall@' + str(args.k):>10} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'open ms':>9} {'bytes/vector':>13}")
+    for name, result in results["backends"].items():
+        print(f"{name:28} {result['recall']:>10.4f} {result['latency']['p50_ms']:>8.2f} "
+              f"{result['latency']['p95_ms']:>8.2f} {result['open_and_first_query_ms']:>9.2f} "
+              f"{result['disk_bytes'] / args.vectors:>13.0f}")
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
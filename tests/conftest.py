@@ -0,0 +1,72 @@
+"""Shared fixtures of the backend tests.
+
+Settings are read when app.be.core.config is first imported, so the
+environment is pointed at a scratch directory, the offline HashingEmbeddings
+embedder and the in-process matrix backend before any app module loads.
+Tests that need the chat API get the fake server of the benchmark suite.
+"""
+import os
+from pathlib import Path
+import sys
+import tempfile
+
+SCRATCH_PATH = Path(tempfile.mkdtemp(prefix="rag-tests-"))
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+os.environ.update({
+    "OPENAI_API_KEY": "sk-test",
+    "VECTOR_STORE_PATH": str(SCRATCH_PATH / "vector_store"),
+    "SRC_DATA_PATH": str(SCRATCH_PATH / "raw"),
+    "EMBEDDER": "local",
+    "LOCAL_EMBEDDING_DIMENSIONS": "64",
+    "VECTOR_BACKEND": "matrix",
+    "MATRIX_DTYPE": "float32",
+    "INGESTION_PARSE_WORKERS": "0",
+    "WARM_UP_ON_STARTUP": "false",
+})
+
+# Third-party libraries
+import pytest
+
+# Custom libraries
+from app.be.core.config import settings
+from app.be.utils.embedding import HashingEmbeddings
+from app.be.utils.resources import ResourceManager, resources
+from benchmark.run import ServerThread, free_port
+
+@pytest.fixture
+def embeddings() -> HashingEmbeddings:
+    """The deterministic offline embedder, at the dimensions the tests store."""
+    return HashingEmbeddings(dimensions=settings.local_embedding_dimensions)
+
+@pytest.fixture
+def resource_manager(tmp_path):
+    """A resource manager over an empty vector store of its own."""
+    manager = ResourceManager(vector_store_path=str(tmp_path / "store"), embedder="local")
+    yield manager
+    manager.close()
+
+@pytest.fixture
+def write_file(tmp_path):
+    """Write a text file under the test's directory and return its path."""
+    def write(name: str, text: str) -> Path:
+        path = tmp_path / "files" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+        return path
+    return write
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    """Serve the benchmark's fake OpenAI API locally and point the chat clients at it."""
+    from benchmark.fake_openai import create_app
+
+    app = create_app(latency=0.0, token_rate=10000.0, completion_tokens=12)
+    port = free_port()
+    with ServerThread(app, port):
+        monkeypatch.setattr(settings, "openai_base_url", f"http://127.0.0.1:{port}/v1")
+        # Chat clients are cached with the base URL they were created with
+        resources.CHAT_MODELS.clear()
+        yield app
+        resources.CHAT_MODELS.clear()
@@ -0,0 +1,28 @@
+import asyncio
+import threading
+
+# Custom libraries
+from app.be.utils.cache import CachedEmbeddings, EmbeddingCache
+
+def test_persistent_embedding_cache_is_read_off_the_event_loop(embeddings, tmp_path):
+    cache = EmbeddingCache(persist_path=str(tmp_path / "embeddings.sqlite3"))
+    cached = CachedEmbeddings(embeddings, cache=cache, model="local")
+    threads = []
+    get = cache.get
+
+    def record_get(text, model):
+        threads.append(threading.get_ident())
+        return get(text, model)
+
+    cache.get = record_get
+
+    async def embed_twice():
+        first = await cached.aembed_query("What does E42 mean?")
+        second = await cached.aembed_query("what does  E42 mean?")
+        return threading.get_ident(), first, second
+
+    loop_thread, first, second = asyncio.run(embed_twice())
+
+    assert first == second
+    assert len(threads) == 2 and loop_thread not in threads
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,72 @@
+"""StructuredChunker: token-sized chunks cut along page, heading and paragraph boundaries."""
+from langchain_core.documents import Document
+import pytest
+
+# Custom libraries
+from app.be.utils.chunking import StructuredChunker, is_heading
+
+def paragraph(topic: str, sentences: int = 4) -> str:
+    return " ".join(f"The {topic} sentence number {i} explains one more detail." for i in range(sentences))
+
+@pytest.mark.parametrize("line, heading", [("1.2 Scope of work", True), ("## Installation", True),
+                                           ("SAFETY NOTES", True), ("Appendix B: Wiring", True),
+                                           ("The pump is running.", False), ("", False)])
+def test_is_heading(line, heading):
+    assert is_heading(line) is heading
+
+def test_chunks_keep_their_offsets_and_stay_within_the_limit():
+    chunker = StructuredChunker(chunk_tokens=60, overlap_tokens=10, min_tokens=0)
+    text = "\n\n".join(paragraph(topic) for topic in ("pump", "valve", "gear", "belt", "fan"))
+
+    chunks = chunker.split_text(text)
+
+    assert len(chunks) > 1
+    for start, chunk in chunks:
+        assert text[start:start + len(chunk)] == chunk
+        assert chunker.count(chunk) <= chunker.MAX_TOKENS
+
+def test_paragraphs_that_fit_are_kept_whole():
+    chunker = StructuredChunker(chunk_tokens=60, min_tokens=0)
+    paragraphs = [paragraph(topic, sentences=2) for topic in ("pump", "valve", "gear", "belt")]
+
+    chunks = [chunk for _, chunk in chunker.split_text("\n\n".join(paragraphs))]
+
+    for text in paragraphs:
+        assert any(text in chunk for chunk in chunks)
+
+def test_a_heading_opens_a_chunk():
+    chunker = StructuredChunker(chunk_tokens=80, min_tokens=0)
+    text = f"{paragraph('pump', 2)}\n\n2. Valve maintenance\n\n{paragraph('valve', 2)}"
+
+    chunks = [chunk for _, chunk in chunker.split_text(text)]
+
+    assert [chunk.startswith("2. Valve maintenance") for chunk in chunks] == [False, True]
+
+def test_a_long_paragraph_is_cut_by_sentence_with_overlap():
+    chunker = StructuredChunker(chunk_tokens=40, overlap_tokens=15, min_tokens=0)
+    text = paragraph("pump", sentences=12)
+
+    chunks = chunker.split_text(text)
+
+    assert len(chunks) > 2
+    for (start, chunk), (next_start, next_chunk) in zip(chunks, chunks[1:]):
+        assert start < next_start < start + len(chunk)
+        assert next_chunk.startswith("The pump sentence")
+
+def test_a_short_tail_is_folded_into_the_chunk_before():
+    chunker = StructuredChunker(chunk_tokens=60, min_tokens=20)
+    text = f"{paragraph('pump', 4)}\n\nThe end."
+
+    chunks = [chunk for _, chunk in chunker.split_text(text)]
+
+    assert chunks[-1].endswith("The end.") and chunks[-1] != "The end."
+
+def test_documents_are_chunked_per_page():
+    chunker = StructuredChunker(chunk_tokens=60, min_tokens=0)
+    pages = [Document(page_content=paragraph(topic, 2), metadata={"source": "manual.pdf", "page": page})
+             for page, topic in enumerate(("pump", "valve"))]
+
+    chunks = chunker.split_documents(pages)
+
+    assert [(chunk.metadata["page"], chunk.metadata["start_index"]) for chunk in chunks] == [(0, 0), (1, 0)]
+    assert all(chunk.metadata["source"] == "manual.pdf" for chunk in chunks)
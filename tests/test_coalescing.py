@@ -0,0 +1,108 @@
+"""Single-flight coalescing of identical in-flight requests."""
+import asyncio
+
+import pytest
+
+# Custom libraries
+from app.be.utils.coalescing import RequestCoalescer, normalize_query
+
+@pytest.mark.parametrize("normalization, expected", [("exact", "What  is E42?"), ("whitespace", "What is E42?"),
+                                                     ("casefold", "what is e42?"), ("punctuation", "what is e42")])
+def test_normalize_query(normalization, expected):
+    assert normalize_query("What  is E42?", normalization) == expected
+
+def test_keys_follow_the_normalization_and_the_scope():
+    coalescer = RequestCoalescer(enabled=True, normalization="casefold")
+
+    assert coalescer.make_key("chat", "What is E42?", k=5) == coalescer.make_key("chat", "what is  e42?", k=5)
+    assert coalescer.make_key("chat", "What is E42?", k=5) != coalescer.make_key("chat", "What is E42?", k=6)
+    assert coalescer.make_key("chat", "What is E42?") != coalescer.make_key("inference", "What is E42?")
+
+def test_identical_requests_share_one_result():
+    coalescer = RequestCoalescer(enabled=True)
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"answer": 42}
+
+    async def main():
+        return await asyncio.gather(*(coalescer.run("inference", "key", work) for _ in range(3)))
+
+    assert asyncio.run(main()) == [{"answer": 42}] * 3
+    assert calls == [1]
+    assert coalescer.stats()["followers"] == 2 and coalescer.stats()["in_flight"] == 0
+
+def events_until(release: asyncio.Event, opened: list):
+    async def events():
+        opened.append(1)
+        for number in range(4):
+            if number == 2:
+                await release.wait()
+            yield {"event": number}
+    return events
+
+def test_a_late_follower_gets_the_stream_replayed_from_the_start():
+    coalescer = RequestCoalescer(enabled=True)
+    opened = []
+
+    async def main():
+        release = asyncio.Event()
+        leader = coalescer.stream("chat", "key", events_until(release, opened))
+        first = [await leader.__anext__(), await leader.__anext__()]
+        follower = asyncio.ensure_future(collect(coalescer.stream("chat", "key", events_until(release, opened))))
+        await asyncio.sleep(0)
+        release.set()
+        return first + [event async for event in leader], await follower
+
+    async def collect(stream) -> list:
+        return [event async for event in stream]
+
+    leader_events, follower_events = asyncio.run(main())
+    assert leader_events == follower_events == [{"event": number} for number in range(4)]
+    assert opened == [1]
+
+def test_the_shared_stream_is_cancelled_only_when_every_waiter_left():
+    coalescer = RequestCoalescer(enabled=True)
+    closed = []
+
+    async def events():
+        try:
+            yield {"event": 0}
+            await asyncio.sleep(10)
+            yield {"event": 1}
+        finally:
+            closed.append(1)
+
+    async def main():
+        first, second = coalescer.stream("chat", "key", events), coalescer.stream("chat", "key", events)
+        await first.__anext__()
+        await second.__anext__()
+        await first.aclose()
+        await asyncio.sleep(0)
+        still_running = not closed
+        await second.aclose()
+        await asyncio.sleep(0.01)
+        return still_running
+
+    assert asyncio.run(main())
+    assert closed == [1]
+    assert coalescer.FLIGHTS == {}
+
+def test_an_error_reaches_every_follower():
+    coalescer = RequestCoalescer(enabled=True)
+
+    async def events():
+        yield {"event": 0}
+        await asyncio.sleep(0.01)
+        raise RuntimeError("model failed")
+
+    async def collect() -> list:
+        return [event async for event in coalescer.stream("chat", "key", events)]
+
+    async def main():
+        return await asyncio.gather(collect(), collect(), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,48 @@
+"""Packing retrieved chunks into a token-budgeted context block."""
+from langchain_core.documents import Document
+
+# Custom libraries
+from app.be.utils.context import pack_context
+from app.be.utils.tokens import count_tokens
+
+PAGE = "Pumps move water. Valves stop the flow. Gears turn the shaft. Belts drive the fan."
+
+def chunk(chunk_id: str, start: int, end: int, source: str = "/data/manual.txt", page: int = 0) -> Document:
+    return Document(id=chunk_id, page_content=PAGE[start:end],
+                    metadata={"source": source, "page": page, "start_index": start})
+
+def test_overlapping_and_adjacent_chunks_merge_into_one_span():
+    context, citations = pack_context([chunk("b", 18, 39), chunk("a", 0, 24), chunk("c", 40, 61)], budget=500)
+
+    # The space between two adjacent chunks is not part of either
+    assert context == f"[1] manual.txt, page 1\n{PAGE[0:39]}\n{PAGE[40:61]}"
+    assert citations == [{"citation": 1, "source": "/data/manual.txt", "page": 0, "start_index": 0,
+                          "end_index": 61, "chunk_ids": ["a", "b", "c"]}]
+
+def test_covered_and_repeated_chunks_cost_nothing():
+    context, citations = pack_context([chunk("a", 0, 39), chunk("b", 18, 39), chunk("c", 0, 39, page=3)], budget=500)
+
+    assert context.count("Valves stop the flow.") == 1
+    assert [citation["chunk_ids"] for citation in citations] == [["a", "b"]]
+
+def test_spans_are_grouped_by_source_in_document_order():
+    results = [chunk("later", 62, 83), chunk("other", 18, 39, source="/data/other.txt"), chunk("earlier", 0, 17)]
+
+    _, citations = pack_context(results, budget=500)
+
+    assert [citation["chunk_ids"] for citation in citations] == [["earlier"], ["later"], ["other"]]
+
+def test_the_budget_skips_chunks_that_do_not_fit():
+    results = [chunk("a", 0, 17), chunk("b", 40, 83, source="/data/other.txt"), chunk("c", 18, 39)]
+    budget = count_tokens(PAGE[0:39]) + 14
+
+    context, citations = pack_context(results, budget=budget)
+
+    assert [citation["chunk_ids"] for citation in citations] == [["a", "c"]]
+    assert count_tokens(context) <= budget
+
+def test_a_first_chunk_over_the_budget_is_truncated():
+    context, citations = pack_context([chunk("a", 0, len(PAGE))], budget=20)
+
+    assert len(citations) == 1 and citations[0]["end_index"] < len(PAGE)
+    assert count_tokens(context) <= 20
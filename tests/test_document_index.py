@@ -0,0 +1,49 @@
+"""Document summary index for two-stage retrieval."""
+import numpy as np
+import pytest
+
+# Custom libraries
+from app.be.utils.document_index import DocumentIndex, representative_vectors
+
+def test_paged_documents_get_a_vector_per_page_plus_the_whole():
+    metadatas = [{"page": 1, "start_index": 0}, {"page": 0, "start_index": 50}, {"page": 0, "start_index": 0}]
+    vectors = np.array([[0.0, 2.0], [1.0, 0.0], [3.0, 0.0]])
+
+    rows = representative_vectors(metadatas, vectors)
+
+    assert [section for section, _ in rows] == ["", "page 0", "page 1"]
+    assert rows[1][1] == pytest.approx([1.0, 0.0])
+    assert rows[2][1] == pytest.approx([0.0, 1.0])
+    assert np.linalg.norm(rows[0][1]) == pytest.approx(1.0)
+
+def test_unpaged_documents_are_split_into_runs_of_chunks():
+    metadatas = [{"start_index": index} for index in range(5)]
+
+    rows = representative_vectors(metadatas, np.eye(5), section_chunks=2)
+
+    assert [section for section, _ in rows] == ["", "part 0", "part 1", "part 2"]
+    assert representative_vectors([{}], np.ones((1, 3)))[0][0] == ""
+    assert representative_vectors([], np.zeros((0, 3))) == []
+
+def test_search_ranks_documents_by_their_best_section(tmp_path):
+    index = DocumentIndex(str(tmp_path / "documents.pkl"))
+    index.replace("manual.pdf", [("", np.array([0.7, 0.7, 0.0])), ("page 3", np.array([0.0, 0.0, 1.0]))])
+    index.replace("notes.txt", [("", np.array([0.0, 0.6, 0.8]))])
+
+    assert [document for document, _ in index.search([0.0, 0.0, 1.0], k=2)] == ["manual.pdf", "notes.txt"]
+    assert index.search([0.0, 0.0, 1.0], k=1) == [("manual.pdf", pytest.approx(1.0))]
+
+def test_replace_remove_and_persistence(tmp_path):
+    index = DocumentIndex(str(tmp_path / "documents.pkl"))
+    index.replace("manual.pdf", [("", np.array([1.0, 0.0]))])
+    index.replace("manual.pdf", [("", np.array([0.0, 1.0]))])
+    index.replace("notes.txt", [("", np.array([1.0, 0.0]))])
+    index.remove("notes.txt")
+    index.save()
+
+    loaded = DocumentIndex(index.PATH)
+    assert len(loaded) == 1
+    assert loaded.search([0.0, 1.0]) == [("manual.pdf", pytest.approx(1.0))]
+
+    loaded.remove("manual.pdf")
+    assert loaded.search([0.0, 1.0]) == []
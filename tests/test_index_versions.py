@@ -0,0 +1,37 @@
+"""IndexVersions: the pointer switch and pruning of old versions."""
+import shutil
+
+# Custom libraries
+from app.be.utils.index_versions import BASE_VERSION, IndexVersions
+
+def ready_version(versions: IndexVersions) -> str:
+    version = versions.create("rebuild", parent=BASE_VERSION, embedder="local", embeddings_model="test")
+    versions.update_metadata(version, status="ready")
+    return version
+
+def test_prune_keeps_the_active_and_previous_versions(tmp_path):
+    versions = IndexVersions(str(tmp_path))
+    old, previous, active = (ready_version(versions) for _ in range(3))
+    failed = versions.create("rebuild", parent=BASE_VERSION, embedder="local", embeddings_model="test")
+    versions.update_metadata(failed, status="failed")
+    versions.activate(previous)
+    versions.activate(active)
+
+    assert sorted(versions.prune(keep=0)) == sorted([old, failed])
+    assert sorted(version["version"] for version in versions.list()) == sorted([BASE_VERSION, previous, active])
+
+def test_prune_keeps_versions_it_cannot_remove(tmp_path, monkeypatch):
+    versions = IndexVersions(str(tmp_path))
+    stale = ready_version(versions)
+    versions.activate(ready_version(versions))
+    versions.activate(ready_version(versions))
+
+    def locked(path):
+        raise PermissionError(f"{path} is in use")
+
+    monkeypatch.setattr(shutil, "rmtree", locked)
+    assert versions.prune(keep=0) == []
+    assert stale in [version["version"] for version in versions.list()]
+
+    monkeypatch.undo()
+    assert versions.prune(keep=0) == [stale]
@@ -0,0 +1,84 @@
+import asyncio
+import gc
+import uuid
+
+# Third-party libraries
+import pytest
+
+# Custom libraries
+from app.be.core.config import settings
+from app.be.utils import inference as inference_module
+from app.be.utils.inference import ModelInference
+from app.be.utils.ingestion import FileIngestor
+
+@pytest.fixture
+def collections(write_file):
+    """Two new collections of the live store holding the same file, plus a second file in the first."""
+    names = [f"c{uuid.uuid4().hex[:8]}", f"c{uuid.uuid4().hex[:8]}"]
+    shared = write_file("manual.txt", "Error code E42 means the pump is overheating. Let it cool down.")
+    other = write_file("notes.txt", "Bananas are yellow and grow in warm climates.")
+    FileIngestor(collection=names[0]).start_ingestion_session(file_paths=[shared, other])
+    FileIngestor(collection=names[1]).start_ingestion_session(file_paths=[shared])
+    return names
+
+def test_hybrid_search_keeps_the_same_chunk_of_each_collection(collections, monkeypatch):
+    monkeypatch.setattr(settings, "retrieval_mode", "hybrid")
+    monkeypatch.setattr(settings, "min_cosine_similarity", 0.0)
+    monkeypatch.setattr(settings, "duplicate_similarity", 1.01)
+
+    results = ModelInference(collections).perform_similarity_search("error code E42", k=5)
+
+    hits = [(result.metadata["collection"], result.id) for result in results
+            if result.metadata["document"] == "manual.txt"]
+    assert sorted(collection for collection, _ in hits) == sorted(collections)
+    assert len({chunk_id for _, chunk_id in hits}) == 1
+    assert all("similarity" in result.metadata for result in results)
+
+async def collect_chat(inference: ModelInference, query: str) -> list:
+    return [event async for event in inference.stream_chat_session(query)]
+
+@pytest.fixture
+def failing_search(monkeypatch):
+    """A chat session whose speculative search fails, with the intent and the LLM stubbed out."""
+    async def fail(self, query, query_embedding):
+        raise RuntimeError("search failed")
+
+    async def tokens(prompt, parameters):
+        yield "hello"
+
+    monkeypatch.setattr(settings, "speculative_retrieval", True)
+    monkeypatch.setattr(ModelInference, "asearch", fail)
+    monkeypatch.setattr(inference_module, "stream_model", tokens)
+    return monkeypatch
+
+@pytest.mark.parametrize("intent", ["document", "conversation"])
+def test_chat_stream_ends_properly_when_the_search_fails(failing_search, intent):
+    async def classify(self, query, query_embedding):
+        await asyncio.sleep(0.01)
+        return intent
+
+    failing_search.setattr(ModelInference, "classify_intent", classify)
+    unhandled = []
+
+    async def run():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unhandled.append(context))
+        events = await collect_chat(ModelInference(), "What does E42 mean?")
+        gc.collect()
+        await asyncio.sleep(0)
+        return events
+
+    events = asyncio.run(run())
+
+    assert events[0] == {"type": "intent", "intent": intent}
+    assert events[-1] == {"type": "done"}
+    assert any(event["type"] == "error" for event in events) == (intent == "document")
+    assert not unhandled
+
+def test_hierarchical_search_ranks_chunks_of_the_top_documents_only(collections, monkeypatch):
+    monkeypatch.setattr(settings, "hierarchical_retrieval", True)
+    monkeypatch.setattr(settings, "hierarchical_top_documents", 1)
+    monkeypatch.setattr(settings, "min_cosine_similarity", -1.0)
+
+    results = ModelInference(collections[:1]).perform_similarity_search("Bananas are yellow", k=5)
+
+    assert results and {result.metadata["document"] for result in results} == {"notes.txt"}
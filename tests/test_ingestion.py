@@ -0,0 +1,66 @@
+import threading
+
+# Custom libraries
+from app.be.core.config import settings
+from app.be.utils.ingestion import FileIngestor
+
+def ingest(resource_manager, *file_paths) -> dict:
+    return FileIngestor(collection="docs", resource_manager=resource_manager).start_ingestion_session(
+        file_paths=list(file_paths))
+
+def stored_ids(resource_manager) -> set:
+    return set(resource_manager.get_collection("docs").get(include=[])["ids"])
+
+def manifest_ids(resource_manager) -> set:
+    manifest = resource_manager.get_manifest("docs")
+    return {chunk_id for entry in manifest.list_documents() for chunk_id in manifest.get_chunk_ids(entry["document"])}
+
+def test_concurrent_ingests_of_the_same_document_leave_no_orphans(resource_manager, write_file, monkeypatch):
+    ingest(resource_manager, write_file("v0/report.txt", "The first version of the report."))
+
+    # Both jobs would plan against the first version if they could overlap
+    planned = threading.Barrier(2, timeout=1)
+    plan_document = FileIngestor.plan_document
+
+    def plan_together(self, source, chunks):
+        result = plan_document(self, source, chunks)
+        try:
+            planned.wait()
+        except threading.BrokenBarrierError:
+            pass
+        return result
+
+    monkeypatch.setattr(FileIngestor, "plan_document", plan_together)
+    jobs = [threading.Thread(target=ingest, args=(resource_manager, write_file(f"{name}/report.txt", text)))
+            for name, text in (("a", "Version A replaces the report."), ("b", "Version B replaces it instead."))]
+    for job in jobs:
+        job.start()
+    for job in jobs:
+        job.join()
+
+    assert stored_ids(resource_manager) == manifest_ids(resource_manager)
+    assert len(manifest_ids(resource_manager)) == 1
+
+def test_an_edit_embeds_only_the_changed_chunks(resource_manager, write_file, monkeypatch):
+    # One paragraph per chunk
+    monkeypatch.setattr(settings, "chunk_tokens", 12)
+    monkeypatch.setattr(settings, "chunk_min_tokens", 0)
+    paragraphs = ["Pumps move water through the plant.", "Valves stop the flow when closed.",
+                  "Gears turn the main shaft slowly."]
+    ingest(resource_manager, write_file("v0/report.txt", "\n\n".join(paragraphs)))
+    before = manifest_ids(resource_manager)
+
+    paragraphs[1] = "Valves now stop the flow at once."
+    summary = ingest(resource_manager, write_file("v1/report.txt", "\n\n".join(paragraphs)))
+
+    after = manifest_ids(resource_manager)
+    assert summary["reused_chunks"] == len(before & after) > 0
+    assert summary["deleted_chunks"] == len(before - after) > 0
+    assert stored_ids(resource_manager) == after
+
+def test_an_unchanged_file_is_skipped(resource_manager, write_file):
+    ingest(resource_manager, write_file("v0/report.txt", "Pumps move water."))
+
+    summary = ingest(resource_manager, write_file("v1/report.txt", "Pumps move water."))
+
+    assert summary["unchanged_documents"] == 1 and summary["chunks"] == 0
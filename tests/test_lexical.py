@@ -0,0 +1,54 @@
+"""BM25 index and reciprocal rank fusion."""
+import pytest
+
+# Custom libraries
+from app.be.utils.lexical import BM25Index, reciprocal_rank_fusion, tokenize
+
+CHUNKS = {
+    "pump": "The XJ-9000 pump moves water through the plant.",
+    "valve": "Close the valve before servicing the pump.",
+    "error": "Error E42.1 means the valve sensor failed.",
+    "gear": "Gears turn the main shaft.",
+}
+
+@pytest.fixture
+def index(tmp_path) -> BM25Index:
+    index = BM25Index(str(tmp_path / "bm25.pkl"))
+    index.add(CHUNKS, CHUNKS.values())
+    return index
+
+def test_identifiers_are_indexed_whole_and_by_their_parts():
+    assert tokenize("Part XJ-9000, code E42.1") == ["part", "xj-9000", "xj", "9000", "code", "e42.1", "e42", "1"]
+
+def test_search_ranks_by_bm25(index):
+    assert [chunk_id for chunk_id, _ in index.search("XJ-9000")] == ["pump"]
+    assert [chunk_id for chunk_id, _ in index.search("e42.1 valve")][:2] == ["error", "valve"]
+    assert index.search("turbine") == []
+
+def test_removed_and_replaced_chunks_leave_the_results(index):
+    index.remove(["pump"])
+    assert index.search("XJ-9000") == []
+
+    index.add(["gear"], ["The valve train has no gears."])
+    assert "gear" not in [chunk_id for chunk_id, _ in index.search("shaft")]
+    assert len(index) == 3
+
+def test_compaction_and_persistence_keep_the_scores(index):
+    index.remove(["gear", "error"])  # half the index is tombstones, so it compacts
+    assert index.deleted == set()
+    scores = index.search("valve pump")
+    index.save()
+
+    assert BM25Index(index.PATH).search("valve pump") == pytest.approx(scores)
+
+def test_reciprocal_rank_fusion_weights_the_rankings():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "b"]], weights=[1.0, 2.0], rrf_k=1)
+
+    assert [key for key, _ in fused] == ["c", "b", "a"]
+    assert dict(fused)["a"] == pytest.approx(1 / 2)
+    assert dict(fused)["c"] == pytest.approx(1 / 4 + 2 / 2)
+
+def test_reciprocal_rank_fusion_keeps_tuple_keys_apart():
+    fused = dict(reciprocal_rank_fusion([[("docs", "1"), ("news", "1")]], weights=[1.0]))
+
+    assert set(fused) == {("docs", "1"), ("news", "1")}
@@ -0,0 +1,91 @@
+"""Blue/green index maintenance: builds beside live writers, catch-up, rollback."""
+import time
+import uuid
+
+import pytest
+
+# Custom libraries
+from app.be.schemas.maintenance_models import MaintenanceJobStatus
+from app.be.utils import ingestion, maintenance as maintenance_module
+from app.be.utils.ingestion import FileIngestor
+from app.be.utils.maintenance import IndexMaintenanceManager
+
+@pytest.fixture
+def maintenance(resource_manager, monkeypatch) -> IndexMaintenanceManager:
+    """A maintenance manager working on the test's own resource manager instead of the live one."""
+    monkeypatch.setattr(maintenance_module, "resources", resource_manager)
+    monkeypatch.setattr(ingestion, "resources", resource_manager)
+    return IndexMaintenanceManager()
+
+def run(maintenance: IndexMaintenanceManager, kind: str, **fields) -> MaintenanceJobStatus:
+    job = MaintenanceJobStatus(job_id=uuid.uuid4().hex, kind=kind, created_at=time.time(), **fields)
+    maintenance.run(job)
+    return job
+
+def ingest(resource_manager, *file_paths):
+    FileIngestor(collection="docs", resource_manager=resource_manager).start_ingestion_session(
+        file_paths=list(file_paths))
+
+def documents(resource_manager) -> dict:
+    return {entry["document"]: entry["chunks"] for entry in resource_manager.get_manifest("docs").list_documents()}
+
+def texts(resource_manager) -> set:
+    return set(resource_manager.get_collection("docs").get(include=["documents"])["documents"])
+
+@pytest.mark.parametrize("kind", ["compact", "rebuild"])
+def test_writers_run_during_the_build_and_are_caught_up(maintenance, resource_manager, write_file, monkeypatch, kind):
+    ingest(resource_manager, write_file("a.txt", "Pumps move water."), write_file("b.txt", "Valves stop water."))
+    live_version = resource_manager.INDEX_VERSION
+    validate_collection = maintenance.validate_collection
+
+    def write_during_build(builder, collection, job):
+        if collection == "docs" and "c.txt" not in documents(resource_manager):
+            # Raises IndexBusy if maintenance held writers off here
+            with resource_manager.writing(blocking=False):
+                ingest(resource_manager, write_file("v2/a.txt", "Pumps move oil now."), write_file("c.txt", "Gears turn."))
+                FileIngestor(collection="docs", resource_manager=resource_manager).delete_document("b.txt")
+        return validate_collection(builder, collection, job)
+
+    monkeypatch.setattr(maintenance, "validate_collection", write_during_build)
+    job = run(maintenance, kind)
+
+    assert job.status == "completed", job.error
+    assert job.activated and resource_manager.INDEX_VERSION == job.version != live_version
+    assert job.collections["docs"]["caught_up_documents"] == 3
+    assert documents(resource_manager) == {"a.txt": 1, "c.txt": 1}
+    assert texts(resource_manager) == {"Pumps move oil now.", "Gears turn."}
+    assert resource_manager.get_lexical_index("docs").search("gears", k=1)[0][0] in \
+        resource_manager.get_manifest("docs").get_chunk_ids("c.txt")
+
+def test_a_quiet_build_catches_nothing_up(maintenance, resource_manager, write_file):
+    ingest(resource_manager, write_file("a.txt", "Pumps move water."))
+
+    job = run(maintenance, "compact")
+
+    assert job.status == "completed", job.error
+    assert job.collections["docs"]["caught_up_documents"] == 0
+    assert job.collections["docs"]["stored_chunks"] == 1
+
+def test_rollback_returns_to_the_previous_version(maintenance, resource_manager, write_file):
+    ingest(resource_manager, write_file("a.txt", "Pumps move water."))
+    first = run(maintenance, "compact").version
+    second = run(maintenance, "compact").version
+    assert resource_manager.INDEX_VERSION == second
+
+    job = run(maintenance, "rollback")
+
+    assert job.status == "completed", job.error
+    assert resource_manager.INDEX_VERSION == first
+    assert documents(resource_manager) == {"a.txt": 1}
+
+def test_a_failed_build_leaves_the_live_version_active(maintenance, resource_manager, write_file, monkeypatch):
+    ingest(resource_manager, write_file("a.txt", "Pumps move water."))
+    live_version = resource_manager.INDEX_VERSION
+    monkeypatch.setattr(maintenance, "MIN_RECALL", 1.5)
+
+    job = run(maintenance, "compact")
+
+    assert job.status == "failed" and "text_recall" in job.error
+    assert resource_manager.INDEX_VERSION == live_version
+    # Failed builds are the first to be pruned
+    assert job.pruned_versions == [job.version]
@@ -0,0 +1,48 @@
+"""IngestionManifest and the content-derived chunk ids it records."""
+# Custom libraries
+from app.be.utils.manifest import IngestionManifest, hash_text, make_chunk_ids
+
+def test_chunk_ids_follow_content_not_position():
+    before = make_chunk_ids("report.txt", ["Intro.", "Pumps.", "Valves."])
+    after = make_chunk_ids("report.txt", ["Intro.", "A new paragraph.", "Pumps.", "Valves."])
+
+    assert before == make_chunk_ids("report.txt", ["Intro.", "Pumps.", "Valves."])
+    assert set(before) < set(after)
+    assert before[1] == (after[2][0], hash_text("Pumps."))
+
+def test_repeated_texts_and_other_documents_get_distinct_ids():
+    ids = [chunk_id for chunk_id, _ in make_chunk_ids("report.txt", ["Note.", "Body.", "Note."])]
+    other = [chunk_id for chunk_id, _ in make_chunk_ids("other.txt", ["Note."])]
+
+    assert len(set(ids)) == 3
+    assert other[0] not in ids
+
+def test_replace_and_remove_documents(tmp_path):
+    manifest = IngestionManifest(str(tmp_path / "manifest.sqlite3"))
+    manifest.replace_document("report.txt", "hash-1", make_chunk_ids("report.txt", ["Intro.", "Pumps."]))
+    manifest.replace_document("report.txt", "hash-2", make_chunk_ids("report.txt", ["Intro."]))
+    manifest.replace_document("notes.txt", "hash-3", make_chunk_ids("notes.txt", ["Valves."]))
+
+    assert manifest.get_file_hash("report.txt") == "hash-2"
+    assert manifest.get_chunk_ids("report.txt") == [make_chunk_ids("report.txt", ["Intro."])[0][0]]
+    assert [(entry["document"], entry["chunks"]) for entry in manifest.list_documents()] == \
+        [("notes.txt", 1), ("report.txt", 1)]
+
+    manifest.remove_document("report.txt")
+    assert manifest.get_file_hash("report.txt") is None
+    assert manifest.get_chunk_ids("report.txt") == []
+    manifest.close()
+
+def test_copy_to_overwrites_the_target(tmp_path):
+    source = IngestionManifest(str(tmp_path / "source.sqlite3"))
+    target = IngestionManifest(str(tmp_path / "target.sqlite3"))
+    chunks = make_chunk_ids("report.txt", ["Intro.", "Pumps."])
+    source.replace_document("report.txt", "hash-1", chunks)
+    target.replace_document("stale.txt", "hash-0", make_chunk_ids("stale.txt", ["Old."]))
+
+    source.copy_to(target)
+
+    assert [entry["document"] for entry in target.list_documents()] == ["report.txt"]
+    assert sorted(target.get_chunks("report.txt")) == sorted(chunks)
+    source.close()
+    target.close()
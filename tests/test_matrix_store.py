@@ -0,0 +1,104 @@
+"""MatrixIndex storage: quantization, compaction and its file generations."""
+import sqlite3
+
+import numpy as np
+import pytest
+
+# Custom libraries
+from app.be.utils.matrix_store import MatrixIndex
+
+def store(index: MatrixIndex, embeddings, count: int, prefix: str = "chunk") -> list:
+    """Upsert ``count`` numbered chunks embedded with the offline embedder."""
+    ids = [f"{prefix}-{i}" for i in range(count)]
+    texts = [f"{prefix} number {i} about topic {i % 7}" for i in range(count)]
+    index.upsert(ids, embeddings.embed_documents(texts), texts, [{"number": i} for i in range(count)])
+    return ids
+
+def matrix_files(index: MatrixIndex) -> list:
+    return sorted(path.name for path in index.PATH.glob("*.npy"))
+
+@pytest.mark.parametrize("dtype, tolerance", [("float32", 1e-6), ("float16", 1e-3), ("int8", 2e-2)])
+def test_stored_vectors_decode_close_to_the_originals(tmp_path, embeddings, dtype, tolerance):
+    index = MatrixIndex(str(tmp_path), dtype=dtype)
+    store(index, embeddings, 20)
+
+    stored = np.asarray(index.get(include=["embeddings"])["embeddings"])
+    original = index.prepare(embeddings.embed_documents([f"chunk number {i} about topic {i % 7}" for i in range(20)]))
+    assert np.abs(stored - original).max() < tolerance
+
+    hits = index.query(embeddings.embed_documents(["chunk number 3 about topic 3"]), n_results=1)
+    assert hits["ids"] == [["chunk-3"]]
+    index.close()
+
+def test_compaction_writes_a_new_generation_and_keeps_the_records(tmp_path, embeddings):
+    index = MatrixIndex(str(tmp_path), dtype="int8")
+    ids = store(index, embeddings, 1200)
+    first = index.generation
+    assert matrix_files(index) == [f"scales.{first}.npy", f"vectors.{first}.npy"]
+
+    index.delete(ids[::2])
+
+    assert index.generation == first + 1
+    assert index.size == 600
+    assert matrix_files(index) == [f"scales.{first + 1}.npy", f"vectors.{first + 1}.npy"]
+    hits = index.query(embeddings.embed_documents(["chunk number 7 about topic 0"]), n_results=1)
+    assert hits["ids"] == [["chunk-7"]]
+    index.close()
+
+    reopened = MatrixIndex(str(tmp_path))
+    assert reopened.generation == first + 1
+    assert reopened.count() == 600
+    assert reopened.get(ids=["chunk-7"])["metadatas"] == [{"number": 7}]
+    reopened.close()
+
+def test_a_mapped_generation_is_removed_only_once_released(tmp_path, embeddings):
+    index = MatrixIndex(str(tmp_path), dtype="float32")
+    store(index, embeddings, 10)
+    old_file = index.file_path("vectors", index.generation)
+    held = index.matrix  # what a running search keeps
+
+    index.compact()
+    assert old_file.exists()
+    assert np.asarray(held[:10]).any()
+
+    del held
+    store(index, embeddings, 1, prefix="extra")
+    assert not old_file.exists()
+    index.close()
+
+def test_a_search_overtaken_by_compaction_scores_again(tmp_path, embeddings, monkeypatch):
+    index = MatrixIndex(str(tmp_path), dtype="float32")
+    ids = store(index, embeddings, 1200)
+    index.delete(ids[:200])
+    score = index.score
+    calls = []
+
+    def compact_during_first_pass(*args):
+        if not calls:
+            index.delete(ids[200:600])  # tombstones pass a quarter, rows are renumbered
+        calls.append(args)
+        return score(*args)
+
+    monkeypatch.setattr(index, "score", compact_during_first_pass)
+    hits = index.query(embeddings.embed_documents(["chunk number 900 about topic 4"]), n_results=1)
+
+    assert len(calls) == 2
+    assert hits["ids"] == [["chunk-900"]]
+    index.close()
+
+def test_stores_from_before_generations_still_load(tmp_path, embeddings):
+    index = MatrixIndex(str(tmp_path), dtype="float32")
+    store(index, embeddings, 5)
+    index.close()
+    # Stores written before generations kept unsuffixed files and no generation in meta
+    (tmp_path / "vectors.1.npy").rename(tmp_path / "vectors.npy")
+    with sqlite3.connect(str(tmp_path / "records.sqlite3")) as db:
+        db.execute("DELETE FROM meta WHERE key = 'generation'")
+    db.close()
+
+    reopened = MatrixIndex(str(tmp_path))
+    assert reopened.generation == 0
+    assert reopened.query(embeddings.embed_documents(["chunk number 2 about topic 2"]), n_results=1)["ids"] == [["chunk-2"]]
+    store(reopened, embeddings, 2000, prefix="more")
+    assert "vectors.npy" not in matrix_files(reopened)
+    reopened.close()
@@ -0,0 +1,66 @@
+import os
+import threading
+
+# Custom libraries
+from app.be.core.config import settings
+from app.be.utils.ingestion import FileIngestor
+from app.be.utils.lexical import BM25Index
+
+def test_lexical_index_loads_once_outside_the_global_lock(resource_manager, monkeypatch, tmp_path):
+    started, release = threading.Event(), threading.Event()
+    loads = []
+
+    def slow_load(path, collection, store, manifest):
+        loads.append(collection)
+        started.set()
+        release.wait(5)
+        return BM25Index(str(tmp_path / "bm25.pkl"))
+
+    monkeypatch.setattr(resource_manager, "load_lexical_index", slow_load)
+    indexes = []
+    readers = [threading.Thread(target=lambda: indexes.append(resource_manager.get_lexical_index("docs")))
+               for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    assert started.wait(5)
+
+    # Other requests can still borrow handles while the index loads
+    assert resource_manager.LOCK.acquire(timeout=1)
+    resource_manager.LOCK.release()
+
+    release.set()
+    for reader in readers:
+        reader.join()
+    assert loads == ["docs"]
+    assert len(indexes) == 3 and all(index is indexes[0] for index in indexes)
+
+def test_document_index_is_rebuilt_from_the_stored_chunks(resource_manager, write_file):
+    FileIngestor(collection="docs", resource_manager=resource_manager).start_ingestion_session(
+        file_paths=[write_file("a.txt", "Pumps and valves."), write_file("b.txt", "Bananas and apples.")])
+    path = resource_manager.collection_path("docs", "documents.pkl")
+    resource_manager.DOCUMENT_INDEXES.clear()
+    os.remove(path)
+
+    index = resource_manager.get_document_index("docs")
+
+    assert len(index) == 2 and os.path.exists(path)
+
+def test_retired_chroma_stores_are_closed(resource_manager, monkeypatch):
+    from chromadb.api.shared_system_client import SharedSystemClient
+
+    monkeypatch.setattr(settings, "vector_backend", "chroma")
+    store = resource_manager.get_vector_store("docs")
+    store.add_texts(["Pumps and valves."], ids=["chunk-1"])
+    system = store._client._system
+    assert resource_manager.VECTOR_STORE_PATH in SharedSystemClient._identifier_to_system
+
+    resource_manager.RETIRED = list(resource_manager.VECTOR_STORES.values())
+    resource_manager.VECTOR_STORES = {}
+    resource_manager.close_retired()
+
+    assert resource_manager.VECTOR_STORE_PATH not in SharedSystemClient._identifier_to_system
+    assert system not in SharedSystemClient._identifier_to_system.values()
+    # A store opened on the same directory later starts a fresh system and sees the data
+    reopened = resource_manager.get_vector_store("docs")
+    assert reopened._client._system is not system
+    assert reopened._collection.count() == 1
@@ -0,0 +1,60 @@
+"""Cosine scoring, the similarity threshold and MMR re-ranking."""
+from types import SimpleNamespace
+
+from langchain_core.documents import Document
+import numpy as np
+import pytest
+
+# Custom libraries
+from app.be.core.config import settings
+from app.be.utils.inference import ModelInference
+from app.be.utils.retrieval import cosine_similarities, maximal_marginal_relevance, normalize_rows
+
+def test_normalize_rows_leaves_zero_rows_alone():
+    rows = normalize_rows(np.array([[3.0, 4.0], [0.0, 0.0]]))
+
+    assert rows.tolist() == [pytest.approx([0.6, 0.8]), [0.0, 0.0]]
+
+def test_cosine_similarities_compare_truncated_vectors_on_leading_components():
+    query = np.array([1.0, 0.0, 5.0])
+    vectors = np.array([[2.0, 0.0], [0.0, 1.0], [-1.0, 0.0]])
+
+    assert cosine_similarities(query, vectors) == pytest.approx([1.0, 0.0, -1.0])
+    assert cosine_similarities(query, np.zeros((0, 2))).shape == (0,)
+
+def test_mmr_by_relevance_alone_keeps_the_relevance_order():
+    relevance = np.array([0.2, 0.9, 0.5])
+    vectors = np.eye(3)
+
+    assert maximal_marginal_relevance(relevance, vectors, k=3, lambda_mult=1.0) == [1, 2, 0]
+
+def test_mmr_prefers_a_different_candidate_over_a_similar_one():
+    relevance = np.array([0.9, 0.85, 0.6])
+    vectors = np.array([[1.0, 0.0], [0.9, 0.3], [0.0, 1.0]])
+
+    assert maximal_marginal_relevance(relevance, vectors, k=2, lambda_mult=0.5) == [0, 2]
+
+def test_mmr_drops_near_duplicates_even_below_k():
+    relevance = np.array([0.9, 0.8])
+    vectors = np.array([[1.0, 0.0], [1.0, 0.01]])
+
+    assert maximal_marginal_relevance(relevance, vectors, k=2, duplicate_similarity=0.95) == [0]
+    assert maximal_marginal_relevance(relevance, vectors, k=0) == []
+
+def rank(vectors: list, min_similarity: float, k: int = 5) -> list:
+    documents = [Document(page_content=str(i), metadata={}) for i in range(len(vectors))]
+    ranker = SimpleNamespace(MIN_SIMILARITY=min_similarity)
+    ranked = ModelInference.rank_candidates(ranker, [1.0, 0.0], documents, np.array(vectors), k)
+    return [(document.page_content, document.metadata["similarity"]) for document in ranked]
+
+def test_candidates_below_the_cosine_threshold_are_dropped(monkeypatch):
+    monkeypatch.setattr(settings, "mmr_lambda", 1.0)
+
+    ranked = rank([[1.0, 0.0], [0.0, 1.0], [0.8, 0.6]], min_similarity=0.5)
+
+    assert ranked == [("0", 1.0), ("2", 0.8)]
+
+def test_without_candidates_above_the_threshold_the_two_most_similar_are_kept():
+    ranked = rank([[0.0, 1.0], [0.2, 0.98], [-1.0, 0.0]], min_similarity=0.9)
+
+    assert [chunk for chunk, _ in ranked] == ["1", "0"]
@@ -0,0 +1,52 @@
+import asyncio
+import threading
+
+# Third-party libraries
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+import pytest
+
+# Custom libraries
+from app.be.api import routes
+from app.be.main import app
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+def test_opening_an_inference_session_runs_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def has_collection(collection):
+        threads.append(threading.get_ident())
+        return False
+
+    monkeypatch.setattr(routes.resources, "has_collection", has_collection)
+
+    async def open_unknown():
+        with pytest.raises(HTTPException) as error:
+            await routes.open_inference(["unknown"])
+        return threading.get_ident(), error.value.status_code
+
+    loop_thread, status = asyncio.run(open_unknown())
+    assert status == 404
+    assert threads and loop_thread not in threads
+
+def test_inference_answers_from_the_fake_api(client, fake_openai):
+    response = client.post("/api/inference", json={"query": "What does error code E42 mean?"})
+
+    assert response.status_code == 200
+    assert response.json()["response"].startswith("word0")
+    assert fake_openai.state.requests["chat"] == 1
+
+def test_unknown_collections_are_rejected(client):
+    response = client.post("/api/inference", json={"query": "Hello?", "collections": ["missing"]})
+
+    assert response.status_code == 404
+
+def test_upload_rejects_two_files_of_the_same_name(client):
+    response = client.post("/api/ingestion", files=[("files", ("a/report.txt", b"First.", "text/plain")),
+                                                    ("files", ("b/report.txt", b"Second.", "text/plain"))])
+
+    assert response.status_code == 400
@@ -0,0 +1,60 @@
+"""Conversation sessions: the verbatim window, compaction into a summary, eviction."""
+import time
+
+# Custom libraries
+from app.be.core.config import settings
+from app.be.utils import model
+from app.be.utils.sessions import SessionStore
+from app.be.utils.tokens import count_tokens
+
+def converse(store: SessionStore, turns: int):
+    session = store.get_or_create()
+    for turn in range(turns):
+        store.append(session, f"Question {turn} about pump P-{turn}?", f"Answer {turn}: check valve V-{turn}.")
+    # Compactions run in the background; wait for them
+    store.EXECUTOR.shutdown(wait=True)
+    return session
+
+def test_old_turns_are_folded_into_a_summary(fake_openai):
+    store = SessionStore(recent_tokens=40, summary_tokens=60)
+    session = converse(store, 8)
+
+    assert 0 < session.summarized == store.recent_start(session) < len(session.turns)
+    assert session.summary.startswith("word0 word1")
+    assert fake_openai.state.requests["chat"] >= 1
+
+    history = store.build_history(session)
+    assert history.startswith(f"Summary of the earlier conversation: {session.summary}")
+    assert history.endswith("Answer 7: check valve V-7.")
+    assert "Question 0 " not in history
+
+def test_a_failing_summary_call_clips_the_turns_instead(monkeypatch):
+    def fail(prompt, parameters):
+        raise ConnectionError("offline")
+
+    monkeypatch.setattr(model, "invoke_model", fail)
+    store = SessionStore(recent_tokens=40, summary_tokens=200)
+    session = converse(store, 6)
+
+    assert session.summarized > 0
+    assert session.summary.startswith("User: Question 0 about pump P-0?")
+
+def test_the_newest_turn_is_kept_even_beyond_the_budget():
+    store = SessionStore(recent_tokens=5)
+    session = store.get_or_create()
+    session.turns.append({"user": "A long question " * 20, "assistant": "A long answer " * 20})
+
+    assert store.recent_start(session) == 0
+    history = store.build_history(session)
+    assert history.rstrip().endswith("answer")
+    assert count_tokens(history, settings.llm_model) < 10
+
+def test_sessions_expire_and_are_evicted_oldest_first():
+    store = SessionStore(max_sessions=2, ttl=60)
+    first, second = store.get_or_create("first"), store.get_or_create("second")
+    store.get_or_create("third")
+    assert store.get("first") is None and store.get("second") is second
+
+    second.updated_at = time.time() - 61
+    assert store.get("second") is None
+    assert store.get_or_create("first") is not first